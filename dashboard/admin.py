@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Vehicle, Driver, Maintenance, Route, AlertConfiguration
+from .models import (
+    Vehicle, Driver, Maintenance, Route, AlertConfiguration, RouteDetailsCache, FuelPriceSnapshot, VehicleAlertState,
+    FleetCostRollup,
+)
 
 class RouteAdmin(admin.ModelAdmin):
     list_display = ('start_location', 'end_location', 'estimated_distance', 'status', 'vehicle', 'driver')
@@ -15,4 +18,8 @@ admin.site.register(Vehicle)
 admin.site.register(Driver)
 admin.site.register(Maintenance)
 admin.site.register(Route, RouteAdmin)
-admin.site.register(AlertConfiguration, AlertConfigurationAdmin)
\ No newline at end of file
+admin.site.register(AlertConfiguration, AlertConfigurationAdmin)
+admin.site.register(RouteDetailsCache)
+admin.site.register(FuelPriceSnapshot)
+admin.site.register(VehicleAlertState)
+admin.site.register(FleetCostRollup)
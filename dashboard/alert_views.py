@@ -1,12 +1,13 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from collections import Counter
 from .models import Maintenance, AlertConfiguration
-from accounts.models import UserProfile
+from .middleware import get_profile_or_404
 from .forms import AlertConfigurationFormSet
-from .services import get_vehicle_alerts
+from django.http import HttpResponseForbidden, JsonResponse
+from .services import get_vehicle_alerts, refresh_all_vehicle_alert_states
 
 class AlertConfigView(LoginRequiredMixin, View):
     def _get_alert_context(self, request, profile, formset=None):
@@ -54,7 +55,7 @@ class AlertConfigView(LoginRequiredMixin, View):
         }
 
     def get(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         
         for choice_val, _ in Maintenance.SERVICE_CHOICES_ALERT_CONFIG:
             AlertConfiguration.objects.get_or_create(
@@ -67,7 +68,7 @@ class AlertConfigView(LoginRequiredMixin, View):
         return render(request, 'dashboard/alert_config.html', context)
 
     def post(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         queryset = AlertConfiguration.objects.filter(user_profile=profile)
         formset = AlertConfigurationFormSet(request.POST, queryset=queryset)
         
@@ -78,4 +79,14 @@ class AlertConfigView(LoginRequiredMixin, View):
         else:
             messages.error(request, 'Erro ao salvar as configurações. Verifique os campos.')
             context = self._get_alert_context(request, profile, formset)
-            return render(request, 'dashboard/alert_config.html', context)
\ No newline at end of file
+            return render(request, 'dashboard/alert_config.html', context)
+
+
+class RefreshVehicleAlertsCronView(View):
+    # Called daily by App Engine cron (cron.yaml) so day-based thresholds advance. App Engine strips
+    # X-Appengine-Cron from outside requests, so the header alone identifies the scheduler.
+    def get(self, request):
+        if request.headers.get('X-Appengine-Cron') != 'true':
+            return HttpResponseForbidden()
+        total, tenants = refresh_all_vehicle_alert_states()
+        return JsonResponse({'alerts': total, 'tenants': tenants})
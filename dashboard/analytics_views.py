@@ -0,0 +1,94 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
+
+from .middleware import get_profile_or_404
+from .models import FleetCostRollup
+from .services import month_start
+
+DEFAULT_MONTHS = 24
+MAX_MONTHS = 120
+ROLLUP_FIELDS = ('route_count', 'distance', 'fuel_cost', 'toll_cost', 'maintenance_count', 'maintenance_cost')
+
+
+def _shift_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _parse_month(raw, name):
+    try:
+        year, month = (int(part) for part in raw.split('-'))
+        return date(year, month, 1)
+    except ValueError:
+        raise ValueError(f"Mês inválido em '{name}'. Use AAAA-MM.")
+
+
+def _metrics(totals):
+    total_cost = totals['fuel_cost'] + totals['toll_cost'] + totals['maintenance_cost']
+    return {
+        'route_count': totals['route_count'], 'maintenance_count': totals['maintenance_count'],
+        'distance': float(totals['distance']), 'fuel_cost': float(totals['fuel_cost']),
+        'toll_cost': float(totals['toll_cost']), 'maintenance_cost': float(totals['maintenance_cost']),
+        'total_cost': float(total_cost),
+        'cost_per_km': round(float(total_cost / totals['distance']), 4) if totals['distance'] else None,
+    }
+
+
+def _empty_totals():
+    return {field: Decimal('0') if 'count' not in field else 0 for field in ROLLUP_FIELDS}
+
+
+class FleetCostAnalyticsView(LoginRequiredMixin, View):
+    # Reads only FleetCostRollup, so any range costs at most vehicles x months rows.
+    def get(self, request):
+        profile = get_profile_or_404(request)
+        try:
+            end = _parse_month(request.GET['end'], 'end') if request.GET.get('end') else month_start(timezone.now())
+            start = _parse_month(request.GET['start'], 'start') if request.GET.get('start') else _shift_months(end, 1 - DEFAULT_MONTHS)
+        except ValueError as exc:
+            return JsonResponse({'success': False, 'errors': {'__all__': [str(exc)]}}, status=400)
+        if start > end or _shift_months(start, MAX_MONTHS) <= end:
+            return JsonResponse({'success': False, 'errors': {'__all__': [f"Informe um período de 1 a {MAX_MONTHS} meses."]}}, status=400)
+
+        rollups = FleetCostRollup.objects.filter(user_profile=profile, month__gte=start, month__lte=end)
+        vehicle_id = request.GET.get('vehicle', '')
+        if vehicle_id:
+            if not vehicle_id.isdigit():
+                return JsonResponse({'success': False, 'errors': {'vehicle': ["Veículo inválido."]}}, status=400)
+            rollups = rollups.filter(vehicle_id=vehicle_id)
+
+        months = []
+        month = start
+        while month <= end:
+            months.append(month)
+            month = _shift_months(month, 1)
+
+        overall = _empty_totals()
+        by_month = defaultdict(_empty_totals)
+        by_vehicle = {}
+        for row in rollups.values('vehicle_id', 'vehicle__plate', 'month', *ROLLUP_FIELDS).order_by('vehicle__plate', 'month'):
+            vehicle = by_vehicle.setdefault(row['vehicle_id'], {
+                'plate': row['vehicle__plate'], 'totals': _empty_totals(), 'months': defaultdict(_empty_totals),
+            })
+            for field in ROLLUP_FIELDS:
+                for totals in (overall, by_month[row['month']], vehicle['totals'], vehicle['months'][row['month']]):
+                    totals[field] += row[field]
+
+        return JsonResponse({
+            'start': start.strftime('%Y-%m'), 'end': end.strftime('%Y-%m'),
+            'totals': _metrics(overall),
+            'months': [{'month': month.strftime('%Y-%m'), **_metrics(by_month[month])} for month in months],
+            'vehicles': [
+                {
+                    'id': vehicle_id, 'plate': vehicle['plate'], **_metrics(vehicle['totals']),
+                    'months': [{'month': month.strftime('%Y-%m'), **_metrics(vehicle['months'][month])} for month in months],
+                }
+                for vehicle_id, vehicle in by_vehicle.items()
+            ],
+        })
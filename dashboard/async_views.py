@@ -0,0 +1,159 @@
+import asyncio
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.views import View
+
+from .forms import RouteForm
+from .history import ahistory_response, aroute_history_stats, maintenance_history_entry, route_history_entry
+from .middleware import get_profile_or_404
+from .models import AlertConfiguration, Driver, Maintenance, Route, Vehicle
+from .route_views import RouteCostsMixin, route_summary
+from .services import acalculate_route_details, aget_diesel_price, aget_vehicle_alerts, async_service_client_scope
+
+
+class AsyncLoginRequiredView(View):
+    # LoginRequiredMixin reads request.user synchronously, which the async ORM forbids on the event loop.
+    # A profile is only resolved for authenticated users, so it settles the check without loading the
+    # user again when the middlewares ran synchronously (WSGI mode).
+    async def dispatch(self, request, *args, **kwargs):
+        if request.profile is None and not (await request.auser()).is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        async with async_service_client_scope():
+            return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncRouteCostsMixin(RouteCostsMixin):
+    async def aresolve_route_costs(self, start_location, end_location, known_details=None):
+        uf = self.parse_uf(start_location)
+        details, price_result = await asyncio.gather(
+            self._resolved(known_details) if known_details else acalculate_route_details(start_location, end_location),
+            aget_diesel_price(uf) if uf else self._resolved(None),
+        )
+        if isinstance(details, str):
+            return None, None, details
+        if not uf:
+            return None, None, "Formato de Local de Partida inválido. Use 'Cidade, UF'."
+        if isinstance(price_result, str):
+            return None, None, price_result
+        return details, price_result, None
+
+    @staticmethod
+    async def _resolved(value):
+        return value
+
+    async def save_route(self, request, form, success_message, known_details=None):
+        if not await sync_to_async(form.is_valid)():
+            return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+        route = form.save(commit=False)
+        route_details, price_result, error = await self.aresolve_route_costs(
+            route.start_location, route.end_location, known_details(route, form) if known_details else None
+        )
+        if error:
+            return JsonResponse({'success': False, 'errors': {'__all__': [error]}}, status=400)
+
+        route.estimated_distance = route_details['distance']
+        route.estimated_toll_cost = route_details['toll_cost']
+        route.fuel_price_per_liter = price_result
+        await route.asave()
+        # Reloaded with its vehicle: the summary's fuel cost reads it and lazy loads are not allowed here.
+        route = await Route.objects.select_related('vehicle').aget(pk=route.pk)
+        messages.success(request, success_message)
+        return JsonResponse({'success': True, 'summary': route_summary(route)})
+
+
+class AsyncRouteCreateView(AsyncRouteCostsMixin, AsyncLoginRequiredView):
+    async def post(self, request):
+        profile = get_profile_or_404(request)
+        form = RouteForm(request.POST, instance=Route(user_profile=profile), user_profile=profile)
+        return await self.save_route(request, form, 'Rota registrada com sucesso!')
+
+
+class AsyncRouteUpdateView(AsyncRouteCostsMixin, AsyncLoginRequiredView):
+    async def post(self, request, pk):
+        profile = get_profile_or_404(request)
+        route = await aget_object_or_404(Route, pk=pk, user_profile=profile)
+        form = RouteForm(request.POST, instance=route, user_profile=profile)
+        return await self.save_route(request, form, 'Rota atualizada com sucesso!', self.known_details)
+
+    @staticmethod
+    def known_details(route, form):
+        if {'start_location', 'end_location'} & set(form.changed_data) or route.estimated_distance is None:
+            return None
+        return {'distance': route.estimated_distance, 'toll_cost': route.estimated_toll_cost}
+
+
+class AsyncVehicleMaintenanceHistoryView(AsyncLoginRequiredView):
+    async def get(self, request, pk):
+        profile = get_profile_or_404(request)
+        vehicle = await aget_object_or_404(Vehicle, pk=pk, user_profile=profile)
+
+        maintenances = Maintenance.objects.filter(vehicle=vehicle, status='completed')
+        rows = maintenances.annotate(sort_date=Coalesce('actual_end_date', 'end_date')).values(
+            'id', 'service_type', 'mechanic_shop_name', 'actual_end_date', 'actual_cost', 'sort_date'
+        )
+
+        async def summary():
+            totals = await maintenances.aaggregate(total=Sum('actual_cost'))
+            return {'total_cost': float(totals['total'] or 0.0)}
+
+        return await ahistory_response(request, rows, ('-sort_date', '-id'), maintenance_history_entry, summary)
+
+
+class AsyncVehicleRouteHistoryView(AsyncLoginRequiredView):
+    async def get(self, request, pk):
+        profile = get_profile_or_404(request)
+        vehicle = await aget_object_or_404(Vehicle, pk=pk, user_profile=profile)
+
+        routes = Route.objects.filter(vehicle=vehicle, status='completed')
+
+        async def summary():
+            return {'stats': await aroute_history_stats(routes)}
+
+        return await ahistory_response(request, routes.history_rows(), ('-end_time', '-id'), route_history_entry, summary)
+
+
+class AsyncDriverRouteHistoryView(AsyncLoginRequiredView):
+    async def get(self, request, pk):
+        profile = get_profile_or_404(request)
+        driver = await aget_object_or_404(Driver, pk=pk, user_profile=profile)
+
+        routes = Route.objects.filter(driver=driver, status='completed')
+
+        async def summary():
+            return {'stats': await aroute_history_stats(routes)}
+
+        return await ahistory_response(
+            request, routes.history_rows(), ('-end_time', '-id'),
+            lambda row: route_history_entry(row, include_plate=True), summary
+        )
+
+
+class AsyncAlertDataView(AsyncLoginRequiredView):
+    async def get(self, request):
+        profile = get_profile_or_404(request)
+        priority = request.GET.get('priority', '')
+        if priority not in dict(AlertConfiguration.PRIORITY_CHOICES):
+            priority = ''
+        alerts = await aget_vehicle_alerts(profile)
+        counts = Counter(alert.priority for alert in alerts)
+        return JsonResponse({
+            'stats': {
+                'total': len(alerts), 'high': counts.get('high', 0),
+                'medium': counts.get('medium', 0), 'low': counts.get('low', 0),
+            },
+            'alerts': [
+                {
+                    'vehicle_id': alert.vehicle.pk, 'plate': alert.vehicle.plate, 'model': alert.vehicle.model,
+                    'service_type': alert.service_type, 'message': alert.message, 'priority': alert.priority,
+                    'overdue_value': alert.overdue_value, 'overdue_unit': alert.overdue_unit,
+                }
+                for alert in alerts if not priority or alert.priority == priority
+            ],
+        })
@@ -0,0 +1,93 @@
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from accounts.models import UserProfile
+from . import urls as dashboard_urls
+from .models import AlertConfiguration, Driver, Maintenance, Route, Vehicle
+from .services import refresh_cost_rollups, refresh_vehicle_alert_states
+
+PK_MODELS = {'vehicle': Vehicle, 'driver': Driver, 'route': Route, 'maintenance': Maintenance}
+
+
+def seed_fleet(vehicle_count, routes_per_vehicle=20, maintenances_per_vehicle=5):
+    """Creates a synthetic tenant with one driver per vehicle and returns its profile.
+
+    Rows are bulk-created, so the derived tables that signals would normally keep
+    (alert states and cost rollups) are refreshed explicitly at the end.
+    """
+    token = uuid.uuid4().hex[:6]
+    user = User.objects.create_user(username=f"bench-{token}", password=uuid.uuid4().hex)
+    profile = UserProfile.objects.create(user=user, company_name="Benchmark")
+    now = timezone.now()
+
+    drivers = Driver.objects.bulk_create(
+        Driver(
+            user_profile=profile, full_name=f"Motorista {i:06d}", email=f"bench-{token}-{i}@example.com",
+            license_number=f"{token}{i:08d}", admission_date=date(2020, 1, 1), is_active=i % 10 != 0,
+        ) for i in range(vehicle_count)
+    )
+    vehicles = Vehicle.objects.bulk_create(
+        Vehicle(
+            user_profile=profile, plate=f"{token[:3]}{i:06d}"[:10], model="Bench", year=2020,
+            initial_mileage=0, acquisition_date=date(2020, 1, 1), driver=drivers[i],
+            average_fuel_consumption=Decimal('3.50'),
+        ) for i in range(vehicle_count)
+    )
+    Route.objects.bulk_create(
+        Route(
+            user_profile=profile, vehicle=vehicle, driver=drivers[i], start_location="A, SC", end_location="B, PR",
+            start_time=now - timedelta(days=n * 3 + 1), end_time=now - timedelta(days=n * 3),
+            status='completed', actual_distance=Decimal('120.00'), estimated_distance=Decimal('120.00'),
+            estimated_toll_cost=Decimal('15.00'), fuel_price_per_liter=Decimal('6.00'),
+        ) for i, vehicle in enumerate(vehicles) for n in range(routes_per_vehicle)
+    )
+    Maintenance.objects.bulk_create(
+        Maintenance(
+            user_profile=profile, vehicle=vehicle, service_type="Revisão Geral",
+            start_date=now - timedelta(days=n * 60 + 1), end_date=now - timedelta(days=n * 60),
+            mechanic_shop_name="Oficina", current_mileage=0, status='completed' if n else 'scheduled',
+            actual_cost=Decimal('500.00') if n else None,
+        ) for vehicle in vehicles for n in range(maintenances_per_vehicle)
+    )
+    AlertConfiguration.objects.bulk_create(
+        AlertConfiguration(user_profile=profile, service_type=service_type, km_threshold=10000)
+        for service_type, _ in Maintenance.SERVICE_CHOICES_ALERT_CONFIG
+    )
+    Vehicle.objects.filter(user_profile=profile).update(
+        completed_routes_mileage=Decimal('120.00') * routes_per_vehicle
+    )
+    refresh_vehicle_alert_states(profile)
+    refresh_cost_rollups(profile)
+    return profile
+
+
+def dashboard_get_urls(profile, skipped=None):
+    """Yields ``(name, url)`` for every named dashboard URL that answers GET, bound to the profile's objects.
+
+    POST-only endpoints and scheduler (``cron-``) endpoints would mutate the data being measured, so they are
+    reported in ``skipped`` instead.
+    """
+    skipped = {} if skipped is None else skipped
+    for pattern in dashboard_urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name:
+            continue
+        view_class = getattr(pattern.callback, 'view_class', None)
+        if view_class is None or not hasattr(view_class, 'get'):
+            skipped[pattern.name] = "somente POST"
+            continue
+        if pattern.name.startswith('cron-'):
+            skipped[pattern.name] = "tarefa agendada"
+            continue
+        kwargs = {}
+        if 'pk' in pattern.pattern.converters:
+            model = PK_MODELS.get(pattern.name.split('-')[0])
+            obj = model and model.objects.filter(user_profile=profile).order_by('pk').first()
+            if obj is None:
+                skipped[pattern.name] = "sem objeto para o parâmetro pk"
+                continue
+            kwargs['pk'] = obj.pk
+        yield pattern.name, reverse(pattern.name, kwargs=kwargs)
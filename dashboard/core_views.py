@@ -1,10 +1,12 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.utils import timezone
 from .models import Vehicle, Driver, Maintenance
 from accounts.models import UserProfile
+from .middleware import get_profile_or_404
+from .tenant_cache import cached_tenant_stats
 from .forms import (
     UserProfileEditForm, CompanyProfileEditForm
 )
@@ -15,25 +17,17 @@ from .services import get_vehicle_alerts
 
 class DashboardView(LoginRequiredMixin, View):
     def get(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         
-        all_vehicles = list(Vehicle.objects.filter(user_profile=profile))
+        counts = cached_tenant_stats(
+            profile, 'vehicles', Vehicle.objects.filter(user_profile=profile).with_dynamic_status().status_counts
+        )
         vehicle_overview = {
-            'total': len(all_vehicles), 'available': 0, 'in_use': 0,
-            'maintenance': 0, 'unavailable': 0
+            'total': counts['total'], 'available': counts['available'], 'in_use': counts['on_route'],
+            'maintenance': counts['maintenance'], 'unavailable': counts['disabled']
         }
-        for vehicle in all_vehicles:
-            dynamic_slug = vehicle.dynamic_status_slug
-            if dynamic_slug == 'available': vehicle_overview['available'] += 1
-            elif dynamic_slug == 'on_route': vehicle_overview['in_use'] += 1
-            elif dynamic_slug == 'maintenance': vehicle_overview['maintenance'] += 1
-            elif dynamic_slug == 'disabled': vehicle_overview['unavailable'] += 1
         
-        driver_overview = {
-            'total': Driver.objects.filter(user_profile=profile).count(),
-            'active': Driver.objects.filter(user_profile=profile, is_active=True).count(),
-            'inactive': Driver.objects.filter(user_profile=profile, is_active=False).count(),
-        }
+        driver_overview = cached_tenant_stats(profile, 'drivers', Driver.objects.filter(user_profile=profile).status_counts)
         
         now = timezone.now()
         vehicle_alerts = get_vehicle_alerts(profile, limit=5)
@@ -51,10 +45,7 @@ class DashboardView(LoginRequiredMixin, View):
 
 class UserProfileView(LoginRequiredMixin, View):
     def get(self, request):
-        try:
-            profile = request.user.userprofile
-        except UserProfile.DoesNotExist:
-            profile = UserProfile.objects.create(user=request.user)
+        profile = request.profile or UserProfile.objects.create(user=request.user)
 
         user_form = UserProfileEditForm(instance=request.user)
         company_form = CompanyProfileEditForm(instance=profile)
@@ -71,10 +62,7 @@ class UserProfileView(LoginRequiredMixin, View):
         return render(request, 'dashboard/user_profile.html', context)
 
     def post(self, request):
-        try:
-            profile = request.user.userprofile
-        except UserProfile.DoesNotExist:
-            profile = UserProfile.objects.create(user=request.user)
+        profile = request.profile or UserProfile.objects.create(user=request.user)
 
         user_form = UserProfileEditForm(instance=request.user)
         company_form = CompanyProfileEditForm(instance=profile)
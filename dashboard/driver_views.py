@@ -3,12 +3,12 @@ from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from datetime import date
-from django.db.models import Q, Sum, Count
-from django.db.models.functions import Coalesce
-from django.http import JsonResponse
+from django.db.models import Q
 from .models import Driver, Route
-from accounts.models import UserProfile
+from .middleware import get_profile_or_404
+from .tenant_cache import cached_tenant_stats
 from .forms import DriverForm
+from .history import history_response, route_history_entry, route_history_stats
 
 class DriverBaseView(LoginRequiredMixin, View):
     def handle_form_errors(self, request, form):
@@ -20,7 +20,7 @@ class DriverBaseView(LoginRequiredMixin, View):
 
 class DriverListView(DriverBaseView):
     def get(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         
         queryset = Driver.objects.filter(user_profile=profile).order_by('full_name')
         search_query = request.GET.get('search', '')
@@ -31,11 +31,7 @@ class DriverListView(DriverBaseView):
         if status_filter == 'active': queryset = queryset.filter(is_active=True)
         elif status_filter == 'inactive': queryset = queryset.filter(is_active=False)
         
-        stats = {
-            'total': Driver.objects.filter(user_profile=profile).count(),
-            'active': Driver.objects.filter(user_profile=profile, is_active=True).count(),
-            'inactive': Driver.objects.filter(user_profile=profile, is_active=False).count()
-        }
+        stats = cached_tenant_stats(profile, 'drivers', Driver.objects.filter(user_profile=profile).status_counts)
         
         context = {
             'drivers': queryset, 'add_form': DriverForm(), 'stats': stats,
@@ -45,7 +41,7 @@ class DriverListView(DriverBaseView):
 
 class DriverCreateView(DriverBaseView):
     def post(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         form = DriverForm(request.POST)
         if form.is_valid():
             new_driver = form.save(commit=False)
@@ -58,7 +54,7 @@ class DriverCreateView(DriverBaseView):
 
 class DriverUpdateView(DriverBaseView):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         driver = get_object_or_404(Driver, pk=pk, user_profile=profile)
         form = DriverForm(request.POST, instance=driver)
         if form.is_valid():
@@ -70,7 +66,7 @@ class DriverUpdateView(DriverBaseView):
 
 class DriverDeactivateView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         driver = get_object_or_404(Driver, pk=pk, user_profile=profile)
         driver.is_active = False
         driver.demission_date = date.today()
@@ -80,40 +76,12 @@ class DriverDeactivateView(LoginRequiredMixin, View):
 
 class DriverRouteHistoryView(LoginRequiredMixin, View):
     def get(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         driver = get_object_or_404(Driver, pk=pk, user_profile=profile)
         
-        routes = Route.objects.filter(driver=driver, status='completed').select_related('vehicle').order_by('-end_time')
-        stats = routes.aggregate(
-            total_distance=Sum(Coalesce('actual_distance', 'estimated_distance')),
-            total_routes=Count('id'), total_toll=Sum('estimated_toll_cost')
+        routes = Route.objects.filter(driver=driver, status='completed')
+        return history_response(
+            request, routes.history_rows(), ('-end_time', '-id'),
+            lambda row: route_history_entry(row, include_plate=True),
+            lambda: {'stats': route_history_stats(routes)}
         )
-        
-        total_distance = float(stats['total_distance'] or 0.0)
-        total_routes = stats['total_routes'] or 0
-        total_toll_cost = float(stats['total_toll'] or 0.0)
-        
-        history_list = []
-        total_fuel_cost = 0.0
-        
-        for r in routes:
-            route_fuel = float(r.estimated_fuel_cost or 0.0)
-            total_fuel_cost += route_fuel
-            
-            history_list.append({
-                'start_location': r.start_location, 
-                'end_location': r.end_location,
-                'end_time': r.end_time.strftime('%d/%m/%Y %H:%M'),
-                'distance': float(r.actual_distance or r.estimated_distance or 0.0),
-                'fuel_cost': route_fuel, 
-                'toll_cost': float(r.estimated_toll_cost or 0.0),
-                'vehicle_plate': r.vehicle.plate if r.vehicle else 'N/A',
-            })
-            
-        return JsonResponse({
-            'history': history_list,
-            'stats': {
-                'total_distance': total_distance, 'total_routes': total_routes,
-                'total_fuel_cost': total_fuel_cost, 'total_toll_cost': total_toll_cost,
-            }
-        })
\ No newline at end of file
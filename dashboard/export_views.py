@@ -0,0 +1,188 @@
+import csv
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views import View
+
+from .history import STREAM_CHUNK_SIZE
+from .middleware import get_profile_or_404
+from .models import Maintenance, Route, Vehicle
+from .pagination import iterate_keyset
+
+
+CENTS = Decimal('0.01')
+# Spreadsheets run cells starting with these as formulas; a leading quote keeps them as text.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def _decimal(value):
+    # A Decimal, not a str, so a negative amount is not escaped as a formula below.
+    return '' if value is None else Decimal(str(value)).quantize(CENTS)
+
+
+def _escape_formula(cell):
+    if isinstance(cell, str) and cell.startswith(FORMULA_PREFIXES):
+        return "'" + cell
+    return cell
+
+
+def _datetime(value):
+    return timezone.localtime(value).strftime('%d/%m/%Y %H:%M') if value else ''
+
+
+def parse_date_range(request):
+    # ?start / ?end are inclusive YYYY-MM-DD dates, turned into [start 00:00, end+1 00:00) bounds.
+    bounds = []
+    for name, offset in (('start', 0), ('end', 1)):
+        raw = request.GET.get(name)
+        if not raw:
+            bounds.append(None)
+            continue
+        day = parse_date(raw)
+        if day is None:
+            raise ValueError(f"Data inválida em '{name}'. Use AAAA-MM-DD.")
+        bounds.append(timezone.make_aware(datetime.combine(day + timedelta(days=offset), time.min)))
+    return bounds
+
+
+class CsvExportView(LoginRequiredMixin, View):
+    """Streams ``get_rows`` as CSV. Subclasses set ``filename``, ``header`` and ``ordering``.
+
+    ``ordering`` must end in a unique field: rows are read in keyset batches of STREAM_CHUNK_SIZE.
+    """
+    filename = None
+    header = None
+    ordering = ()
+
+    def get_rows(self, profile, start, end):
+        """Returns an unordered ``values()`` queryset that includes the ``ordering`` fields."""
+        raise NotImplementedError
+
+    def serialize(self, row):
+        """Returns the CSV cells for one row, in ``header`` order."""
+        raise NotImplementedError
+
+    def get(self, request):
+        profile = get_profile_or_404(request)
+        try:
+            start, end = parse_date_range(request)
+        except ValueError as exc:
+            return JsonResponse({'success': False, 'errors': {'__all__': [str(exc)]}}, status=400)
+
+        rows = self.get_rows(profile, start, end)
+        writer = csv.writer(Echo())
+
+        def lines():
+            # The BOM makes Excel read the accented headers as UTF-8.
+            yield '\ufeff' + writer.writerow(self.header)
+            for row in iterate_keyset(rows, self.ordering, STREAM_CHUNK_SIZE):
+                yield writer.writerow([_escape_formula(cell) for cell in self.serialize(row)])
+
+        response = StreamingHttpResponse(lines(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{self.filename}"'
+        return response
+
+
+class RouteExportView(CsvExportView):
+    filename = 'rotas.csv'
+    header = (
+        'ID', 'Origem', 'Destino', 'Placa', 'Motorista', 'Início', 'Fim', 'Status',
+        'Distância (km)', 'Custo Combustível', 'Custo Pedágio',
+    )
+    ordering = ('-start_time', '-id')
+
+    def get_rows(self, profile, start, end):
+        # Same search/status filters as RouteListView, plus an optional start_time range.
+        routes = Route.objects.filter(user_profile=profile).with_dynamic_status()
+        search_query = self.request.GET.get('search', '')
+        if search_query:
+            routes = routes.search(search_query)
+        status_filter = self.request.GET.get('status', '')
+        if status_filter:
+            routes = routes.filter(current_status_slug=status_filter)
+        if start:
+            routes = routes.filter(start_time__gte=start)
+        if end:
+            routes = routes.filter(start_time__lt=end)
+        return routes.with_fuel_cost().annotate(
+            distance=Coalesce('actual_distance', 'estimated_distance'),
+            vehicle_plate=F('vehicle__plate'), driver_name=F('driver__full_name'),
+        ).values(
+            'id', 'start_location', 'end_location', 'vehicle_plate', 'driver_name', 'start_time', 'end_time',
+            'current_status_slug', 'distance', 'fuel_cost', 'estimated_toll_cost',
+        )
+
+    def serialize(self, row):
+        return (
+            row['id'], row['start_location'], row['end_location'], row['vehicle_plate'] or '', row['driver_name'] or '',
+            _datetime(row['start_time']), _datetime(row['end_time']), row['current_status_slug'],
+            _decimal(row['distance']), _decimal(row['fuel_cost']), _decimal(row['estimated_toll_cost']),
+        )
+
+
+class MaintenanceExportView(CsvExportView):
+    filename = 'manutencoes.csv'
+    header = (
+        'ID', 'Placa', 'Serviço', 'Oficina', 'Início', 'Fim', 'Conclusão', 'Status',
+        'Quilometragem', 'Custo Estimado', 'Custo Final',
+    )
+    ordering = ('-start_date', '-id')
+
+    def get_rows(self, profile, start, end):
+        # Same search/status filters as MaintenanceListView, plus an optional start_date range.
+        maintenances = Maintenance.objects.filter(user_profile=profile)
+        search_query = self.request.GET.get('search', '')
+        if search_query:
+            maintenances = maintenances.search(search_query)
+        maintenances = maintenances.filter_status(self.request.GET.get('status', ''))
+        if start:
+            maintenances = maintenances.filter(start_date__gte=start)
+        if end:
+            maintenances = maintenances.filter(start_date__lt=end)
+        return maintenances.values(
+            'id', 'vehicle__plate', 'service_type', 'mechanic_shop_name', 'start_date', 'end_date',
+            'actual_end_date', 'status', 'current_mileage', 'estimated_cost', 'actual_cost',
+        )
+
+    def serialize(self, row):
+        return (
+            row['id'], row['vehicle__plate'], row['service_type'], row['mechanic_shop_name'],
+            _datetime(row['start_date']), _datetime(row['end_date']), _datetime(row['actual_end_date']),
+            row['status'], row['current_mileage'], _decimal(row['estimated_cost']), _decimal(row['actual_cost']),
+        )
+
+
+class VehicleCostExportView(CsvExportView):
+    filename = 'custos_veiculos.csv'
+    header = (
+        'Placa', 'Modelo', 'Rotas Concluídas', 'Distância (km)', 'Custo Combustível',
+        'Custo Pedágio', 'Custo Manutenção', 'Custo Total',
+    )
+    ordering = ('plate', 'id')
+
+    def get_rows(self, profile, start, end):
+        vehicles = Vehicle.objects.filter(user_profile=profile)
+        search_query = self.request.GET.get('search', '')
+        if search_query:
+            vehicles = vehicles.filter(plate__icontains=search_query)
+        return vehicles.with_cost_summary(start, end).values(
+            'id', 'plate', 'model', 'route_count', 'route_distance', 'fuel_cost', 'toll_cost', 'maintenance_cost',
+        )
+
+    def serialize(self, row):
+        total = row['fuel_cost'] + row['toll_cost'] + row['maintenance_cost']
+        return (
+            row['plate'], row['model'], row['route_count'], _decimal(row['route_distance']),
+            _decimal(row['fuel_cost']), _decimal(row['toll_cost']), _decimal(row['maintenance_cost']), _decimal(total),
+        )
@@ -5,6 +5,7 @@ from django.db.models import Q
 from django.forms import modelformset_factory
 from django.contrib.auth.models import User
 from accounts.models import UserProfile
+from .services import find_schedule_conflicts
 
 class VehicleForm(forms.ModelForm):
     class Meta:
@@ -74,10 +75,13 @@ class MaintenanceForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         user_profile = kwargs.pop('user_profile', None)
+        vehicles = kwargs.pop('vehicles', None)
         super().__init__(*args, **kwargs)
         
-        if user_profile:
-            self.fields['vehicle'].queryset = Vehicle.objects.filter(user_profile=user_profile).exclude(status='disabled')
+        if vehicles is not None:
+            self.fields['vehicle'].queryset = vehicles
+        elif user_profile:
+            self.fields['vehicle'].queryset = Vehicle.objects.filter(user_profile=user_profile).picker_options()
         else:
             self.fields['vehicle'].queryset = Vehicle.objects.none()
 
@@ -113,16 +117,7 @@ class MaintenanceForm(forms.ModelForm):
         end_date = cleaned_data.get("end_date")
 
         if start_date and end_date and vehicle:
-            conflicting_routes = Route.objects.filter(
-                vehicle=vehicle,
-                start_time__lt=end_date,
-                end_time__gt=start_date
-            ).exclude(status__in=['completed', 'canceled'])
-
-            if self.instance and self.instance.pk:
-                 conflicting_routes = conflicting_routes.exclude(pk=self.instance.pk)
-
-            if conflicting_routes.exists():
+            if find_schedule_conflicts(start_date, end_date, vehicle=vehicle, check_maintenances=False):
                 raise forms.ValidationError(
                     f"Conflito: O veículo {vehicle.plate} já tem uma rota agendada ou em andamento neste período."
                 )
@@ -221,6 +216,8 @@ class RouteForm(forms.ModelForm):
         exclude = ['user_profile']
         widgets = {}
 
+    check_schedule_conflicts = True
+
     def __init__(self, *args, **kwargs):
         user_profile = kwargs.pop('user_profile', None)
         super().__init__(*args, **kwargs)
@@ -257,25 +254,75 @@ class RouteForm(forms.ModelForm):
         if start_time and end_time:
             if start_time >= end_time:
                 raise forms.ValidationError("A data de fim deve ser posterior à data de início.")
-            if vehicle:
-                conflicting_routes = Route.objects.filter(
-                    vehicle=vehicle, start_time__lt=end_time, end_time__gt=start_time
-                ).exclude(pk=self.instance.pk if self.instance else None).exclude(status__in=['completed', 'canceled'])
-                if conflicting_routes.exists():
-                    raise forms.ValidationError(f"Conflito: O veículo {vehicle.plate} já está agendado para outra rota neste período.")
-                conflicting_maintenances = Maintenance.objects.filter(
-                    vehicle=vehicle, start_date__lt=end_time, end_date__gt=start_time
-                ).exclude(status__in=['completed', 'canceled'])
-                if conflicting_maintenances.exists():
-                    raise forms.ValidationError(f"Conflito: O veículo {vehicle.plate} está agendado para manutenção neste período.")
-            if driver:
-                conflicting_driver_routes = Route.objects.filter(
-                    driver=driver, start_time__lt=end_time, end_time__gt=start_time
-                ).exclude(pk=self.instance.pk if self.instance else None).exclude(status__in=['completed', 'canceled'])
-                if conflicting_driver_routes.exists():
-                    raise forms.ValidationError(f"Conflito: O motorista {driver.full_name} já está alocado a outra rota neste período.")
+            if not self.check_schedule_conflicts:
+                return cleaned_data
+            conflicts = find_schedule_conflicts(
+                start_time, end_time, vehicle=vehicle, driver=driver,
+                exclude_route_pk=self.instance.pk if self.instance else None
+            )
+            if conflicts:
+                raise forms.ValidationError(self.conflict_messages(conflicts, vehicle, driver))
         return cleaned_data
 
+    @staticmethod
+    def conflict_messages(conflicts, vehicle, driver):
+        messages = {
+            'vehicle_route': f"Conflito: O veículo {vehicle.plate if vehicle else ''} já está agendado para outra rota neste período.",
+            'vehicle_maintenance': f"Conflito: O veículo {vehicle.plate if vehicle else ''} está agendado para manutenção neste período.",
+            'driver_route': f"Conflito: O motorista {driver.full_name if driver else ''} já está alocado a outra rota neste período.",
+        }
+        return [messages[kind] for kind in conflicts]
+
+
+class RouteImportForm(RouteForm):
+    vehicle = forms.CharField(label="Placa do Veículo")
+    driver = forms.CharField(label="CNH do Motorista")
+    actual_distance = forms.DecimalField(label="Distância Real (km)", max_digits=10, decimal_places=2, min_value=0)
+    estimated_toll_cost = forms.DecimalField(label="Custo Pedágio", max_digits=10, decimal_places=2, required=False)
+    fuel_price_per_liter = forms.DecimalField(label="Preço Combustível (R$/L)", max_digits=6, decimal_places=2, required=False)
+
+    class Meta(RouteForm.Meta):
+        fields = RouteForm.Meta.fields + ['actual_distance', 'estimated_toll_cost', 'fuel_price_per_liter']
+
+    # RouteImporter checks a whole chunk against one prefetched schedule instead of querying per row.
+    check_schedule_conflicts = False
+
+    def __init__(self, *args, vehicles_by_plate=None, drivers_by_license=None, **kwargs):
+        # RouteForm.__init__ narrows model choice querysets; here vehicle and driver are plain text fields
+        # resolved against the importer's lookups, so it is skipped.
+        forms.ModelForm.__init__(self, *args, **kwargs)
+        self.vehicles_by_plate = vehicles_by_plate or {}
+        self.drivers_by_license = drivers_by_license or {}
+
+    def clean_vehicle(self):
+        plate = self.cleaned_data['vehicle'].strip().upper()
+        vehicle = self.vehicles_by_plate.get(plate)
+        if vehicle is None:
+            raise forms.ValidationError(f"Veículo com placa {plate} não encontrado.")
+        return vehicle
+
+    def clean_driver(self):
+        license_number = re.sub(r'[^0-9]', '', self.cleaned_data['driver'])
+        driver = self.drivers_by_license.get(license_number)
+        if driver is None:
+            raise forms.ValidationError(f"Motorista com CNH {license_number} não encontrado.")
+        return driver
+
+    def clean_actual_distance(self):
+        # Route.save() would demote a zero-distance route from completed, but bulk_create skips it.
+        distance = self.cleaned_data['actual_distance']
+        if distance == 0:
+            raise forms.ValidationError("A distância real deve ser maior que zero para uma rota concluída.")
+        return distance
+
+    def save(self, commit=True):
+        instance = super().save(commit=False)
+        instance.status = 'completed'
+        instance.estimated_distance = instance.estimated_distance or instance.actual_distance
+        if commit:
+            instance.save()
+        return instance
+
 
 class RouteCompletionForm(forms.ModelForm):
     actual_distance = forms.DecimalField(
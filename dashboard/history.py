@@ -0,0 +1,82 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .pagination import apaginate_keyset, apply_keyset_cursor, paginate_keyset, parse_limit
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def route_history_entry(row, include_plate=False):
+    entry = {
+        'start_location': row['start_location'], 'end_location': row['end_location'],
+        'end_time': row['end_time'].strftime('%d/%m/%Y %H:%M'),
+        'distance': float(row['distance'] or 0.0),
+        'fuel_cost': float(row['fuel_cost'] or 0.0), 'toll_cost': float(row['estimated_toll_cost'] or 0.0),
+    }
+    if include_plate:
+        entry['vehicle_plate'] = row['vehicle_plate'] or 'N/A'
+    return entry
+
+
+def _route_history_stats(stats):
+    return {
+        'total_distance': float(stats['total_distance'] or 0.0), 'total_routes': stats['total_routes'],
+        'total_fuel_cost': float(stats['total_fuel'] or 0.0), 'total_toll_cost': float(stats['total_toll'] or 0.0),
+    }
+
+
+def route_history_stats(routes):
+    return _route_history_stats(routes.history_totals())
+
+
+async def aroute_history_stats(routes):
+    return _route_history_stats(await routes.ahistory_totals())
+
+
+def maintenance_history_entry(row):
+    return {
+        'service_type': row['service_type'], 'shop_name': row['mechanic_shop_name'],
+        'end_date': row['actual_end_date'].strftime('%d/%m/%Y') if row['actual_end_date'] else 'N/A',
+        'cost': float(row['actual_cost'] or 0.0),
+    }
+
+
+def _ndjson_lines(rows, serialize):
+    for row in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield json.dumps(serialize(row), cls=DjangoJSONEncoder) + '\n'
+
+
+def history_response(request, rows, ordering, serialize, summary):
+    # ?format=ndjson streams every row; otherwise one keyset page is returned, with the
+    # summary aggregate attached only to the first page so later pages stay cheap.
+    after = request.GET.get('after')
+    if request.GET.get('format') == 'ndjson':
+        rows = apply_keyset_cursor(rows, ordering, after)
+        return StreamingHttpResponse(_ndjson_lines(rows, serialize), content_type='application/x-ndjson')
+
+    page, next_cursor = paginate_keyset(rows, ordering, after=after, limit=parse_limit(request.GET.get('limit')))
+    payload = {'history': [serialize(row) for row in page], 'next_cursor': next_cursor}
+    if not after:
+        payload.update(summary())
+    return JsonResponse(payload)
+
+
+async def _andjson_lines(rows, serialize):
+    async for row in rows.aiterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield json.dumps(serialize(row), cls=DjangoJSONEncoder) + '\n'
+
+
+async def ahistory_response(request, rows, ordering, serialize, summary):
+    # Async counterpart of history_response; ``summary`` is a coroutine function.
+    after = request.GET.get('after')
+    if request.GET.get('format') == 'ndjson':
+        rows = apply_keyset_cursor(rows, ordering, after)
+        return StreamingHttpResponse(_andjson_lines(rows, serialize), content_type='application/x-ndjson')
+
+    page, next_cursor = await apaginate_keyset(rows, ordering, after=after, limit=parse_limit(request.GET.get('limit')))
+    payload = {'history': [serialize(row) for row in page], 'next_cursor': next_cursor}
+    if not after:
+        payload.update(await summary())
+    return JsonResponse(payload)
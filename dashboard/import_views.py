@@ -0,0 +1,22 @@
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404, JsonResponse
+from django.views import View
+from .importers import IMPORTERS, ImportFileError, read_rows
+from .middleware import get_profile_or_404
+
+
+class FleetImportView(LoginRequiredMixin, View):
+    def post(self, request, kind):
+        profile = get_profile_or_404(request)
+        importer_class = IMPORTERS.get(kind)
+        if importer_class is None:
+            raise Http404("Tipo de importação desconhecido.")
+        uploaded = request.FILES.get('file')
+        if uploaded is None:
+            return JsonResponse({'success': False, 'errors': {'file': ["Envie um arquivo CSV ou XLSX."]}}, status=400)
+
+        try:
+            report = importer_class(profile).run(read_rows(uploaded.file, uploaded.name))
+        except ImportFileError as exc:
+            return JsonResponse({'success': False, 'errors': {'file': [str(exc)]}}, status=400)
+        return JsonResponse({'success': True, **report.as_dict()})
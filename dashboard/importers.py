@@ -0,0 +1,239 @@
+import csv
+import io
+from bisect import bisect_left, insort
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.db import IntegrityError, transaction
+
+from .forms import DriverForm, RouteForm, RouteImportForm, VehicleForm
+from .models import Driver, Route, Vehicle
+from .services import SCHEDULE_CONFLICT_KINDS, ScheduleConflictIndex, month_start, refresh_cost_rollups, refresh_vehicle_alert_states
+from .tenant_cache import bump_tenant_cache_version
+
+IMPORT_CHUNK_SIZE = 500
+
+
+class ImportFileError(ValueError):
+    pass
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.errors: List[Dict] = []
+
+    def add_error(self, line: int, errors: Dict[str, List[str]]):
+        self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {'created': self.created, 'failed': len(self.errors), 'errors': self.errors}
+
+
+def _normalize_header(header) -> str:
+    return str(header or '').strip().lower()
+
+
+def _csv_rows(stream) -> Iterator[Dict[str, str]]:
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    reader.fieldnames = [_normalize_header(name) for name in reader.fieldnames or []]
+    for row in reader:
+        yield {key: (value or '').strip() for key, value in row.items() if key}
+
+
+def _xlsx_rows(stream) -> Iterator[Dict[str, str]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("Importação de XLSX requer o pacote 'openpyxl'. Envie um arquivo CSV.")
+    sheet = load_workbook(stream, read_only=True, data_only=True).active
+    rows = sheet.iter_rows(values_only=True)
+    headers = [_normalize_header(value) for value in next(rows, ())]
+    for values in rows:
+        yield {
+            header: '' if value is None else str(value).strip()
+            for header, value in zip(headers, values) if header
+        }
+
+
+def read_rows(stream, filename: str) -> Iterator[Dict[str, str]]:
+    # stream is a binary file object; rows are read lazily so large uploads are never loaded whole.
+    if filename.lower().endswith('.xlsx'):
+        return _xlsx_rows(stream)
+    return _csv_rows(stream)
+
+
+def _chunks(rows: Iterable[Dict[str, str]], size: int) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+    # Line numbers start at 2 because line 1 of the file is the header.
+    numbered = ((line, row) for line, row in enumerate(rows, start=2) if any(row.values()))
+    while True:
+        chunk = list(islice(numbered, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _form_errors(form) -> Dict[str, List[str]]:
+    return {field: [str(error) for error in errors] for field, errors in form.errors.items()}
+
+
+class BaseImporter:
+    model = None
+    form_class = None
+
+    def __init__(self, profile, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.profile = profile
+        self.chunk_size = chunk_size
+        self.report = ImportReport()
+        self._seen_keys = set()
+
+    def build_form(self, row):
+        # Bound to a tenant instance so the forms' uniqueness checks are scoped like in the create views.
+        return self.form_class(data=row, instance=self.model(user_profile=self.profile))
+
+    def unique_keys(self, obj) -> List[Tuple[str, str]]:
+        return []
+
+    def check_chunk(self, valid):
+        return valid
+
+    def after_chunk(self, objs):
+        pass
+
+    def finish(self):
+        bump_tenant_cache_version(self.profile.pk)
+
+    def run(self, rows: Iterable[Dict[str, str]]) -> ImportReport:
+        for chunk in _chunks(rows, self.chunk_size):
+            valid = []
+            for line, row in chunk:
+                form = self.build_form(row)
+                if not form.is_valid():
+                    self.report.add_error(line, _form_errors(form))
+                    continue
+                obj = form.save(commit=False)
+                duplicated = [field for field, value in self.unique_keys(obj) if (field, value) in self._seen_keys]
+                if duplicated:
+                    self.report.add_error(line, {field: ["Valor repetido no arquivo."] for field in duplicated})
+                    continue
+                self._seen_keys.update(self.unique_keys(obj))
+                valid.append((line, obj))
+            valid = self.check_chunk(valid)
+            with transaction.atomic():
+                self.after_chunk(self._write(valid))
+        self.report.errors.sort(key=lambda error: error['line'])
+        if self.report.created:
+            self.finish()
+        return self.report
+
+    def _write(self, valid):
+        try:
+            with transaction.atomic():
+                created = self.model.objects.bulk_create([obj for _, obj in valid])
+        except IntegrityError:
+            # A row raced a concurrent write; retry one by one so only the offending rows fail.
+            created = []
+            for line, obj in valid:
+                try:
+                    with transaction.atomic():
+                        created.extend(self.model.objects.bulk_create([obj]))
+                except IntegrityError as exc:
+                    self.report.add_error(line, {'__all__': [str(exc)]})
+        self.report.created += len(created)
+        return created
+
+
+class VehicleImporter(BaseImporter):
+    model = Vehicle
+    form_class = VehicleForm
+
+    def unique_keys(self, obj):
+        return [('plate', obj.plate.upper())]
+
+    def finish(self):
+        super().finish()
+        refresh_vehicle_alert_states(self.profile)
+
+
+class DriverImporter(BaseImporter):
+    model = Driver
+    form_class = DriverForm
+
+    def unique_keys(self, obj):
+        return [('email', obj.email.lower()), ('license_number', obj.license_number)]
+
+
+class RouteImporter(BaseImporter):
+    model = Route
+    form_class = RouteImportForm
+
+    def __init__(self, profile, chunk_size: int = IMPORT_CHUNK_SIZE):
+        super().__init__(profile, chunk_size)
+        self.vehicles_by_plate = {v.plate.upper(): v for v in Vehicle.objects.filter(user_profile=profile)}
+        self.drivers_by_license = {d.license_number: d for d in Driver.objects.filter(user_profile=profile)}
+        self.touched_vehicle_ids = set()
+        self.touched_cells = set()
+        # Imported routes are completed, so the schedule index does not see them once written: the accepted
+        # periods of each vehicle and driver are kept here, sorted and disjoint, across chunks.
+        self.accepted_periods = defaultdict(list)
+
+    def build_form(self, row):
+        return self.form_class(
+            data=row, instance=Route(user_profile=self.profile),
+            vehicles_by_plate=self.vehicles_by_plate, drivers_by_license=self.drivers_by_license,
+        )
+
+    def check_chunk(self, valid):
+        if not valid:
+            return valid
+        routes = [route for _, route in valid]
+        schedule = ScheduleConflictIndex(
+            min(route.start_time for route in routes), max(route.end_time for route in routes),
+            vehicle_ids={route.vehicle_id for route in routes}, driver_ids={route.driver_id for route in routes},
+        )
+        checked = []
+        for line, route in valid:
+            conflicts = set(schedule.find(route.start_time, route.end_time, vehicle=route.vehicle, driver=route.driver))
+            owners = {'vehicle_route': route.vehicle_id, 'driver_route': route.driver_id}
+            conflicts.update(
+                kind for kind, owner_id in owners.items()
+                if self._overlaps_accepted((kind, owner_id), route.start_time, route.end_time)
+            )
+            if conflicts:
+                conflicts = [kind for kind in SCHEDULE_CONFLICT_KINDS if kind in conflicts]
+                self.report.add_error(line, {'__all__': RouteForm.conflict_messages(conflicts, route.vehicle, route.driver)})
+            else:
+                for key in owners.items():
+                    insort(self.accepted_periods[key], (route.start_time, route.end_time))
+                checked.append((line, route))
+        return checked
+
+    def _overlaps_accepted(self, key, start, end):
+        # Periods are disjoint, so the last one starting before ``end`` is the only candidate.
+        periods = self.accepted_periods[key]
+        index = bisect_left(periods, (end,))
+        return index > 0 and periods[index - 1][1] > start
+
+    def after_chunk(self, objs):
+        # bulk_create skips Route.save() and signals, so odometer deltas are applied here per vehicle.
+        deltas = defaultdict(Decimal)
+        for route in objs:
+            deltas[route.vehicle_id] += Route.odometer_contribution(route.status, route.actual_distance, route.estimated_distance)
+        for vehicle_id, delta in deltas.items():
+            Vehicle.apply_odometer_delta(vehicle_id, delta)
+        self.touched_vehicle_ids.update(deltas)
+        self.touched_cells.update((route.vehicle_id, month_start(route.end_time)) for route in objs)
+
+    def finish(self):
+        super().finish()
+        refresh_vehicle_alert_states(self.profile, vehicle_ids=self.touched_vehicle_ids)
+        refresh_cost_rollups(self.profile, self.touched_cells)
+
+
+IMPORTERS = {
+    'vehicles': VehicleImporter,
+    'drivers': DriverImporter,
+    'routes': RouteImporter,
+}
@@ -3,17 +3,19 @@ from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q
 from .models import Maintenance, Vehicle
-from accounts.models import UserProfile
+from .middleware import get_profile_or_404
+from .tenant_cache import cached_tenant_stats
 from .forms import (
     MaintenanceForm, MaintenanceCompletionForm
 )
 
+VEHICLE_PICKER_INLINE_LIMIT = 200
+
 
 class MaintenanceCreateView(LoginRequiredMixin, View):
     def post(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         form = MaintenanceForm(request.POST, user_profile=profile)
         if form.is_valid():
             new_maint = form.save(commit=False)
@@ -30,7 +32,7 @@ class MaintenanceCreateView(LoginRequiredMixin, View):
 
 class MaintenanceUpdateView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         maintenance = get_object_or_404(Maintenance, pk=pk, user_profile=profile)
         form = MaintenanceForm(request.POST, instance=maintenance, user_profile=profile)
         if form.is_valid():
@@ -46,7 +48,7 @@ class MaintenanceUpdateView(LoginRequiredMixin, View):
 
 class MaintenanceCancelView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         maintenance = get_object_or_404(Maintenance, pk=pk, user_profile=profile)
         maintenance.status = 'canceled'
         maintenance.save()
@@ -55,7 +57,7 @@ class MaintenanceCancelView(LoginRequiredMixin, View):
 
 class MaintenanceCompleteView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         maintenance = get_object_or_404(Maintenance, pk=pk, user_profile=profile)
         form = MaintenanceCompletionForm(request.POST, instance=maintenance)
         if form.is_valid():
@@ -71,37 +73,37 @@ class MaintenanceCompleteView(LoginRequiredMixin, View):
 
 class MaintenanceListView(LoginRequiredMixin, View):
     def get(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         
         queryset = Maintenance.objects.filter(user_profile=profile).select_related('vehicle').order_by('-start_date')
         search_query = request.GET.get('search', '')
         if search_query:
-            queryset = queryset.filter(Q(vehicle__plate__icontains=search_query) | Q(service_type__icontains=search_query) | Q(mechanic_shop_name__icontains=search_query))
+            queryset = queryset.search(search_query)
         
         status_filter = request.GET.get('status', '')
         now = timezone.now()
-        if status_filter == 'scheduled': queryset = queryset.filter(status__in=['scheduled', 'in_progress'], start_date__gt=now)
-        elif status_filter == 'in_progress': queryset = queryset.filter(status__in=['scheduled', 'in_progress'], start_date__lte=now, end_date__gte=now)
-        elif status_filter == 'overdue': queryset = queryset.filter(status__in=['scheduled', 'in_progress'], end_date__lt=now)
-        elif status_filter == 'completed': queryset = queryset.filter(status='completed')
-        elif status_filter == 'canceled': queryset = queryset.filter(status='canceled')
+        queryset = queryset.filter_status(status_filter, now)
         
-        stats = {
+        stats = cached_tenant_stats(profile, 'maintenances', lambda: {
             'total': Maintenance.objects.filter(user_profile=profile).count(),
             'scheduled': Maintenance.objects.filter(user_profile=profile, status__in=['scheduled', 'in_progress'], start_date__gt=now).count(),
             'in_progress': Maintenance.objects.filter(user_profile=profile, status__in=['scheduled', 'in_progress'], start_date__lte=now, end_date__gte=now).count(),
             'completed': Maintenance.objects.filter(user_profile=profile, status='completed').count(),
-        }
+        })
         
         status_choices_for_filter = list(Maintenance.STATUS_CHOICES)
         status_choices_for_filter.append(('overdue', 'Atrasada'))
         
-        all_active_vehicles = Vehicle.objects.filter(user_profile=profile).exclude(status='disabled').order_by('plate')
+        active_vehicles = Vehicle.objects.filter(user_profile=profile).picker_options()
+        # Large fleets get the first options inline and search the rest through vehicle-search.
+        picker_vehicles = list(active_vehicles[:VEHICLE_PICKER_INLINE_LIMIT + 1])
+        picker_truncated = len(picker_vehicles) > VEHICLE_PICKER_INLINE_LIMIT
         
         context = {
-            'maintenances': queryset, 'add_form': MaintenanceForm(user_profile=profile),
+            'maintenances': queryset, 'add_form': MaintenanceForm(vehicles=active_vehicles),
             'completion_form': MaintenanceCompletionForm(), 'stats': stats,
             'search_query': search_query, 'status_choices': status_choices_for_filter,
-            'status_filter': status_filter, 'all_active_vehicles': all_active_vehicles,
+            'status_filter': status_filter, 'all_active_vehicles': picker_vehicles[:VEHICLE_PICKER_INLINE_LIMIT],
+            'vehicle_picker_truncated': picker_truncated,
         }
         return render(request, 'dashboard/maintenance.html', context)
\ No newline at end of file
@@ -0,0 +1,119 @@
+import json
+import math
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from dashboard.benchmarks import dashboard_get_urls, seed_fleet
+
+DEFAULT_SIZES = '10,1000,10000'
+# Latency changes smaller than this are noise at the millisecond scale of the small tenants.
+MIN_LATENCY_DELTA_MS = 5
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula empresas sintéticas (10, 1 mil e 10 mil veículos por padrão, dentro de uma transação desfeita ao "
+        "final), mede todas as URLs GET do dashboard e grava um relatório JSON com consultas SQL e latências p50/p95."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=DEFAULT_SIZES, help="Quantidades de veículos separadas por vírgula.")
+        parser.add_argument('--repeat', type=int, default=5, help="Requisições medidas por URL.")
+        parser.add_argument('--routes-per-vehicle', type=int, default=20)
+        parser.add_argument('--maintenances-per-vehicle', type=int, default=5)
+        parser.add_argument('--output', help="Arquivo onde o relatório JSON é gravado.")
+        parser.add_argument('--baseline', help="Relatório JSON anterior para comparação.")
+        parser.add_argument('--tolerance', type=float, default=0.25, help="Aumento de p95 tolerado sobre a linha de base.")
+        parser.add_argument('--fail-on-regression', action='store_true', help="Encerra com erro se houver regressão.")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError("--sizes deve ser uma lista de inteiros, ex: 10,1000,10000.")
+
+        report = {
+            'generated_at': timezone.now().isoformat(), 'database': connection.vendor,
+            'repeat': options['repeat'], 'sizes': {}, 'skipped': {},
+        }
+        for size in sizes:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{size} veículo(s)"))
+            report['sizes'][str(size)] = self.run_size(size, options, report['skipped'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Relatório gravado em {options['output']}."))
+
+        if options['baseline']:
+            regressions = self.compare(report, options['baseline'], options['tolerance'])
+            for regression in regressions:
+                self.stdout.write(self.style.WARNING(regression))
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"{len(regressions)} regressão(ões) em relação à linha de base.")
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS("Nenhuma regressão em relação à linha de base."))
+
+    def run_size(self, size, options, skipped):
+        results = {}
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            profile = seed_fleet(size, options['routes_per_vehicle'], options['maintenances_per_vehicle'])
+            client = Client()
+            client.force_login(profile.user)
+            for name, url in dashboard_get_urls(profile, skipped):
+                results[name] = self.measure(client, url, options['repeat'])
+                result = results[name]
+                self.stdout.write(
+                    f"  {name:<32} {result['status']} {result['queries']:>5} consultas  "
+                    f"p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms"
+                )
+            transaction.set_rollback(True)
+        return results
+
+    def measure(self, client, url, repeat):
+        timings, queries, status = [], None, None
+        for _ in range(max(1, repeat)):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                if response.streaming:
+                    for _ in response.streaming_content:
+                        pass
+                timings.append((time.perf_counter() - started) * 1000)
+            # The first (cold cache) request is the one whose query count is reported.
+            if queries is None:
+                queries, status = len(captured), response.status_code
+        return {
+            'url': url, 'status': status, 'queries': queries,
+            'p50_ms': round(percentile(timings, 0.5), 2), 'p95_ms': round(percentile(timings, 0.95), 2),
+        }
+
+    def compare(self, report, baseline_path, tolerance):
+        try:
+            with open(baseline_path, encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Não foi possível ler a linha de base: {exc}")
+
+        regressions = []
+        for size, results in report['sizes'].items():
+            for name, result in results.items():
+                previous = baseline.get('sizes', {}).get(size, {}).get(name)
+                if previous is None:
+                    continue
+                if result['queries'] > previous['queries']:
+                    regressions.append(f"[{size}] {name}: {previous['queries']} -> {result['queries']} consultas")
+                limit = max(previous['p95_ms'] * (1 + tolerance), previous['p95_ms'] + MIN_LATENCY_DELTA_MS)
+                if result['p95_ms'] > limit:
+                    regressions.append(f"[{size}] {name}: p95 {previous['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+        return regressions
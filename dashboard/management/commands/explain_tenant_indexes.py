@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from dashboard.benchmarks import seed_fleet
+from dashboard.models import AlertConfiguration, Driver, Maintenance, Route, Vehicle
+
+TENANT_INDEXES = [
+    'driver_tenant_name_idx', 'driver_tenant_active_idx', 'vehicle_tenant_plate_idx',
+    'maint_tenant_start_idx', 'maint_tenant_status_idx', 'route_tenant_start_idx',
+    'alertcfg_tenant_service_idx',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula um tenant grande (dentro de uma transação desfeita ao final) e mostra o EXPLAIN QUERY PLAN "
+        "das listagens com e sem os índices compostos por tenant. Apenas SQLite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=1000, help="Quantidade de veículos do tenant sintético.")
+        parser.add_argument('--repeat', type=int, default=5, help="Execuções por consulta na medição de tempo.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Este benchmark usa EXPLAIN QUERY PLAN e DROP INDEX transacional do SQLite.")
+
+        with transaction.atomic():
+            profile = seed_fleet(options['vehicles'])
+            connection.cursor().execute("ANALYZE")
+            queries = self.list_queries(profile)
+            after = {label: self.measure(qs, 'depois', options['repeat']) for label, qs in queries}
+            with connection.cursor() as cursor:
+                for name in TENANT_INDEXES:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+            before = {label: self.measure(qs, 'antes', options['repeat']) for label, qs in queries}
+            transaction.set_rollback(True)
+
+        for label, _ in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for stage, results in (('antes', before), ('depois', after)):
+                plan, elapsed = results[label]
+                self.stdout.write(f"  [{stage}] {elapsed * 1000:.2f} ms")
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+    def measure(self, queryset, stage, repeat):
+        # The stage marker keeps sqlite3's statement cache from replaying a plan prepared before DROP INDEX.
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql} /* {stage} */", params)
+            plan = "\n".join(str(row[-1]) for row in cursor.fetchall())
+        started = time.perf_counter()
+        for _ in range(repeat):
+            list(queryset.all())
+        return plan, (time.perf_counter() - started) / repeat
+
+    def list_queries(self, profile):
+        return [
+            ("Rotas (ordenadas por início)", Route.objects.filter(user_profile=profile).order_by('-start_time', '-id')[:50]),
+            ("Manutenções (ordenadas por início)", Maintenance.objects.filter(user_profile=profile).order_by('-start_date')[:50]),
+            ("Manutenções concluídas", Maintenance.objects.filter(user_profile=profile, status='completed').order_by('-start_date')[:50]),
+            ("Veículos (ordenados por placa)", Vehicle.objects.filter(user_profile=profile).order_by('plate')[:50]),
+            ("Motoristas (ordenados por nome)", Driver.objects.filter(user_profile=profile).order_by('full_name')[:50]),
+            ("Motoristas ativos", Driver.objects.filter(user_profile=profile, is_active=True).order_by('full_name')[:50]),
+            ("Alertas (ordenados por serviço)", AlertConfiguration.objects.filter(user_profile=profile).order_by('service_type')),
+        ]
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import UserProfile
+from dashboard.importers import IMPORTERS, IMPORT_CHUNK_SIZE, ImportFileError, read_rows
+
+
+class Command(BaseCommand):
+    help = "Importa veículos, motoristas ou rotas históricas de um arquivo CSV/XLSX para uma empresa."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS), help="Tipo de registro a importar.")
+        parser.add_argument('path', help="Caminho do arquivo CSV ou XLSX.")
+        parser.add_argument('--profile', type=int, required=True, help="ID do perfil da empresa.")
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help="Linhas por lote gravado.")
+
+    def handle(self, *args, **options):
+        try:
+            profile = UserProfile.objects.get(pk=options['profile'])
+        except UserProfile.DoesNotExist:
+            raise CommandError(f"Perfil {options['profile']} não encontrado.")
+
+        importer = IMPORTERS[options['kind']](profile, chunk_size=options['chunk_size'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = importer.run(read_rows(stream, options['path']))
+        except (OSError, ImportFileError) as exc:
+            raise CommandError(str(exc))
+
+        for error in report.errors:
+            details = "; ".join(f"{field}: {' '.join(messages)}" for field, messages in error['errors'].items())
+            self.stdout.write(self.style.WARNING(f"Linha {error['line']}: {details}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{report.created} registro(s) importado(s), {len(report.errors)} linha(s) com erro."
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import UserProfile
+from dashboard.models import FleetCostRollup
+from dashboard.services import refresh_cost_rollups
+
+
+class Command(BaseCommand):
+    help = "Reconstrói os custos mensais por veículo (FleetCostRollup) a partir das rotas e manutenções concluídas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', type=int, help="ID do perfil da empresa. Sem ele, todas as empresas são reconstruídas.")
+        parser.add_argument(
+            '--if-empty', action='store_true',
+            help="Só reconstrói se ainda não houver custos mensais gravados (primeiro deploy). Usado no app.yaml.",
+        )
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and FleetCostRollup.objects.exists():
+            self.stdout.write("Custos mensais já calculados; nada a fazer.")
+            return
+        profile_ids = list(UserProfile.objects.order_by('pk').values_list('pk', flat=True))
+        if options['profile'] is not None:
+            if options['profile'] not in profile_ids:
+                raise CommandError(f"Perfil {options['profile']} não encontrado.")
+            profile_ids = [options['profile']]
+        total = sum(refresh_cost_rollups(profile_id) for profile_id in profile_ids)
+        self.stdout.write(self.style.SUCCESS(f"{total} registro(s) mensal(is) gerado(s) para {len(profile_ids)} empresa(s)."))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from dashboard.models import Vehicle, Route
+
+
+class Command(BaseCommand):
+    help = "Recalcula a quilometragem dos veículos a partir do histórico de rotas concluídas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Apenas verifica divergências, sem corrigir.")
+
+    def handle(self, *args, **options):
+        route_totals = Route.objects.filter(vehicle=OuterRef('pk'), status='completed').values('vehicle').annotate(
+            total=Sum(Coalesce('actual_distance', 'estimated_distance'), output_field=models.DecimalField())
+        ).values('total')
+        computed = Coalesce(
+            Subquery(route_totals, output_field=models.DecimalField()), Value(0), output_field=models.DecimalField()
+        )
+
+        with transaction.atomic():
+            vehicles = Vehicle.objects.select_for_update().annotate(computed_mileage=computed).order_by('pk')
+            mismatches = [v for v in vehicles if v.completed_routes_mileage != v.computed_mileage]
+            for vehicle in mismatches:
+                self.stdout.write(
+                    f"{vehicle.plate}: armazenado {vehicle.completed_routes_mileage} km, "
+                    f"histórico {vehicle.computed_mileage} km"
+                )
+            if options['check']:
+                if mismatches:
+                    raise CommandError(f"{len(mismatches)} veículo(s) com quilometragem divergente.")
+                self.stdout.write(self.style.SUCCESS("Quilometragem consistente com o histórico de rotas."))
+                return
+            for vehicle in mismatches:
+                Vehicle.objects.filter(pk=vehicle.pk).update(completed_routes_mileage=vehicle.computed_mileage)
+
+        self.stdout.write(self.style.SUCCESS(f"{len(mismatches)} veículo(s) corrigido(s)."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.services import refresh_diesel_prices
+
+
+class Command(BaseCommand):
+    help = "Atualiza a tabela local de preços do diesel por UF a partir da API de combustível."
+
+    def handle(self, *args, **options):
+        result = refresh_diesel_prices()
+        if isinstance(result, str):
+            raise CommandError(result)
+        self.stdout.write(self.style.SUCCESS(f"Preços do diesel atualizados para {result} UF(s)."))
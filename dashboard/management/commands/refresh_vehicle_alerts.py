@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from dashboard.models import VehicleAlertState
+from dashboard.services import refresh_all_vehicle_alert_states
+
+
+class Command(BaseCommand):
+    help = "Recalcula os alertas de manutenção de todos os veículos. Agende diariamente para avançar os limites em dias."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-empty', action='store_true',
+            help="Só recalcula se ainda não houver alertas gravados (primeiro deploy). Usado no app.yaml.",
+        )
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and VehicleAlertState.objects.exists():
+            self.stdout.write("Alertas já calculados; nada a fazer.")
+            return
+        total, tenants = refresh_all_vehicle_alert_states()
+        self.stdout.write(self.style.SUCCESS(f"{total} alerta(s) recalculado(s) para {tenants} empresa(s)."))
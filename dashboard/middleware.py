@@ -1,14 +1,190 @@
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import Http404
 from django.utils.cache import add_never_cache_headers
+from accounts.models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+REPEATED_QUERIES_LOGGED = 3
+
+
+def profile_cache_key(user_id):
+    return f"user_profile:{user_id}"
+
+
+def get_cached_profile(user):
+    if not user.is_authenticated:
+        return None
+    key = profile_cache_key(user.pk)
+    profile = cache.get(key)
+    if profile is None:
+        profile = UserProfile.objects.filter(user_id=user.pk).first()
+        if profile is not None:
+            cache.set(key, profile, settings.PROFILE_CACHE_TIMEOUT)
+    return profile
+
+
+async def aget_cached_profile(user):
+    if not user.is_authenticated:
+        return None
+    key = profile_cache_key(user.pk)
+    profile = await cache.aget(key)
+    if profile is None:
+        profile = await UserProfile.objects.filter(user_id=user.pk).afirst()
+        if profile is not None:
+            await cache.aset(key, profile, settings.PROFILE_CACHE_TIMEOUT)
+    return profile
+
+
+def get_profile_or_404(request):
+    if request.profile is None:
+        raise Http404("Perfil da empresa não encontrado.")
+    return request.profile
+
+
+class AsyncCapableMiddleware:
+    # Every middleware in the chain must support async, otherwise Django runs the async views
+    # on a worker thread under ASGI and they lose their concurrency.
+    sync_capable = True
+    async_capable = True
 
-class NeverCacheAuthenticatedMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class NeverCacheAuthenticatedMiddleware(AsyncCapableMiddleware):
+    def handle(self, request):
         response = self.get_response(request)
 
         if request.user.is_authenticated:
 
             add_never_cache_headers(response)
         
-        return response
\ No newline at end of file
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if (await request.auser()).is_authenticated:
+            add_never_cache_headers(response)
+        return response
+
+
+class UserProfileMiddleware(AsyncCapableMiddleware):
+    def handle(self, request):
+        request.profile = get_cached_profile(request.user)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.profile = await aget_cached_profile(await request.auser())
+        return await self.get_response(request)
+
+
+def query_fingerprint(sql):
+    # Literals become placeholders so the same statement with different values (or a
+    # variable-length IN list) groups together, whether or not params were interpolated.
+    sql = re.sub(r"'(?:[^']|'')*'", '%s', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '%s', sql)
+    sql = re.sub(r'IN \((?:%s, )*%s\)', 'IN (...)', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, limit):
+        fingerprints = Counter()
+        for sql, count in self.statements.items():
+            fingerprints[query_fingerprint(sql)] += count
+        return [(sql, count) for sql, count in fingerprints.most_common(limit) if count > 1]
+
+
+def _is_sampled():
+    sample_rate = getattr(settings, 'REQUEST_PROFILING_SAMPLE_RATE', 0)
+    return sample_rate and random.random() < sample_rate
+
+
+def _record_queries(stack, recorder):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+
+
+class RequestProfilingMiddleware(AsyncCapableMiddleware):
+    """Samples requests and reports wall time, SQL count and SQL time.
+
+    Enabled by REQUEST_PROFILING_SAMPLE_RATE (0 disables it, 1 profiles every request). Sampled responses
+    get a Server-Timing header; those over REQUEST_PROFILING_SLOW_MS or REQUEST_PROFILING_MAX_QUERIES are
+    logged with their most repeated query fingerprints.
+    """
+
+    def handle(self, request):
+        if not _is_sampled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            _record_queries(stack, recorder)
+            response = self.get_response(request)
+        return self.report(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        if not _is_sampled():
+            return await self.get_response(request)
+
+        # Connections are per thread; the async ORM runs on the request's thread-sensitive
+        # executor, so the wrappers are installed (and removed) there.
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(_record_queries)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, recorder, started)
+
+    def report(self, request, response, recorder, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.duration * 1000
+
+        response['Server-Timing'] = (
+            f'app;dur={total_ms:.1f}, db;dur={db_ms:.1f};desc="{recorder.count} queries"'
+        )
+        if total_ms >= getattr(settings, 'REQUEST_PROFILING_SLOW_MS', 500) or \
+                recorder.count >= getattr(settings, 'REQUEST_PROFILING_MAX_QUERIES', 50):
+            repeated = recorder.repeated(REPEATED_QUERIES_LOGGED)
+            logger.warning(
+                "Requisição lenta %s %s: %.1f ms, %d consulta(s) SQL em %.1f ms.%s",
+                request.method, request.path, total_ms, recorder.count, db_ms,
+                "".join(f"\n  {count}x {sql}" for sql, count in repeated),
+            )
+        return response
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-17 19:57
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_completed_routes_mileage(apps, schema_editor):
+    Vehicle = apps.get_model('dashboard', 'Vehicle')
+    Route = apps.get_model('dashboard', 'Route')
+    totals = Route.objects.filter(vehicle=OuterRef('pk'), status='completed').values('vehicle').annotate(
+        total=Sum(Coalesce('actual_distance', 'estimated_distance'), output_field=models.DecimalField())
+    ).values('total')
+    Vehicle.objects.update(completed_routes_mileage=Coalesce(
+        Subquery(totals, output_field=models.DecimalField()), Value(0), output_field=models.DecimalField()
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_alertconfiguration_user_profile_driver_user_profile_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='completed_routes_mileage',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='Quilometragem em Rotas Concluídas'),
+        ),
+        migrations.RunPython(populate_completed_routes_mileage, migrations.RunPython.noop),
+    ]
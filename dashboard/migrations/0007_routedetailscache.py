@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_vehicle_completed_routes_mileage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteDetailsCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_key', models.CharField(max_length=255, verbose_name='Origem Normalizada')),
+                ('end_key', models.CharField(max_length=255, verbose_name='Destino Normalizado')),
+                ('distance', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Distância (km)')),
+                ('toll_cost', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Custo Pedágio')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Cache de Rota',
+                'verbose_name_plural': 'Cache de Rotas',
+                'constraints': [models.UniqueConstraint(fields=('start_key', 'end_key'), name='unique_route_details_cache_pair')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_routedetailscache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FuelPriceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fuel_type', models.CharField(default='diesel', max_length=20, verbose_name='Combustível')),
+                ('uf', models.CharField(max_length=2, verbose_name='UF')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=6, verbose_name='Preço (R$/L)')),
+                ('fetched_at', models.DateTimeField(verbose_name='Consultado em')),
+            ],
+            options={
+                'verbose_name': 'Preço de Combustível',
+                'verbose_name_plural': 'Preços de Combustível',
+                'constraints': [models.UniqueConstraint(fields=('fuel_type', 'uf'), name='unique_fuel_price_snapshot_uf')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_remove_userprofile_demission_date_and_more'),
+        ('dashboard', '0008_fuelpricesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['vehicle', 'status', 'start_date', 'end_date'], name='maint_vehicle_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['vehicle', 'status', 'start_time', 'end_time'], name='route_vehicle_sched_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['driver', 'status', 'start_time', 'end_time'], name='route_driver_sched_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_remove_userprofile_demission_date_and_more'),
+        ('dashboard', '0009_schedule_conflict_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alertconfiguration',
+            index=models.Index(fields=['user_profile', 'service_type'], name='alertcfg_tenant_service_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='driver',
+            index=models.Index(fields=['user_profile', 'full_name'], name='driver_tenant_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='driver',
+            index=models.Index(fields=['user_profile', 'is_active', 'full_name'], name='driver_tenant_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['user_profile', 'start_date'], name='maint_tenant_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['user_profile', 'status', 'start_date'], name='maint_tenant_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='route',
+            index=models.Index(fields=['user_profile', 'start_time'], name='route_tenant_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['user_profile', 'plate'], name='vehicle_tenant_plate_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_remove_userprofile_demission_date_and_more'),
+        ('dashboard', '0010_tenant_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleAlertState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_type', models.CharField(max_length=100, verbose_name='Tipo de Serviço')),
+                ('message', models.CharField(max_length=100, verbose_name='Mensagem')),
+                ('priority', models.CharField(choices=[('low', 'Baixa'), ('medium', 'Média'), ('high', 'Alta')], max_length=10, verbose_name='Prioridade')),
+                ('priority_rank', models.PositiveSmallIntegerField(verbose_name='Ordem da Prioridade')),
+                ('overdue_value', models.IntegerField(verbose_name='Atraso')),
+                ('overdue_unit', models.CharField(max_length=4, verbose_name='Unidade do Atraso')),
+                ('unit_rank', models.PositiveSmallIntegerField(verbose_name='Ordem da Unidade')),
+                ('computed_on', models.DateField(verbose_name='Calculado em')),
+                ('user_profile', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='accounts.userprofile', verbose_name='Perfil da Empresa')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alert_states', to='dashboard.vehicle', verbose_name='Veículo')),
+            ],
+            options={
+                'verbose_name': 'Alerta de Veículo',
+                'verbose_name_plural': 'Alertas de Veículos',
+                'indexes': [models.Index(fields=['user_profile', '-priority_rank', '-unit_rank', '-overdue_value'], name='alertstate_tenant_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vehicle', 'service_type'), name='unique_vehicle_alert_state')],
+            },
+        ),
+    ]
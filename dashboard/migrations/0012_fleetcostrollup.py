@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_remove_userprofile_demission_date_and_more'),
+        ('dashboard', '0011_vehiclealertstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FleetCostRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Mês')),
+                ('route_count', models.PositiveIntegerField(default=0, verbose_name='Rotas Concluídas')),
+                ('distance', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Distância (km)')),
+                ('fuel_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Custo Combustível')),
+                ('toll_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Custo Pedágio')),
+                ('maintenance_count', models.PositiveIntegerField(default=0, verbose_name='Manutenções Concluídas')),
+                ('maintenance_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Custo Manutenção')),
+                ('user_profile', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='accounts.userprofile', verbose_name='Perfil da Empresa')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_rollups', to='dashboard.vehicle', verbose_name='Veículo')),
+            ],
+            options={
+                'verbose_name': 'Custo Mensal da Frota',
+                'verbose_name_plural': 'Custos Mensais da Frota',
+                'indexes': [models.Index(fields=['user_profile', 'month'], name='rollup_tenant_month_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vehicle', 'month'), name='unique_vehicle_cost_month')],
+            },
+        ),
+    ]
@@ -1,11 +1,21 @@
-from django.db import models
-from django.db.models import Sum, Q
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Prefetch, Q, Subquery, Sum, Value, When
 from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.text import slugify
 from datetime import date, datetime
 from accounts.models import UserProfile
 
+class DriverQuerySet(models.QuerySet):
+    def status_counts(self):
+        return self.aggregate(
+            total=Count('pk'),
+            active=Count('pk', filter=Q(is_active=True)),
+            inactive=Count('pk', filter=Q(is_active=False)),
+        )
+
+
 class Driver(models.Model):
     user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Perfil da Empresa")
     full_name = models.CharField(max_length=100, verbose_name="Nome Completo")
@@ -16,9 +26,79 @@ class Driver(models.Model):
     is_active = models.BooleanField(default=True, verbose_name="Ativo")
     demission_date = models.DateField(null=True, blank=True, verbose_name="Data de Demissão")
 
+    objects = DriverQuerySet.as_manager()
+
     def __str__(self):
         return self.full_name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_profile', 'full_name'], name='driver_tenant_name_idx'),
+            models.Index(fields=['user_profile', 'is_active', 'full_name'], name='driver_tenant_active_idx'),
+        ]
+
+class VehicleQuerySet(models.QuerySet):
+    def with_dynamic_status(self, now=None):
+        now = now or timezone.now()
+        in_maintenance = Maintenance.objects.filter(Vehicle.blocking_maintenance_q(now), vehicle=OuterRef('pk'))
+        on_route = Route.objects.filter(Vehicle.active_route_q(now), vehicle=OuterRef('pk')).exclude(
+            status__in=['completed', 'canceled']
+        )
+        return self.annotate(current_status_slug=Case(
+            When(status='disabled', then=Value('disabled')),
+            When(Exists(in_maintenance), then=Value('maintenance')),
+            When(Exists(on_route), then=Value('on_route')),
+            default=Value('available'),
+            output_field=models.CharField(),
+        ))
+
+    def status_counts(self):
+        return self.aggregate(
+            total=Count('pk'),
+            **{slug: Count('pk', filter=Q(current_status_slug=slug)) for slug, _ in Vehicle.STATUS_CHOICES}
+        )
+
+    def picker_options(self):
+        # mileage is initial_mileage + completed_routes_mileage, so these columns are all the picker needs.
+        return self.exclude(status='disabled').only(
+            'pk', 'plate', 'model', 'initial_mileage', 'completed_routes_mileage'
+        ).order_by('plate')
+
+    def with_current_route(self, now=None):
+        # Fills vehicle.current_routes so current_route_driver needs no query per row.
+        now = now or timezone.now()
+        return self.prefetch_related(
+            Prefetch('route_set', queryset=Vehicle.current_routes_queryset(now), to_attr='current_routes')
+        )
+
+    def with_cost_summary(self, start=None, end=None):
+        # Each total is a correlated subquery so routes and maintenances never multiply each other's rows.
+        routes = Route.objects.filter(vehicle=OuterRef('pk'), status='completed')
+        maintenances = Maintenance.objects.with_completed_at().filter(vehicle=OuterRef('pk'), status='completed')
+        if start:
+            routes = routes.filter(end_time__gte=start)
+            maintenances = maintenances.filter(completed_at__gte=start)
+        if end:
+            routes = routes.filter(end_time__lt=end)
+            maintenances = maintenances.filter(completed_at__lt=end)
+
+        def total(queryset, expression):
+            return Coalesce(
+                Subquery(queryset.order_by().values('vehicle').annotate(total=expression).values('total')[:1]),
+                Value(0), output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            )
+
+        return self.annotate(
+            route_count=Coalesce(
+                Subquery(routes.order_by().values('vehicle').annotate(total=Count('pk')).values('total')[:1]), Value(0)
+            ),
+            route_distance=total(routes, Sum(Coalesce('actual_distance', 'estimated_distance'))),
+            fuel_cost=total(routes.with_fuel_cost(), Sum('fuel_cost')),
+            toll_cost=total(routes, Sum('estimated_toll_cost')),
+            maintenance_cost=total(maintenances, Sum('actual_cost')),
+        )
+
+
 class Vehicle(models.Model):
     user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Perfil da Empresa")
     STATUS_CHOICES = [
@@ -38,55 +118,90 @@ class Vehicle(models.Model):
         max_digits=5, decimal_places=2, null=True, blank=True,
         verbose_name="Consumo Médio (Km/L)"
     )
+    completed_routes_mileage = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, editable=False,
+        verbose_name="Quilometragem em Rotas Concluídas"
+    )
+
+    objects = VehicleQuerySet.as_manager()
 
     @property
     def mileage(self):
-        completed_routes_mileage = self.route_set.filter(status='completed').aggregate(
-            total=Sum(Coalesce('actual_distance', 'estimated_distance'), output_field=models.DecimalField())
-        )['total'] or 0
+        return self.initial_mileage + int(self.completed_routes_mileage or 0)
 
-        return self.initial_mileage + int(completed_routes_mileage)
+    @staticmethod
+    def apply_odometer_delta(vehicle_id, delta):
+        if vehicle_id and delta:
+            Vehicle.objects.filter(pk=vehicle_id).update(completed_routes_mileage=F('completed_routes_mileage') + delta)
 
     def __str__(self):
         return f"{self.model} - {self.plate}"
 
     @property
     def dynamic_status(self):
-        now = timezone.now()
-        if self.status == 'disabled': return "Desativado"
-        active_maintenance = Q(start_date__lte=now, end_date__gte=now)
-        overdue_maintenance = Q(end_date__lt=now)
-        is_in_maintenance = self.maintenance_set.filter(
-            (active_maintenance | overdue_maintenance),
-            status__in=['scheduled', 'in_progress']
-        ).exists()
-        if is_in_maintenance: return "Em Manutenção"
-        if self.route_set.filter(
-            start_time__lte=now, end_time__gte=now
-        ).exclude(
-            status__in=['completed', 'canceled']
-        ).exists(): return "Em Rota"
-        return "Disponível"
+        return dict(self.STATUS_CHOICES)[self.dynamic_status_slug]
 
     @property
     def dynamic_status_slug(self):
-        status = self.dynamic_status
-        if status == "Em Manutenção": return 'maintenance'
-        if status == "Em Rota": return 'on_route'
-        if status == "Desativado": return 'disabled'
+        if hasattr(self, 'current_status_slug'): return self.current_status_slug
+        now = timezone.now()
+        if self.status == 'disabled': return 'disabled'
+        if self.maintenance_set.filter(Vehicle.blocking_maintenance_q(now)).exists(): return 'maintenance'
+        if self.route_set.filter(Vehicle.active_route_q(now)).exclude(
+            status__in=['completed', 'canceled']
+        ).exists(): return 'on_route'
         return 'available'
 
+    @staticmethod
+    def blocking_maintenance_q(now):
+        active_maintenance = Q(start_date__lte=now, end_date__gte=now)
+        overdue_maintenance = Q(end_date__lt=now)
+        return (active_maintenance | overdue_maintenance) & Q(status__in=['scheduled', 'in_progress'])
+
+    @staticmethod
+    def active_route_q(now):
+        return Q(start_time__lte=now, end_time__gte=now)
+
+    @staticmethod
+    def current_routes_queryset(now):
+        return Route.objects.filter(Vehicle.active_route_q(now)).exclude(
+            status__in=['completed', 'canceled']
+        ).select_related('driver').order_by('pk')
+
     @property
     def current_route_driver(self):
-        now = timezone.now()
-        current_route = self.route_set.filter(
-            start_time__lte=now, end_time__gte=now
-        ).exclude(
-            status__in=['completed', 'canceled']
-        ).select_related('driver').first()
+        if hasattr(self, 'current_routes'):
+            current_route = self.current_routes[0] if self.current_routes else None
+        else:
+            current_route = Vehicle.current_routes_queryset(timezone.now()).filter(vehicle=self).first()
         if current_route and current_route.driver: return current_route.driver
         return None
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_profile', 'plate'], name='vehicle_tenant_plate_idx'),
+        ]
+
+class MaintenanceQuerySet(models.QuerySet):
+    def search(self, query):
+        return self.filter(
+            Q(vehicle__plate__icontains=query) | Q(service_type__icontains=query) | Q(mechanic_shop_name__icontains=query)
+        )
+
+    def filter_status(self, status, now=None):
+        now = now or timezone.now()
+        open_statuses = ['scheduled', 'in_progress']
+        if status == 'scheduled': return self.filter(status__in=open_statuses, start_date__gt=now)
+        if status == 'in_progress': return self.filter(status__in=open_statuses, start_date__lte=now, end_date__gte=now)
+        if status == 'overdue': return self.filter(status__in=open_statuses, end_date__lt=now)
+        if status in ('completed', 'canceled'): return self.filter(status=status)
+        return self
+
+    def with_completed_at(self):
+        # When a maintenance counts for cost reporting: its actual end, or the planned end if none was recorded.
+        return self.annotate(completed_at=Coalesce('actual_end_date', 'end_date'))
+
+
 class Maintenance(models.Model):
     user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Perfil da Empresa")
     SERVICE_CHOICES_ALERT_CONFIG = [
@@ -113,6 +228,8 @@ class Maintenance(models.Model):
     notes = models.TextField(blank=True, verbose_name="Observações")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled', verbose_name="Status")
 
+    objects = MaintenanceQuerySet.as_manager()
+
     def __str__(self): return f"{self.service_type} - {self.vehicle.plate}"
     @property
     def dynamic_status(self):
@@ -131,6 +248,69 @@ class Maintenance(models.Model):
         if status == "Cancelada": return "canceled"
         return slugify(status)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['vehicle', 'status', 'start_date', 'end_date'], name='maint_vehicle_sched_idx'),
+            models.Index(fields=['user_profile', 'start_date'], name='maint_tenant_start_idx'),
+            models.Index(fields=['user_profile', 'status', 'start_date'], name='maint_tenant_status_idx'),
+        ]
+
+class RouteQuerySet(models.QuerySet):
+    def with_dynamic_status(self, now=None):
+        now = now or timezone.now()
+        return self.annotate(current_status_slug=Case(
+            When(status__in=['completed', 'canceled'], then=F('status')),
+            When(end_time__lt=now, then=Value('completed')),
+            When(start_time__lte=now, end_time__gt=now, then=Value('in_progress')),
+            default=Value('scheduled'),
+            output_field=models.CharField(),
+        ))
+
+    def status_counts(self):
+        return self.aggregate(
+            total=Count('pk'),
+            active=Count('pk', filter=Q(current_status_slug='in_progress')),
+            planned=Count('pk', filter=Q(current_status_slug='scheduled')),
+            completed=Count('pk', filter=Q(current_status_slug='completed')),
+            cancelled=Count('pk', filter=Q(current_status_slug='canceled')),
+        )
+
+    def search(self, query):
+        return self.filter(
+            Q(start_location__icontains=query) | Q(end_location__icontains=query) |
+            Q(driver__full_name__icontains=query) | Q(vehicle__plate__icontains=query)
+        )
+
+    def with_fuel_cost(self):
+        return self.annotate(fuel_cost=Case(
+            When(
+                estimated_distance__gt=0, vehicle__average_fuel_consumption__gt=0, fuel_price_per_liter__gt=0,
+                then=F('estimated_distance') / F('vehicle__average_fuel_consumption') * F('fuel_price_per_liter'),
+            ),
+            default=None,
+            output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        ))
+
+    def history_rows(self):
+        return self.with_fuel_cost().annotate(
+            distance=Coalesce('actual_distance', 'estimated_distance'), vehicle_plate=F('vehicle__plate'),
+        ).values(
+            'id', 'start_location', 'end_location', 'end_time', 'distance',
+            'fuel_cost', 'estimated_toll_cost', 'vehicle_plate',
+        )
+
+    HISTORY_TOTALS = {
+        'total_distance': Sum(Coalesce('actual_distance', 'estimated_distance')),
+        'total_routes': Count('id'), 'total_toll': Sum('estimated_toll_cost'), 'total_fuel': Sum('fuel_cost'),
+    }
+
+    def history_totals(self):
+        return self.with_fuel_cost().aggregate(**self.HISTORY_TOTALS)
+
+    async def ahistory_totals(self):
+        return await self.with_fuel_cost().aaggregate(**self.HISTORY_TOTALS)
+
+
 class Route(models.Model):
     user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Perfil da Empresa")
     STATUS_CHOICES = [
@@ -149,21 +329,19 @@ class Route(models.Model):
     fuel_price_per_liter = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True, verbose_name="Preço Combustível (R$/L)")
     estimated_toll_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Custo Pedágio (Est.)")
 
+    objects = RouteQuerySet.as_manager()
+
     @property
     def dynamic_status(self):
-        now = timezone.now()
-        if self.status in ['completed', 'canceled']: return self.get_status_display()
-        if self.end_time < now: return "Concluída"
-        if self.start_time <= now < self.end_time: return "Em Andamento"
-        return "Agendada"
+        return dict(self.STATUS_CHOICES)[self.dynamic_status_slug]
     @property
     def dynamic_status_slug(self):
-        status = self.dynamic_status
-        if status == "Em Andamento": return "in_progress"
-        if status == "Agendada": return "scheduled"
-        if status == "Concluída": return "completed"
-        if status == "Cancelada": return "canceled"
-        return slugify(status)
+        if hasattr(self, 'current_status_slug'): return self.current_status_slug
+        now = timezone.now()
+        if self.status in ['completed', 'canceled']: return self.status
+        if self.end_time < now: return "completed"
+        if self.start_time <= now < self.end_time: return "in_progress"
+        return "scheduled"
     @property
     def progress_percentage(self):
         if self.status == 'completed': return 100
@@ -185,10 +363,56 @@ class Route(models.Model):
             except: return None
         return None
     def __str__(self): return f"Rota de {self.start_location} para {self.end_location} ({self.start_time.strftime('%d/%m/%Y')})"
+    @staticmethod
+    def odometer_contribution(status, actual_distance, estimated_distance):
+        if status != 'completed': return Decimal('0')
+        distance = actual_distance if actual_distance is not None else estimated_distance
+        if distance is None: return Decimal('0')
+        return Decimal(str(distance)).quantize(Decimal('0.01'))
+
+    def _locked_previous_state(self):
+        return Route.objects.select_for_update().filter(pk=self.pk).values(
+            'status', 'vehicle_id', 'actual_distance', 'estimated_distance', 'end_time'
+        ).first()
+
     def save(self, *args, **kwargs):
         if self.status == 'completed' and not self.actual_distance:
             self.status = 'scheduled' if timezone.now() < self.start_time else 'in_progress'
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = self._previous_state = self._locked_previous_state() if self.pk else None
+            deltas = {}
+            if previous:
+                deltas[previous['vehicle_id']] = -self.odometer_contribution(
+                    previous['status'], previous['actual_distance'], previous['estimated_distance']
+                )
+            deltas[self.vehicle_id] = deltas.get(self.vehicle_id, Decimal('0')) + self.odometer_contribution(
+                self.status, self.actual_distance, self.estimated_distance
+            )
+            # Odometers are updated before saving so post_save receivers already see the new mileage.
+            for vehicle_id, delta in deltas.items():
+                Vehicle.apply_odometer_delta(vehicle_id, delta)
+            self._affected_vehicle_ids = {vehicle_id for vehicle_id, delta in deltas.items() if vehicle_id and delta}
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = self._previous_state = self._locked_previous_state()
+            self._affected_vehicle_ids = set()
+            if previous:
+                delta = self.odometer_contribution(
+                    previous['status'], previous['actual_distance'], previous['estimated_distance']
+                )
+                Vehicle.apply_odometer_delta(previous['vehicle_id'], -delta)
+                if previous['vehicle_id'] and delta:
+                    self._affected_vehicle_ids.add(previous['vehicle_id'])
+            return super().delete(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vehicle', 'status', 'start_time', 'end_time'], name='route_vehicle_sched_idx'),
+            models.Index(fields=['driver', 'status', 'start_time', 'end_time'], name='route_driver_sched_idx'),
+            models.Index(fields=['user_profile', 'start_time'], name='route_tenant_start_idx'),
+        ]
 
 
 class AlertConfiguration(models.Model):
@@ -219,4 +443,107 @@ class AlertConfiguration(models.Model):
 
     class Meta:
         verbose_name = "Configuração de Alerta"
-        verbose_name_plural = "Configurações de Alertas"
\ No newline at end of file
+        verbose_name_plural = "Configurações de Alertas"
+        indexes = [
+            models.Index(fields=['user_profile', 'service_type'], name='alertcfg_tenant_service_idx'),
+        ]
+
+class RouteDetailsCache(models.Model):
+    start_key = models.CharField(max_length=255, verbose_name="Origem Normalizada")
+    end_key = models.CharField(max_length=255, verbose_name="Destino Normalizado")
+    distance = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Distância (km)")
+    toll_cost = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Custo Pedágio")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    def __str__(self):
+        return f"{self.start_key} → {self.end_key}"
+
+    class Meta:
+        verbose_name = "Cache de Rota"
+        verbose_name_plural = "Cache de Rotas"
+        constraints = [
+            models.UniqueConstraint(fields=['start_key', 'end_key'], name='unique_route_details_cache_pair'),
+        ]
+
+
+class FuelPriceSnapshot(models.Model):
+    fuel_type = models.CharField(max_length=20, default='diesel', verbose_name="Combustível")
+    uf = models.CharField(max_length=2, verbose_name="UF")
+    price = models.DecimalField(max_digits=6, decimal_places=2, verbose_name="Preço (R$/L)")
+    fetched_at = models.DateTimeField(verbose_name="Consultado em")
+
+    def __str__(self):
+        return f"{self.fuel_type} {self.uf}: R$ {self.price}"
+
+    class Meta:
+        verbose_name = "Preço de Combustível"
+        verbose_name_plural = "Preços de Combustível"
+        constraints = [
+            models.UniqueConstraint(fields=['fuel_type', 'uf'], name='unique_fuel_price_snapshot_uf'),
+        ]
+
+
+class VehicleAlertState(models.Model):
+    PRIORITY_RANKS = {'low': 0, 'medium': 1, 'high': 2}
+    UNIT_RANKS = {'days': 0, 'km': 1}
+    RANK_ORDERING = ('-priority_rank', '-unit_rank', '-overdue_value')
+
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Perfil da Empresa")
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='alert_states', verbose_name="Veículo")
+    service_type = models.CharField(max_length=100, verbose_name="Tipo de Serviço")
+    message = models.CharField(max_length=100, verbose_name="Mensagem")
+    priority = models.CharField(max_length=10, choices=AlertConfiguration.PRIORITY_CHOICES, verbose_name="Prioridade")
+    priority_rank = models.PositiveSmallIntegerField(verbose_name="Ordem da Prioridade")
+    overdue_value = models.IntegerField(verbose_name="Atraso")
+    overdue_unit = models.CharField(max_length=4, verbose_name="Unidade do Atraso")
+    unit_rank = models.PositiveSmallIntegerField(verbose_name="Ordem da Unidade")
+    computed_on = models.DateField(verbose_name="Calculado em")
+
+    @classmethod
+    def from_alert(cls, alert, computed_on):
+        return cls(
+            user_profile_id=alert.vehicle.user_profile_id, vehicle=alert.vehicle, service_type=alert.service_type,
+            message=alert.message, priority=alert.priority, priority_rank=cls.PRIORITY_RANKS.get(alert.priority, 1),
+            overdue_value=alert.overdue_value, overdue_unit=alert.overdue_unit,
+            unit_rank=cls.UNIT_RANKS[alert.overdue_unit], computed_on=computed_on,
+        )
+
+    def __str__(self):
+        return f"{self.vehicle.plate} - {self.service_type}: {self.message}"
+
+    class Meta:
+        verbose_name = "Alerta de Veículo"
+        verbose_name_plural = "Alertas de Veículos"
+        constraints = [
+            models.UniqueConstraint(fields=['vehicle', 'service_type'], name='unique_vehicle_alert_state'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user_profile', '-priority_rank', '-unit_rank', '-overdue_value'], name='alertstate_tenant_rank_idx'
+            ),
+        ]
+
+
+class FleetCostRollup(models.Model):
+    user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Perfil da Empresa")
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='cost_rollups', verbose_name="Veículo")
+    month = models.DateField(verbose_name="Mês")
+    route_count = models.PositiveIntegerField(default=0, verbose_name="Rotas Concluídas")
+    distance = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Distância (km)")
+    fuel_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Custo Combustível")
+    toll_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Custo Pedágio")
+    maintenance_count = models.PositiveIntegerField(default=0, verbose_name="Manutenções Concluídas")
+    maintenance_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Custo Manutenção")
+
+    def __str__(self):
+        return f"{self.vehicle.plate} - {self.month:%m/%Y}"
+
+    class Meta:
+        verbose_name = "Custo Mensal da Frota"
+        verbose_name_plural = "Custos Mensais da Frota"
+        constraints = [
+            models.UniqueConstraint(fields=['vehicle', 'month'], name='unique_vehicle_cost_month'),
+        ]
+        indexes = [
+            models.Index(fields=['user_profile', 'month'], name='rollup_tenant_month_idx'),
+        ]
@@ -0,0 +1,111 @@
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+from operator import or_
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds times to milliseconds, so rows a few microseconds past the boundary would be skipped.
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), cls=CursorJSONEncoder).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List[Any]]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def parse_limit(value: Optional[str], default: int = DEFAULT_PAGE_SIZE) -> int:
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _field_name(ordering_field: str) -> str:
+    return ordering_field.lstrip('-')
+
+
+def _item_value(item, field: str):
+    if isinstance(item, dict):
+        return item[field]
+    return getattr(item, field)
+
+
+def _after_q(ordering: Sequence[str], values: Sequence[Any]) -> Q:
+    clauses = []
+    for position, ordering_field in enumerate(ordering):
+        equal_prefix = {_field_name(f): values[i] for i, f in enumerate(ordering[:position])}
+        lookup = 'lt' if ordering_field.startswith('-') else 'gt'
+        clauses.append(Q(**equal_prefix, **{f'{_field_name(ordering_field)}__{lookup}': values[position]}))
+    return reduce(or_, clauses)
+
+
+def apply_keyset_cursor(queryset: QuerySet, ordering: Sequence[str], after: Optional[str] = None) -> QuerySet:
+    # The last ordering field must be unique (e.g. '-id') so rows sharing the leading values are not skipped.
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(after)
+    if values and len(values) == len(ordering):
+        try:
+            queryset = queryset.filter(_after_q(ordering, values))
+        except (ValidationError, ValueError, TypeError):
+            # A hand-edited cursor whose values do not fit the fields is ignored, like one that fails to decode.
+            pass
+    return queryset
+
+
+def _keyset_page(page: list, ordering: Sequence[str], limit: int) -> Tuple[list, Optional[str]]:
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor([_item_value(page[-1], _field_name(f)) for f in ordering])
+    return page, next_cursor
+
+
+def paginate_keyset(queryset: QuerySet, ordering: Sequence[str], after: Optional[str] = None,
+                    limit: int = DEFAULT_PAGE_SIZE) -> Tuple[list, Optional[str]]:
+    queryset = apply_keyset_cursor(queryset, ordering, after)
+    return _keyset_page(list(queryset[:limit + 1]), ordering, limit)
+
+
+async def apaginate_keyset(queryset: QuerySet, ordering: Sequence[str], after: Optional[str] = None,
+                           limit: int = DEFAULT_PAGE_SIZE) -> Tuple[list, Optional[str]]:
+    queryset = apply_keyset_cursor(queryset, ordering, after)
+    return _keyset_page([item async for item in queryset[:limit + 1]], ordering, limit)
+
+
+def iterate_keyset(queryset: QuerySet, ordering: Sequence[str], batch_size: int) -> Iterator[Any]:
+    # One query per batch, each resuming after the last row: memory stays bounded even where .iterator()
+    # cannot stream (mysqlclient buffers the whole result set client-side).
+    queryset = queryset.order_by(*ordering)
+    batch = list(queryset[:batch_size])
+    while batch:
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        values = [_item_value(batch[-1], _field_name(f)) for f in ordering]
+        batch = list(queryset.filter(_after_q(ordering, values))[:batch_size])
@@ -6,34 +6,55 @@ from django.db.models import Sum, Count
 from django.db.models.functions import Coalesce
 from django.http import JsonResponse
 from .models import Route
-from accounts.models import UserProfile
+from .middleware import get_profile_or_404
+from .tenant_cache import cached_tenant_stats
 from .forms import RouteForm, RouteCompletionForm
-from .services import calculate_route_details, get_diesel_price
+from .services import calculate_route_details, get_diesel_price, submit_external
+from .pagination import paginate_keyset, parse_limit
 
 import re
 
 
-class RouteCreateView(LoginRequiredMixin, View):
+def route_summary(route):
+    return {
+        'start_location': route.start_location, 'end_location': route.end_location,
+        'distance': route.estimated_distance, 'toll_cost': route.estimated_toll_cost,
+        'fuel_cost': route.estimated_fuel_cost or 0.0
+    }
+
+
+class RouteCostsMixin:
+    def parse_uf(self, location):
+        uf = re.split(r',\s*', location)[-1].strip().upper()
+        return uf if len(uf) == 2 and uf.isalpha() else None
+
+    def resolve_route_costs(self, start_location, end_location, known_details=None):
+        uf = self.parse_uf(start_location)
+        details_future = None if known_details else submit_external(calculate_route_details, start_location, end_location)
+        price_future = submit_external(get_diesel_price, uf) if uf else None
+
+        route_details = known_details or details_future.result()
+        if isinstance(route_details, str):
+            return None, None, route_details
+        if not uf:
+            return None, None, "Formato de Local de Partida inválido. Use 'Cidade, UF'."
+        price_result = price_future.result()
+        if isinstance(price_result, str):
+            return None, None, price_result
+        return route_details, price_result, None
+
+
+class RouteCreateView(LoginRequiredMixin, RouteCostsMixin, View):
     def post(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         form = RouteForm(request.POST, user_profile=profile)
         if form.is_valid():
             route = form.save(commit=False)
             route.user_profile = profile
             
-            route_details = calculate_route_details(route.start_location, route.end_location)
-            if isinstance(route_details, str):
-                return JsonResponse({'success': False, 'errors': {'__all__': [route_details]}}, status=400)
-            try:
-                uf = re.split(r',\s*', route.start_location)[-1].strip().upper()
-                if not (len(uf) == 2 and uf.isalpha()):
-                     raise ValueError("Formato de UF inválido.")
-            except Exception:
-                return JsonResponse({'success': False, 'errors': {'__all__': ["Formato de Local de Partida inválido. Use 'Cidade, UF'."]}}, status=400)
-            
-            price_result = get_diesel_price(uf)
-            if isinstance(price_result, str):
-                return JsonResponse({'success': False, 'errors': {'__all__': [price_result]}}, status=400)
+            route_details, price_result, error = self.resolve_route_costs(route.start_location, route.end_location)
+            if error:
+                return JsonResponse({'success': False, 'errors': {'__all__': [error]}}, status=400)
             
             route.estimated_distance = route_details['distance']
             route.estimated_toll_cost = route_details['toll_cost']
@@ -41,69 +62,54 @@ class RouteCreateView(LoginRequiredMixin, View):
             route.save()
             route.refresh_from_db()
             messages.success(request, 'Rota registrada com sucesso!')
-            return JsonResponse({
-                'success': True,
-                'summary': {
-                    'start_location': route.start_location, 'end_location': route.end_location,
-                    'distance': route.estimated_distance, 'toll_cost': route.estimated_toll_cost,
-                    'fuel_cost': route.estimated_fuel_cost or 0.0
-                }
-            })
+            return JsonResponse({'success': True, 'summary': route_summary(route)})
         else:
             return JsonResponse({'success': False, 'errors': form.errors}, status=400)
 
 class RouteListView(LoginRequiredMixin, View):
     def get(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         
-        all_routes = list(Route.objects.filter(user_profile=profile).select_related('driver', 'vehicle').order_by('-start_time'))
+        routes = Route.objects.filter(user_profile=profile).with_dynamic_status()
+        stats = cached_tenant_stats(profile, 'routes', routes.status_counts)
+
         search_query = request.GET.get('search', '')
         if search_query:
-            all_routes = [route for route in all_routes if search_query.lower() in route.start_location.lower() or search_query.lower() in route.end_location.lower() or (route.driver and search_query.lower() in route.driver.full_name.lower()) or (route.vehicle and search_query.lower() in route.vehicle.plate.lower())]
-        
-        stats = {'total': Route.objects.filter(user_profile=profile).count(), 'active': 0, 'planned': 0, 'completed': 0, 'cancelled': 0}
-        for r in Route.objects.filter(user_profile=profile):
-            status_slug = r.dynamic_status_slug
-            if status_slug == 'in_progress': stats['active'] += 1
-            elif status_slug == 'scheduled': stats['planned'] += 1
-            elif status_slug == 'completed': stats['completed'] += 1
-            elif status_slug == 'canceled': stats['cancelled'] += 1
-        
+            routes = routes.search(search_query)
         status_filter = request.GET.get('status', '')
         if status_filter:
-            filtered_routes = [route for route in all_routes if route.dynamic_status_slug == status_filter]
-        else:
-            filtered_routes = all_routes
+            routes = routes.filter(current_status_slug=status_filter)
+
+        page, next_cursor = paginate_keyset(
+            routes.select_related('driver', 'vehicle'), ('-start_time', '-id'),
+            after=request.GET.get('after'), limit=parse_limit(request.GET.get('limit'))
+        )
         
         context = {
-            'routes': filtered_routes, 'stats': stats,
+            'routes': page, 'next_cursor': next_cursor, 'stats': stats,
             'status_choices': Route.STATUS_CHOICES, 'search_query': search_query,
             'status_filter': status_filter, 'add_form': RouteForm(user_profile=profile),
             'completion_form': RouteCompletionForm()
         }
         return render(request, 'dashboard/routes.html', context)
 
-class RouteUpdateView(LoginRequiredMixin, View):
+class RouteUpdateView(LoginRequiredMixin, RouteCostsMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         route = get_object_or_404(Route, pk=pk, user_profile=profile)
         form = RouteForm(request.POST, instance=route, user_profile=profile)
         
         if form.is_valid():
             updated_route = form.save(commit=False)
-            route_details = calculate_route_details(updated_route.start_location, updated_route.end_location)
-            if isinstance(route_details, str):
-                return JsonResponse({'success': False, 'errors': {'__all__': [route_details]}}, status=400)
-            try:
-                uf = re.split(r',\s*', updated_route.start_location)[-1].strip().upper()
-                if not (len(uf) == 2 and uf.isalpha()):
-                     raise ValueError("Formato de UF inválido.")
-            except Exception:
-                return JsonResponse({'success': False, 'errors': {'__all__': ["Formato de Local de Partida inválido. Use 'Cidade, UF'."]}}, status=400)
-            
-            price_result = get_diesel_price(uf)
-            if isinstance(price_result, str):
-                return JsonResponse({'success': False, 'errors': {'__all__': [price_result]}}, status=400)
+            locations_changed = {'start_location', 'end_location'} & set(form.changed_data)
+            known_details = None
+            if not locations_changed and updated_route.estimated_distance is not None:
+                known_details = {'distance': updated_route.estimated_distance, 'toll_cost': updated_route.estimated_toll_cost}
+            route_details, price_result, error = self.resolve_route_costs(
+                updated_route.start_location, updated_route.end_location, known_details
+            )
+            if error:
+                return JsonResponse({'success': False, 'errors': {'__all__': [error]}}, status=400)
             
             updated_route.estimated_distance = route_details['distance']
             updated_route.estimated_toll_cost = route_details['toll_cost']
@@ -111,20 +117,13 @@ class RouteUpdateView(LoginRequiredMixin, View):
             updated_route.save()
             updated_route.refresh_from_db()
             messages.success(request, 'Rota atualizada com sucesso!')
-            return JsonResponse({
-                'success': True,
-                'summary': {
-                    'start_location': updated_route.start_location, 'end_location': updated_route.end_location,
-                    'distance': updated_route.estimated_distance, 'toll_cost': updated_route.estimated_toll_cost,
-                    'fuel_cost': updated_route.estimated_fuel_cost or 0.0
-                }
-            })
+            return JsonResponse({'success': True, 'summary': route_summary(updated_route)})
         else:
             return JsonResponse({'success': False, 'errors': form.errors}, status=400)
 
 class RouteCancelView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         route = get_object_or_404(Route, pk=pk, user_profile=profile)
         route.status = 'canceled'
         route.save()
@@ -133,7 +132,7 @@ class RouteCancelView(LoginRequiredMixin, View):
 
 class RouteReactivateView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         route = get_object_or_404(Route, pk=pk, user_profile=profile)
         route.status = 'scheduled'
         route.save()
@@ -143,7 +142,7 @@ class RouteReactivateView(LoginRequiredMixin, View):
 
 class RouteCompleteView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         route = get_object_or_404(Route, pk=pk, user_profile=profile)
         form = RouteCompletionForm(request.POST, instance=route)
         if form.is_valid():
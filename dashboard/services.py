@@ -1,14 +1,30 @@
 from django.shortcuts import get_object_or_404
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from django.db.models import CharField, Count, DateField, F, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, RowNumber, TruncMonth
 from django.utils import timezone
-from .models import Vehicle, Maintenance, AlertConfiguration
+from .models import (
+    Vehicle, Maintenance, Route, AlertConfiguration, RouteDetailsCache, FuelPriceSnapshot, VehicleAlertState,
+    FleetCostRollup,
+)
 from accounts.models import UserProfile
 from django.conf import settings
 from typing import Optional, List, Dict, Any, Union
 
+import asyncio
 import requests
 import re
-from collections import Counter
+import threading
+import time
+import unicodedata
+import weakref
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from django.db import close_old_connections, connection, transaction
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 class VehicleAlert:
@@ -35,80 +51,691 @@ class VehicleAlert:
         return self.overdue_value < other.overdue_value
 
 
-def get_vehicle_alerts(user_profile: UserProfile, limit: Optional[int] = None) -> List[VehicleAlert]:
+def _last_completed_maintenances(vehicles, service_types) -> Dict[tuple, Dict[str, Any]]:
+    rows = Maintenance.objects.filter(
+        vehicle__in=vehicles, service_type__in=service_types, status='completed'
+    ).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('vehicle_id'), F('service_type')],
+            order_by=F('actual_end_date').desc(),
+        )
+    ).filter(row_number=1).values('vehicle_id', 'service_type', 'current_mileage', 'actual_end_date', 'end_date')
+    return {(row['vehicle_id'], row['service_type']): row for row in rows}
+
+
+def _evaluate_vehicle_rules(vehicle, rules_dict, current_mileage: int, last_maintenances, today: date) -> List[VehicleAlert]:
     alerts = []
-    now = timezone.now()
-    today = now.date()
-    
+    for service_type, rule in rules_dict.items():
+        last_maint = last_maintenances.get((vehicle.pk, service_type))
+
+        last_km: int
+        last_service_date: date
+
+        if last_maint:
+            last_km = last_maint['current_mileage']
+            last_date_obj = last_maint['actual_end_date']
+            if isinstance(last_date_obj, datetime):
+                last_service_date = last_date_obj.date()
+            elif isinstance(last_maint['end_date'], datetime):
+                last_service_date = last_maint['end_date'].date()
+            elif isinstance(last_maint['end_date'], date):
+                last_service_date = last_maint['end_date']
+            else:
+                last_service_date = vehicle.acquisition_date
+        else:
+            last_km = vehicle.initial_mileage
+            last_service_date = vehicle.acquisition_date
+
+        if not isinstance(last_service_date, date):
+            last_service_date = vehicle.acquisition_date or today
+
+        km_alert_triggered = False
+
+        if rule.km_threshold is not None:
+            km_delta = current_mileage - last_km
+            if km_delta >= rule.km_threshold:
+                overdue_km = km_delta - rule.km_threshold
+                message = f"Vencida por {overdue_km} km"
+                alerts.append(VehicleAlert(vehicle, service_type, message, priority=rule.priority, overdue_value=overdue_km, overdue_unit='km'))
+                km_alert_triggered = True
+
+        if rule.days_threshold is not None and not km_alert_triggered:
+            days_delta = (today - last_service_date).days
+            if days_delta >= rule.days_threshold:
+                overdue_days = days_delta - rule.days_threshold
+                message = f"Vencida por {overdue_days} dias"
+                alerts.append(VehicleAlert(vehicle, service_type, message, priority=rule.priority, overdue_value=overdue_days, overdue_unit='days'))
+    return alerts
+
+
+def compute_vehicle_alerts(user_profile: UserProfile, vehicle_ids=None, today: Optional[date] = None,
+                           service_types=None) -> List[VehicleAlert]:
     if not user_profile:
         return []
 
+    today = today or timezone.now().date()
     active_vehicles = Vehicle.objects.filter(user_profile=user_profile).exclude(status='disabled')
-    active_rules = AlertConfiguration.objects.filter(user_profile=user_profile, is_active=True)
+    if vehicle_ids is not None:
+        active_vehicles = active_vehicles.filter(pk__in=vehicle_ids)
+    # A rule without thresholds never fires, so it is left out before any vehicle is loaded.
+    active_rules = AlertConfiguration.objects.filter(user_profile=user_profile, is_active=True).filter(
+        Q(km_threshold__isnull=False) | Q(days_threshold__isnull=False)
+    )
+    if service_types is not None:
+        active_rules = active_rules.filter(service_type__in=service_types)
     rules_dict = {rule.service_type: rule for rule in active_rules}
+    if not rules_dict:
+        return []
 
-    for vehicle in active_vehicles:
-        current_mileage = vehicle.mileage
-
-        for service_type, rule in rules_dict.items():
-            last_maint = Maintenance.objects.filter(
-                vehicle=vehicle,
-                service_type=service_type,
-                status='completed'
-            ).order_by('-actual_end_date').first()
-
-            last_km: int
-            last_service_date: date
-
-            if last_maint:
-                last_km = last_maint.current_mileage
-                last_date_obj = last_maint.actual_end_date
-                if isinstance(last_date_obj, datetime):
-                    last_service_date = last_date_obj.date()
-                elif isinstance(last_maint.end_date, datetime):
-                     last_service_date = last_maint.end_date.date()
-                elif isinstance(last_maint.end_date, date):
-                    last_service_date = last_maint.end_date
-                else:
-                   last_service_date = vehicle.acquisition_date
+    vehicles = list(active_vehicles)
+    if not vehicles:
+        return []
+    last_maintenances = _last_completed_maintenances(active_vehicles, list(rules_dict))
 
-            else:
-                last_km = vehicle.initial_mileage
-                last_service_date = vehicle.acquisition_date
+    alerts = []
+    for vehicle in vehicles:
+        alerts.extend(_evaluate_vehicle_rules(vehicle, rules_dict, vehicle.mileage, last_maintenances, today))
+
+    alerts.sort(reverse=True)
+    return alerts
 
-            if not isinstance(last_service_date, date):
-                last_service_date = vehicle.acquisition_date or today
 
-            km_alert_triggered = False
-            overdue_km = 0
-            overdue_days = 0
+def refresh_vehicle_alert_states(user_profile: UserProfile, vehicle_ids=None, today: Optional[date] = None,
+                                 service_types=None) -> int:
+    """Recomputes VehicleAlertState rows, optionally only for some vehicles and/or service types."""
+    if not user_profile:
+        return 0
+    today = today or timezone.now().date()
+    alerts = compute_vehicle_alerts(user_profile, vehicle_ids=vehicle_ids, today=today, service_types=service_types)
+    with transaction.atomic():
+        stale = VehicleAlertState.objects.filter(user_profile=user_profile)
+        if vehicle_ids is not None:
+            stale = stale.filter(vehicle_id__in=vehicle_ids)
+        if service_types is not None:
+            stale = stale.filter(service_type__in=service_types)
+        stale.delete()
+        VehicleAlertState.objects.bulk_create([VehicleAlertState.from_alert(alert, today) for alert in alerts])
+    return len(alerts)
 
-            if rule.km_threshold is not None:
-                km_delta = current_mileage - last_km
-                if km_delta >= rule.km_threshold:
-                    overdue_km = km_delta - rule.km_threshold
-                    message = f"Vencida por {overdue_km} km"
-                    alerts.append(VehicleAlert(vehicle, service_type, message, priority=rule.priority, overdue_value=overdue_km, overdue_unit='km'))
-                    km_alert_triggered = True
 
-            if rule.days_threshold is not None and not km_alert_triggered:
-                if isinstance(last_service_date, datetime):
-                   last_service_date = last_service_date.date()
+def refresh_all_vehicle_alert_states(today: Optional[date] = None):
+    """Recomputes every tenant's alerts; returns ``(alerts, tenants)``. Day-based thresholds only advance here."""
+    today = today or timezone.now().date()
+    profile_ids = list(AlertConfiguration.objects.filter(
+        is_active=True, user_profile__isnull=False
+    ).values_list('user_profile_id', flat=True).distinct())
+    total = sum(refresh_vehicle_alert_states(profile_id, today=today) for profile_id in profile_ids)
+    return total, len(profile_ids)
 
-                days_delta = (today - last_service_date).days
-                if days_delta >= rule.days_threshold:
-                    overdue_days = days_delta - rule.days_threshold
-                    message = f"Vencida por {overdue_days} dias"
-                    alerts.append(VehicleAlert(vehicle, service_type, message, priority=rule.priority, overdue_value=overdue_days, overdue_unit='days'))
 
-    alerts.sort(reverse=True)
+def month_start(value) -> date:
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date()
+    return value.replace(day=1)
+
+
+def month_bounds(month: date):
+    next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return (
+        timezone.make_aware(datetime.combine(month, datetime.min.time())),
+        timezone.make_aware(datetime.combine(next_month, datetime.min.time())),
+    )
+
+
+def refresh_cost_rollups(user_profile: UserProfile, cells=None) -> int:
+    """Recomputes FleetCostRollup rows from completed routes and maintenances.
+
+    ``cells`` is an iterable of ``(vehicle_id, month)`` pairs; when omitted the whole tenant is rebuilt.
+    """
+    if not user_profile:
+        return 0
+    routes = Route.objects.filter(user_profile=user_profile, status='completed', vehicle__isnull=False)
+    maintenances = Maintenance.objects.with_completed_at().filter(user_profile=user_profile, status='completed')
+    stale = FleetCostRollup.objects.filter(user_profile=user_profile)
+    if cells is not None:
+        cells = {(vehicle_id, month) for vehicle_id, month in cells if vehicle_id and month}
+        if not cells:
+            return 0
+        route_scope, maintenance_scope, rollup_scope = Q(), Q(), Q()
+        for vehicle_id, month in cells:
+            start, end = month_bounds(month)
+            route_scope |= Q(vehicle_id=vehicle_id, end_time__gte=start, end_time__lt=end)
+            maintenance_scope |= Q(vehicle_id=vehicle_id, completed_at__gte=start, completed_at__lt=end)
+            rollup_scope |= Q(vehicle_id=vehicle_id, month=month)
+        routes, maintenances, stale = routes.filter(route_scope), maintenances.filter(maintenance_scope), stale.filter(rollup_scope)
+
+    profile_id = getattr(user_profile, 'pk', user_profile)
+    with transaction.atomic():
+        # Refreshes of a tenant take turns on its profile row and read the source rows only once they hold
+        # it, so a concurrent refresh can neither collide on the unique cell nor write totals it read before
+        # another writer committed.
+        list(UserProfile.objects.select_for_update().filter(pk=profile_id).values_list('pk', flat=True))
+
+        rollups = {}
+
+        def rollup(row):
+            key = (row['vehicle_id'], row['month'])
+            if key not in rollups:
+                rollups[key] = FleetCostRollup(user_profile_id=profile_id, vehicle_id=key[0], month=key[1])
+            return rollups[key]
+
+        route_totals = routes.with_fuel_cost().values(
+            'vehicle_id', month=TruncMonth('end_time', output_field=DateField())
+        ).annotate(
+            routes=Count('pk'), total_distance=Sum(Coalesce('actual_distance', 'estimated_distance')),
+            total_fuel=Sum('fuel_cost'), total_toll=Sum('estimated_toll_cost'),
+        ).order_by()
+        for row in route_totals:
+            entry = rollup(row)
+            entry.route_count = row['routes']
+            entry.distance = row['total_distance'] or 0
+            entry.fuel_cost = row['total_fuel'] or 0
+            entry.toll_cost = row['total_toll'] or 0
+
+        maintenance_totals = maintenances.values(
+            'vehicle_id', month=TruncMonth('completed_at', output_field=DateField())
+        ).annotate(maintenances=Count('pk'), total_cost=Sum('actual_cost')).order_by()
+        for row in maintenance_totals:
+            entry = rollup(row)
+            entry.maintenance_count = row['maintenances']
+            entry.maintenance_cost = row['total_cost'] or 0
+
+        stale.delete()
+        FleetCostRollup.objects.bulk_create(rollups.values())
+    return len(rollups)
+
+
+def _ranked_alert_states(user_profile: UserProfile, limit: Optional[int] = None):
+    states = VehicleAlertState.objects.filter(user_profile=user_profile).select_related('vehicle').order_by(
+        *VehicleAlertState.RANK_ORDERING, 'vehicle__plate', 'service_type'
+    )
     if limit:
-        return alerts[:limit]
-    return alerts
+        states = states[:limit]
+    return states
+
+
+def _alert_from_state(state) -> VehicleAlert:
+    return VehicleAlert(state.vehicle, state.service_type, state.message, priority=state.priority,
+                        overdue_value=state.overdue_value, overdue_unit=state.overdue_unit)
+
+
+def get_vehicle_alerts(user_profile: UserProfile, limit: Optional[int] = None) -> List[VehicleAlert]:
+    if not user_profile:
+        return []
+    return [_alert_from_state(state) for state in _ranked_alert_states(user_profile, limit)]
+
+
+async def aget_vehicle_alerts(user_profile: UserProfile, limit: Optional[int] = None) -> List[VehicleAlert]:
+    if not user_profile:
+        return []
+    return [_alert_from_state(state) async for state in _ranked_alert_states(user_profile, limit)]
+
+
+RETRY_STATUSES = (502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow_request(self) -> bool:
+        return self.acquire() is not None
+
+    def acquire(self) -> Optional[bool]:
+        """None when short-circuited; otherwise whether the caller holds the single half-open trial."""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return False
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return None
+
+    def release_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class BaseServiceClient:
+    def __init__(self, name: str, connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_retries: int = 2, backoff_factor: float = 0.5, backoff_max: float = 4.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, pool_maxsize: int = 10):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.pool_maxsize = pool_maxsize
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._metrics_lock = threading.Lock()
+        self._metrics = {'requests': 0, 'errors': 0, 'short_circuited': 0, 'total_latency_ms': 0.0, 'max_latency_ms': 0.0}
+
+    def _check_circuit(self) -> bool:
+        is_trial = self.breaker.acquire()
+        if is_trial is None:
+            self._record(short_circuited=True)
+            raise CircuitOpenError(f"Serviço '{self.name}' temporariamente indisponível (circuito aberto).")
+        return is_trial
+
+    def _record_response(self, status_code: int, started: float):
+        failed = status_code >= 500
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        self._record(latency=time.monotonic() - started, error=failed)
+
+    def _record_error(self, started: float):
+        self.breaker.record_failure()
+        self._record(latency=time.monotonic() - started, error=True)
+
+    def _record(self, latency: float = 0.0, error: bool = False, short_circuited: bool = False):
+        with self._metrics_lock:
+            if short_circuited:
+                self._metrics['short_circuited'] += 1
+                return
+            latency_ms = latency * 1000
+            self._metrics['requests'] += 1
+            self._metrics['errors'] += int(error)
+            self._metrics['total_latency_ms'] += latency_ms
+            self._metrics['max_latency_ms'] = max(self._metrics['max_latency_ms'], latency_ms)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['avg_latency_ms'] = metrics['total_latency_ms'] / metrics['requests'] if metrics['requests'] else 0.0
+        metrics['circuit'] = self.breaker.state
+        return metrics
+
+
+class ServiceClient(BaseServiceClient):
+    def __init__(self, name: str, **options):
+        super().__init__(name, **options)
+        # Read timeouts are not retried: a slow upstream would otherwise hold the caller for another full
+        # read_timeout per attempt. See EXTERNAL_SERVICES in settings for the resulting worst case.
+        retry = Retry(
+            total=self.max_retries, connect=self.max_retries, read=0, status=self.max_retries,
+            backoff_factor=self.backoff_factor, backoff_max=self.backoff_max,
+            status_forcelist=RETRY_STATUSES, allowed_methods=frozenset(['GET', 'POST']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        is_trial = self._check_circuit()
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, **kwargs)
+            self._record_response(response.status_code, started)
+            return response
+        except requests.exceptions.RequestException:
+            self._record_error(started)
+            raise
+        finally:
+            # Other errors say nothing about the upstream, but the half-open trial must be handed back or
+            # every later call is short-circuited.
+            if is_trial:
+                self.breaker.release_trial()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+
+_scoped_async_clients: ContextVar[Optional[dict]] = ContextVar('scoped_async_clients', default=None)
+
+
+@asynccontextmanager
+async def async_service_client_scope():
+    """Closes the httpx clients opened inside the block when it exits.
+
+    Under WSGI every async view gets a fresh event loop that is discarded with the request, so clients cached
+    per loop would leak their connections. Under ASGI the worker's loop lives on and its clients are reused.
+    """
+    if settings.SERVER_MODE == 'asgi' or _scoped_async_clients.get() is not None:
+        yield
+        return
+    clients = {}
+    token = _scoped_async_clients.set(clients)
+    try:
+        yield
+    finally:
+        _scoped_async_clients.reset(token)
+        await asyncio.gather(*(client.aclose() for client in clients.values()))
+
+
+class AsyncServiceClient(BaseServiceClient):
+    """httpx counterpart of ServiceClient for the async views, with the same retry, breaker and metrics policy.
+
+    Transport errors are re-raised as ``requests`` exceptions so callers handle both clients the same way.
+    """
+
+    def __init__(self, name: str, **options):
+        super().__init__(name, **options)
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _new_client(self):
+        import httpx
+        connect_timeout, read_timeout = self.timeout
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_maxsize),
+            transport=httpx.AsyncHTTPTransport(retries=self.max_retries),
+        )
+
+    def _client(self):
+        # httpx connection pools are bound to the event loop that opened them, so outside a request scope
+        # (see async_service_client_scope) the client is cached per loop.
+        scoped = _scoped_async_clients.get()
+        clients, key = (scoped, self) if scoped is not None else (self._clients, asyncio.get_running_loop())
+        client = clients.get(key)
+        if client is None or client.is_closed:
+            client = clients[key] = self._new_client()
+        return client
+
+    async def request(self, method: str, url: str, **kwargs):
+        import httpx
+        is_trial = self._check_circuit()
+        started = time.monotonic()
+        try:
+            client = self._client()
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await client.request(method, url, **kwargs)
+                except httpx.TimeoutException as exc:
+                    self._record_error(started)
+                    raise requests.exceptions.Timeout(str(exc)) from exc
+                except httpx.TransportError as exc:
+                    self._record_error(started)
+                    raise requests.exceptions.ConnectionError(str(exc)) from exc
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    break
+                await asyncio.sleep(min(self.backoff_factor * (2 ** attempt), self.backoff_max))
+            self._record_response(response.status_code, started)
+            return response
+        finally:
+            # Same as ServiceClient.request; also covers a cancelled request.
+            if is_trial:
+                self.breaker.release_trial()
+
+    async def get(self, url: str, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+
+_service_clients: Dict[str, ServiceClient] = {}
+_service_clients_lock = threading.Lock()
+
+
+def get_service_client(name: str) -> ServiceClient:
+    with _service_clients_lock:
+        if name not in _service_clients:
+            options = getattr(settings, 'EXTERNAL_SERVICES', {}).get(name, {})
+            _service_clients[name] = ServiceClient(name, **options)
+        return _service_clients[name]
+
+
+_async_service_clients: Dict[str, AsyncServiceClient] = {}
+
+
+def get_async_service_client(name: str) -> AsyncServiceClient:
+    with _service_clients_lock:
+        if name not in _async_service_clients:
+            options = getattr(settings, 'EXTERNAL_SERVICES', {}).get(name, {})
+            _async_service_clients[name] = AsyncServiceClient(name, **options)
+        return _async_service_clients[name]
+
+
+def service_metrics() -> Dict[str, Dict[str, Any]]:
+    with _service_clients_lock:
+        clients = dict(_service_clients)
+        async_clients = dict(_async_service_clients)
+    metrics = {name: client.metrics() for name, client in clients.items()}
+    metrics.update({f"{name} (async)": client.metrics() for name, client in async_clients.items()})
+    return metrics
+
+
+_external_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'EXTERNAL_LOOKUP_WORKERS', 8), thread_name_prefix='external-lookup'
+)
+
+
+def _run_in_worker(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def submit_external(fn, *args, **kwargs) -> Future:
+    return _external_executor.submit(_run_in_worker, fn, *args, **kwargs)
+
+
+SCHEDULE_CONFLICT_KINDS = ('vehicle_route', 'vehicle_maintenance', 'driver_route')
+
+
+def _open_schedule() -> Q:
+    return ~Q(status__in=['completed', 'canceled'])
+
+
+def find_schedule_conflicts(start, end, vehicle=None, driver=None, exclude_route_pk=None,
+                            check_maintenances: bool = True) -> List[str]:
+    open_schedule = _open_schedule()
+    routes = Route.objects.filter(open_schedule, start_time__lt=end, end_time__gt=start)
+    if exclude_route_pk:
+        routes = routes.exclude(pk=exclude_route_pk)
+
+    parts = []
+    if vehicle:
+        parts.append(routes.filter(vehicle=vehicle).annotate(kind=Value('vehicle_route', output_field=CharField())))
+        if check_maintenances:
+            parts.append(Maintenance.objects.filter(
+                open_schedule, vehicle=vehicle, start_date__lt=end, end_date__gt=start
+            ).annotate(kind=Value('vehicle_maintenance', output_field=CharField())))
+    if driver:
+        parts.append(routes.filter(driver=driver).annotate(kind=Value('driver_route', output_field=CharField())))
+    if not parts:
+        return []
+
+    queries = [part.order_by().values_list('kind', flat=True) for part in parts]
+    found = set(queries[0].union(*queries[1:], all=True)) if len(queries) > 1 else set(queries[0])
+    return [kind for kind in SCHEDULE_CONFLICT_KINDS if kind in found]
+
+
+class ScheduleConflictIndex:
+    """Open routes and maintenances of some vehicles and drivers within ``[start, end)``, loaded in two queries.
+
+    ``find`` answers like find_schedule_conflicts for any period inside that span, so bulk imports check a
+    whole chunk of rows without a query per row.
+    """
+
+    def __init__(self, start, end, vehicle_ids=(), driver_ids=()):
+        self._periods = defaultdict(list)
+        routes = Route.objects.filter(_open_schedule(), start_time__lt=end, end_time__gt=start).filter(
+            Q(vehicle_id__in=vehicle_ids) | Q(driver_id__in=driver_ids)
+        )
+        for vehicle_id, driver_id, route_start, route_end in routes.values_list('vehicle_id', 'driver_id', 'start_time', 'end_time'):
+            self._periods['vehicle_route', vehicle_id].append((route_start, route_end))
+            self._periods['driver_route', driver_id].append((route_start, route_end))
+        maintenances = Maintenance.objects.filter(
+            _open_schedule(), vehicle_id__in=vehicle_ids, start_date__lt=end, end_date__gt=start
+        ).values_list('vehicle_id', 'start_date', 'end_date')
+        for vehicle_id, maintenance_start, maintenance_end in maintenances:
+            self._periods['vehicle_maintenance', vehicle_id].append((maintenance_start, maintenance_end))
+
+    def find(self, start, end, vehicle=None, driver=None) -> List[str]:
+        owners = {'vehicle_route': vehicle, 'vehicle_maintenance': vehicle, 'driver_route': driver}
+        return [
+            kind for kind in SCHEDULE_CONFLICT_KINDS
+            if owners[kind] and any(
+                period_start < end and period_end > start for period_start, period_end in self._periods[kind, owners[kind].pk]
+            )
+        ]
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, Dict[str, Any]] = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        if not is_leader:
+            call['done'].wait()
+            if call['error']:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+        return call['result']
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: concurrent callers on one event loop share the leader's task."""
+
+    def __init__(self):
+        self._calls: Dict[Any, asyncio.Task] = {}
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is done else None)
+        # shield() keeps one cancelled caller from cancelling the lookup the others are waiting on.
+        return await asyncio.shield(task)
+
+
+_route_details_flight = SingleFlight()
+_aroute_details_flight = AsyncSingleFlight()
+
+
+def normalize_address(address: str) -> str:
+    text = unicodedata.normalize('NFKD', address or '').encode('ascii', 'ignore').decode()
+    text = re.sub(r'\s*,\s*', ',', text.strip().lower())
+    return re.sub(r'\s+', ' ', text)[:255]
+
+
+def _fresh_route_details(start_key: str, end_key: str):
+    fresh_since = timezone.now() - timedelta(seconds=settings.ROUTE_DETAILS_CACHE_TTL)
+    return RouteDetailsCache.objects.filter(start_key=start_key, end_key=end_key, updated_at__gte=fresh_since)
+
+
+def _route_details_entry(entry) -> Optional[Dict[str, float]]:
+    if entry:
+        return {'distance': float(entry.distance), 'toll_cost': float(entry.toll_cost)}
+    return None
+
+
+def _cached_route_details(start_key: str, end_key: str) -> Optional[Dict[str, float]]:
+    return _route_details_entry(_fresh_route_details(start_key, end_key).first())
+
+
+async def _acached_route_details(start_key: str, end_key: str) -> Optional[Dict[str, float]]:
+    return _route_details_entry(await _fresh_route_details(start_key, end_key).afirst())
 
 
 def calculate_route_details(start_location: str, end_location: str) -> Union[Dict[str, float], str]:
-    url = "https://routes.googleapis.com/directions/v2:computeRoutes"
+    start_key, end_key = normalize_address(start_location), normalize_address(end_location)
+    cached = _cached_route_details(start_key, end_key)
+    if cached:
+        return cached
+
+    def fetch_and_store():
+        cached = _cached_route_details(start_key, end_key)
+        if cached:
+            return cached
+        result = fetch_route_details(start_location, end_location)
+        if isinstance(result, dict):
+            RouteDetailsCache.objects.update_or_create(
+                start_key=start_key, end_key=end_key,
+                defaults={'distance': result['distance'], 'toll_cost': result['toll_cost']}
+            )
+        return result
+
+    return _route_details_flight.do((start_key, end_key), fetch_and_store)
+
+
+async def acalculate_route_details(start_location: str, end_location: str) -> Union[Dict[str, float], str]:
+    start_key, end_key = normalize_address(start_location), normalize_address(end_location)
+    cached = await _acached_route_details(start_key, end_key)
+    if cached:
+        return cached
+
+    async def fetch_and_store():
+        cached = await _acached_route_details(start_key, end_key)
+        if cached:
+            return cached
+        result = await afetch_route_details(start_location, end_location)
+        if isinstance(result, dict):
+            await RouteDetailsCache.objects.aupdate_or_create(
+                start_key=start_key, end_key=end_key,
+                defaults={'distance': result['distance'], 'toll_cost': result['toll_cost']}
+            )
+        return result
+
+    return await _aroute_details_flight.do((start_key, end_key), fetch_and_store)
+
+
+ROUTES_API_URL = "https://routes.googleapis.com/directions/v2:computeRoutes"
+FUEL_PRICES_API_URL = "https://combustivelapi.com.br/api/precos"
+
+
+def _route_details_request(start_location: str, end_location: str):
     headers = {
         'Content-Type': 'application/json',
         'X-Goog-Api-Key': settings.GOOGLE_MAPS_API_KEY,
@@ -127,58 +754,178 @@ def calculate_route_details(start_location: str, end_location: str) -> Union[Dic
         "languageCode": "pt-BR",
         "units": "METRIC"
     }
+    return headers, body
+
+
+def _route_details_from_json(data) -> Union[Dict[str, float], str]:
+    if not data.get('routes'):
+        error_details = data.get('error', {}).get('message', 'Nenhuma rota encontrada entre os locais.')
+        return f"Erro ao calcular rota: {error_details}"
+    route = data['routes'][0]
+    distance_meters = route.get('distanceMeters', 0)
+    distance_km = round(distance_meters / 1000, 2)
+    toll_cost = 0.0
+    toll_info = route.get('travelAdvisory', {}).get('tollInfo')
+    if toll_info and toll_info.get('estimatedPrice'):
+        for price_info in toll_info['estimatedPrice']:
+            toll_cost += float(price_info.get('units', 0)) + float(price_info.get('nanos', 0)) / 1_000_000_000
+    return {'distance': distance_km, 'toll_cost': round(toll_cost, 2)}
+
+
+def _route_details_http_error(response) -> str:
+    if response.status_code == 403:
+        return f"Erro na API do Google (403): Verifique se a 'Routes API' está habilitada, o faturamento está ativo e a chave API é válida. Detalhes: {response.text}"
+    return f"Erro na API do Google (HTTP {response.status_code}): {response.text}"
+
+
+def fetch_route_details(start_location: str, end_location: str) -> Union[Dict[str, float], str]:
+    headers, body = _route_details_request(start_location, end_location)
     try:
-        response = requests.post(url, headers=headers, json=body)
+        response = get_service_client('google_routes').post(ROUTES_API_URL, headers=headers, json=body)
         response.raise_for_status()
-        data = response.json()
-        if not data.get('routes'):
-            error_details = data.get('error', {}).get('message', 'Nenhuma rota encontrada entre os locais.')
-            return f"Erro ao calcular rota: {error_details}"
-        route = data['routes'][0]
-        distance_meters = route.get('distanceMeters', 0)
-        distance_km = round(distance_meters / 1000, 2)
-        toll_cost = 0.0
-        toll_info = route.get('travelAdvisory', {}).get('tollInfo')
-        if toll_info and toll_info.get('estimatedPrice'):
-            for price_info in toll_info['estimatedPrice']:
-                toll_cost += float(price_info.get('units', 0)) + float(price_info.get('nanos', 0)) / 1_000_000_000
-        return {'distance': distance_km, 'toll_cost': round(toll_cost, 2)}
+        return _route_details_from_json(response.json())
     except requests.exceptions.HTTPError as e:
-        error_body = e.response.text
-        if e.response.status_code == 403:
-            return f"Erro na API do Google (403): Verifique se a 'Routes API' está habilitada, o faturamento está ativo e a chave API é válida. Detalhes: {error_body}"
-        return f"Erro na API do Google (HTTP {e.response.status_code}): {error_body}"
+        return _route_details_http_error(e.response)
     except requests.exceptions.RequestException as e:
         return f"Erro de conexão com a API do Google: {e}"
     except Exception as e:
         return f"Erro inesperado ao processar rota: {e}"
 
 
-def get_diesel_price(uf: str) -> Union[float, str]:
-    url = "https://combustivelapi.com.br/api/precos"
-    headers = {
-        'Accept': 'application/json, text/plain, */*',
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
-    }
+async def afetch_route_details(start_location: str, end_location: str) -> Union[Dict[str, float], str]:
+    headers, body = _route_details_request(start_location, end_location)
+    try:
+        response = await get_async_service_client('google_routes').post(ROUTES_API_URL, headers=headers, json=body)
+        if response.is_error:
+            return _route_details_http_error(response)
+        return _route_details_from_json(response.json())
+    except requests.exceptions.RequestException as e:
+        return f"Erro de conexão com a API do Google: {e}"
+    except Exception as e:
+        return f"Erro inesperado ao processar rota: {e}"
+
+
+FUEL_PRICES_HEADERS = {
+    'Accept': 'application/json, text/plain, */*',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+}
+
+
+def _diesel_price_table_from_json(data) -> Union[Dict[str, float], str]:
+    if data.get("error"):
+        return f"API de Combustível retornou um erro: {data.get('message', 'Erro desconhecido')}"
+    precos = data.get('precos')
+    if not precos:
+        return "Estrutura de resposta inesperada da API de Combustível (sem 'precos')."
+    if not precos.get('diesel'):
+        return "Preço 'diesel' não encontrado na resposta da API."
+    return {uf.upper(): float(price_str.replace(',', '.')) for uf, price_str in precos['diesel'].items()}
+
+
+def fetch_diesel_price_table() -> Union[Dict[str, float], str]:
     try:
-        response = requests.get(url, headers=headers)
+        response = get_service_client('fuel_prices').get(FUEL_PRICES_API_URL, headers=FUEL_PRICES_HEADERS)
         response.raise_for_status()
-        data = response.json()
-        if data.get("error"):
-            return f"API de Combustível retornou um erro: {data.get('message', 'Erro desconhecido')}"
-        precos = data.get('precos')
-        if not precos:
-            return "Estrutura de resposta inesperada da API de Combustível (sem 'precos')."
-        uf_lower = uf.lower()
-        price_str = None
-        if 'diesel' in precos and uf_lower in precos['diesel']:
-            price_str = precos['diesel'][uf_lower]
-        else:
-            return f"Preço 'diesel' não encontrado para a UF: {uf.upper()} na resposta da API."
-        return float(price_str.replace(',', '.'))
+        return _diesel_price_table_from_json(response.json())
     except requests.exceptions.HTTPError as e:
         return f"Erro na API de Combustível (HTTP {e.response.status_code}). O servidor não aceitou a requisição."
     except requests.exceptions.RequestException as e:
         return f"Erro de conexão com a API de Combustível: {e}"
-    except (ValueError, TypeError, KeyError) as e:
-        return f"Erro ao processar a resposta JSON da API: {e}"
\ No newline at end of file
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        return f"Erro ao processar a resposta JSON da API: {e}"
+
+
+async def afetch_diesel_price_table() -> Union[Dict[str, float], str]:
+    try:
+        response = await get_async_service_client('fuel_prices').get(FUEL_PRICES_API_URL, headers=FUEL_PRICES_HEADERS)
+        if response.is_error:
+            return f"Erro na API de Combustível (HTTP {response.status_code}). O servidor não aceitou a requisição."
+        return _diesel_price_table_from_json(response.json())
+    except requests.exceptions.RequestException as e:
+        return f"Erro de conexão com a API de Combustível: {e}"
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        return f"Erro ao processar a resposta JSON da API: {e}"
+
+
+def _diesel_snapshots(table, fetched_at):
+    return [FuelPriceSnapshot(fuel_type='diesel', uf=uf, price=price, fetched_at=fetched_at) for uf, price in table.items()]
+
+
+def _diesel_snapshot_upsert() -> Dict[str, Any]:
+    # MySQL upserts with ON DUPLICATE KEY UPDATE and rejects an explicit conflict target.
+    options = {'update_conflicts': True, 'update_fields': ['price', 'fetched_at']}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['fuel_type', 'uf']
+    return options
+
+
+def refresh_diesel_prices() -> Union[int, str]:
+    table = fetch_diesel_price_table()
+    if isinstance(table, str):
+        return table
+    FuelPriceSnapshot.objects.bulk_create(_diesel_snapshots(table, timezone.now()), **_diesel_snapshot_upsert())
+    return len(table)
+
+
+async def arefresh_diesel_prices() -> Union[int, str]:
+    table = await afetch_diesel_price_table()
+    if isinstance(table, str):
+        return table
+    await FuelPriceSnapshot.objects.abulk_create(_diesel_snapshots(table, timezone.now()), **_diesel_snapshot_upsert())
+    return len(table)
+
+
+_fuel_price_flight = SingleFlight()
+_afuel_price_flight = AsyncSingleFlight()
+
+
+def _diesel_snapshot_query(uf: str):
+    return FuelPriceSnapshot.objects.filter(fuel_type='diesel', uf=uf)
+
+
+def _fresh_since():
+    return timezone.now() - timedelta(seconds=settings.FUEL_PRICE_MAX_AGE)
+
+
+def _is_fresh_snapshot(snapshot) -> bool:
+    return snapshot.fetched_at >= _fresh_since()
+
+
+def _fresh_diesel_table():
+    # Every refresh stamps all UFs it returned, so one fresh row means the table was fetched recently and a
+    # UF still missing (or stale) is absent upstream; refetching would not change the answer until it expires.
+    return FuelPriceSnapshot.objects.filter(fuel_type='diesel', fetched_at__gte=_fresh_since())
+
+
+def _diesel_price_from_snapshot(uf: str, snapshot) -> Union[float, str]:
+    if not snapshot:
+        return f"Preço 'diesel' não encontrado para a UF: {uf} na resposta da API."
+    return float(snapshot.price)
+
+
+def get_diesel_price(uf: str) -> Union[float, str]:
+    uf = uf.upper()
+    snapshot = _diesel_snapshot_query(uf).first()
+    if snapshot and _is_fresh_snapshot(snapshot):
+        return float(snapshot.price)
+
+    if not _fresh_diesel_table().exists():
+        refreshed = _fuel_price_flight.do('diesel', refresh_diesel_prices)
+        if isinstance(refreshed, str):
+            return float(snapshot.price) if snapshot else refreshed
+        snapshot = _diesel_snapshot_query(uf).first()
+    return _diesel_price_from_snapshot(uf, snapshot)
+
+
+async def aget_diesel_price(uf: str) -> Union[float, str]:
+    uf = uf.upper()
+    snapshot = await _diesel_snapshot_query(uf).afirst()
+    if snapshot and _is_fresh_snapshot(snapshot):
+        return float(snapshot.price)
+
+    if not await _fresh_diesel_table().aexists():
+        refreshed = await _afuel_price_flight.do('diesel', arefresh_diesel_prices)
+        if isinstance(refreshed, str):
+            return float(snapshot.price) if snapshot else refreshed
+        snapshot = await _diesel_snapshot_query(uf).afirst()
+    return _diesel_price_from_snapshot(uf, snapshot)
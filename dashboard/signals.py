@@ -0,0 +1,123 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from accounts.models import UserProfile
+from .middleware import profile_cache_key
+from .models import AlertConfiguration, Driver, Maintenance, Route, Vehicle
+from .services import month_start, refresh_cost_rollups, refresh_vehicle_alert_states
+from .tenant_cache import bump_tenant_cache_version
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    cache.delete(profile_cache_key(instance.user_id))
+
+
+@receiver(post_save, sender=Vehicle)
+def refresh_alerts_for_vehicle(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_vehicle_alert_states(instance.user_profile_id, vehicle_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def refresh_alerts_for_route(sender, instance, raw=False, **kwargs):
+    vehicle_ids = getattr(instance, '_affected_vehicle_ids', None)
+    if not raw and vehicle_ids:
+        refresh_vehicle_alert_states(instance.user_profile_id, vehicle_ids=vehicle_ids)
+
+
+@receiver(pre_save, sender=Maintenance)
+def remember_previous_maintenance(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if not raw and instance.pk:
+        instance._previous_state = Maintenance.objects.filter(pk=instance.pk).values(
+            'vehicle_id', 'status', 'end_date', 'actual_end_date'
+        ).first()
+
+
+@receiver(post_save, sender=Maintenance)
+@receiver(post_delete, sender=Maintenance)
+def refresh_alerts_for_maintenance(sender, instance, raw=False, **kwargs):
+    if not raw:
+        previous = getattr(instance, '_previous_state', None) or {}
+        vehicle_ids = {instance.vehicle_id, previous.get('vehicle_id')} - {None}
+        refresh_vehicle_alert_states(instance.user_profile_id, vehicle_ids=vehicle_ids)
+
+
+def _refresh_cost_rollups_on_commit(user_profile_id, cells):
+    # Deferred so the aggregates read the committed rows and the route/maintenance save does not hold
+    # the tenant's rollup lock.
+    if cells:
+        transaction.on_commit(partial(refresh_cost_rollups, user_profile_id, cells))
+
+
+def _completed_cells(states, completed_field):
+    return {
+        (state['vehicle_id'], month_start(state[completed_field]))
+        for state in states
+        if state and state['status'] == 'completed' and state['vehicle_id'] and state[completed_field]
+    }
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def refresh_cost_rollups_for_route(sender, instance, raw=False, **kwargs):
+    if not raw:
+        current = {'vehicle_id': instance.vehicle_id, 'status': instance.status, 'end_time': instance.end_time}
+        cells = _completed_cells([getattr(instance, '_previous_state', None), current], 'end_time')
+        _refresh_cost_rollups_on_commit(instance.user_profile_id, cells)
+
+
+@receiver(post_save, sender=Maintenance)
+@receiver(post_delete, sender=Maintenance)
+def refresh_cost_rollups_for_maintenance(sender, instance, raw=False, **kwargs):
+    if not raw:
+        states = [getattr(instance, '_previous_state', None), {
+            'vehicle_id': instance.vehicle_id, 'status': instance.status,
+            'end_date': instance.end_date, 'actual_end_date': instance.actual_end_date,
+        }]
+        for state in filter(None, states):
+            state['completed_at'] = state['actual_end_date'] or state['end_date']
+        _refresh_cost_rollups_on_commit(instance.user_profile_id, _completed_cells(states, 'completed_at'))
+
+
+ALERT_RULE_FIELDS = ('user_profile_id', 'service_type', 'km_threshold', 'days_threshold', 'is_active', 'priority')
+
+
+@receiver(pre_save, sender=AlertConfiguration)
+def remember_previous_rule(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if not raw and instance.pk:
+        instance._previous_state = AlertConfiguration.objects.filter(pk=instance.pk).values(*ALERT_RULE_FIELDS).first()
+
+
+@receiver(post_save, sender=AlertConfiguration)
+@receiver(post_delete, sender=AlertConfiguration)
+def refresh_alerts_for_rules(sender, instance, raw=False, **kwargs):
+    # A rule only decides alerts of its own service type, so just those states are recomputed.
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    current = {field: getattr(instance, field) for field in ALERT_RULE_FIELDS}
+    if kwargs.get('signal') is post_save and previous == current:
+        return
+    scopes = {(state['user_profile_id'], state['service_type']) for state in filter(None, [previous, current])}
+    for user_profile_id, service_type in scopes:
+        refresh_vehicle_alert_states(user_profile_id, service_types=[service_type])
+
+
+@receiver(post_save, sender=Driver)
+@receiver(post_delete, sender=Driver)
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_save, sender=Maintenance)
+@receiver(post_delete, sender=Maintenance)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def bump_tenant_stats_version(sender, instance, **kwargs):
+    bump_tenant_cache_version(instance.user_profile_id)
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.db import BaseDatabaseCache
+
+
+def _cache_saves_queries():
+    # On a database-backed cache the version and stats reads cost more than the aggregate they replace.
+    return not isinstance(caches['default'], BaseDatabaseCache)
+
+
+def _version_key(profile_id):
+    return f"tenant_version:{profile_id}"
+
+
+def tenant_cache_version(profile_id):
+    key = _version_key(profile_id)
+    version = cache.get(key)
+    if version is None:
+        # Seeding from the clock means an evicted counter never falls back to a version that was already used.
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_tenant_cache_version(profile_id):
+    if not profile_id or not _cache_saves_queries():
+        return
+    try:
+        cache.incr(_version_key(profile_id))
+    except ValueError:
+        tenant_cache_version(profile_id)
+
+
+def cached_tenant_stats(profile, name, compute):
+    if not _cache_saves_queries():
+        return compute()
+    key = f"tenant_stats:{profile.pk}:{tenant_cache_version(profile.pk)}:{name}"
+    return cache.get_or_set(key, compute, settings.TENANT_STATS_CACHE_TTL)
@@ -0,0 +1,44 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from ..benchmarks import dashboard_get_urls, seed_fleet
+from ..middleware import query_fingerprint
+
+SMALL_FLEET = {'vehicle_count': 2, 'routes_per_vehicle': 2, 'maintenances_per_vehicle': 2}
+LARGE_FLEET = {'vehicle_count': 8, 'routes_per_vehicle': 4, 'maintenances_per_vehicle': 3}
+
+
+class QueryBudgetMixin:
+    """Renders every dashboard GET view for a small and a large tenant and compares their SQL.
+
+    A view's query count must not depend on how many vehicles, routes or maintenances the tenant has.
+    """
+
+    def fleet_queries(self, **fleet):
+        profile = seed_fleet(**fleet)
+        client = Client()
+        client.force_login(profile.user)
+        queries = {}
+        for name, url in dashboard_get_urls(profile):
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            self.assertLess(response.status_code, 400, f"{name} ({url}) respondeu {response.status_code}")
+            queries[name] = [query_fingerprint(query['sql']) for query in captured]
+        return queries
+
+    def assertQueryCountStable(self, name, small, large):
+        if len(small) == len(large):
+            return
+        extra = Counter(large) - Counter(small)
+        missing = Counter(small) - Counter(large)
+        lines = [f"{name}: {len(small)} consultas no tenant pequeno, {len(large)} no grande."]
+        lines += [f"  +{count}x {sql}" for sql, count in extra.most_common()]
+        lines += [f"  -{count}x {sql}" for sql, count in missing.most_common()]
+        self.fail("\n".join(lines))
@@ -1,20 +1,42 @@
-from django.test import TestCase, Client
+from asgiref.sync import async_to_sync
+from django import forms
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.utils import timezone
-from datetime import date, timedelta
-from unittest.mock import patch
+from datetime import date, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
 from decimal import Decimal
 from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from io import BytesIO, StringIO
+import asyncio
+import csv
+import json
+import os
+import tempfile
 import requests
 
-from ..models import Driver, Vehicle, Route, Maintenance, AlertConfiguration
+from ..models import Driver, Vehicle, Route, Maintenance, AlertConfiguration, FuelPriceSnapshot, FleetCostRollup, VehicleAlertState
 from accounts.models import UserProfile
-from ..forms import DriverForm, MaintenanceForm, RouteForm
-from ..services import get_vehicle_alerts, VehicleAlert, calculate_route_details, get_diesel_price
+from ..forms import DriverForm, MaintenanceForm, RouteForm, RouteImportForm
+from ..export_views import CsvExportView
+from ..importers import RouteImporter, VehicleImporter, read_rows
+from ..pagination import encode_cursor
+from ..middleware import QueryRecorder, get_cached_profile, query_fingerprint
+from ..tenant_cache import cached_tenant_stats
+from ..services import get_vehicle_alerts, compute_vehicle_alerts, VehicleAlert, calculate_route_details, get_diesel_price, normalize_address, SingleFlight, find_schedule_conflicts, acalculate_route_details, AsyncSingleFlight, AsyncServiceClient, async_service_client_scope
+import threading
+import time
 
 class DashboardBaseTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.user_a = User.objects.create_user(
             username='user_a@teste.com', 
             password='password123',
@@ -86,6 +108,84 @@ class ModelTests(DashboardBaseTestCase):
         self.vehicle_a.refresh_from_db()
         self.assertEqual(self.vehicle_a.mileage, 10150)
 
+    def test_vehicle_odometer_tracks_route_edits(self):
+        route = Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+            start_location="Origem", end_location="Destino",
+            start_time=self.now - timedelta(days=2), end_time=self.now - timedelta(days=1),
+            status='completed', actual_distance=100
+        )
+        route.actual_distance = 250
+        route.save()
+        self.vehicle_a.refresh_from_db()
+        self.assertEqual(self.vehicle_a.mileage, 10250)
+
+        route.vehicle = self.vehicle_b
+        route.save()
+        self.vehicle_a.refresh_from_db()
+        self.vehicle_b.refresh_from_db()
+        self.assertEqual(self.vehicle_a.mileage, 10000)
+        self.assertEqual(self.vehicle_b.mileage, 50250)
+
+        route.status = 'canceled'
+        route.save()
+        self.vehicle_b.refresh_from_db()
+        self.assertEqual(self.vehicle_b.mileage, 50000)
+
+        route.status = 'completed'
+        route.save()
+        route.delete()
+        self.vehicle_b.refresh_from_db()
+        self.assertEqual(self.vehicle_b.mileage, 50000)
+
+    def test_rebuild_odometers_command(self):
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+            start_location="Origem", end_location="Destino",
+            start_time=self.now - timedelta(days=2), end_time=self.now - timedelta(days=1),
+            status='completed', actual_distance=120
+        )
+        Vehicle.objects.filter(pk=self.vehicle_a.pk).update(completed_routes_mileage=0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_odometers', '--check', stdout=StringIO())
+        call_command('rebuild_odometers', stdout=StringIO())
+        self.vehicle_a.refresh_from_db()
+        self.assertEqual(self.vehicle_a.mileage, 10120)
+        call_command('rebuild_odometers', '--check', stdout=StringIO())
+
+    def test_explain_tenant_indexes_command(self):
+        out = StringIO()
+        call_command('explain_tenant_indexes', '--vehicles', '20', '--repeat', '1', stdout=out)
+        report = out.getvalue()
+        self.assertIn('route_tenant_start_idx', report)
+        self.assertIn('USE TEMP B-TREE FOR ORDER BY', report)
+        self.assertFalse(Vehicle.objects.filter(model='Bench').exists())
+        self.assertEqual(Route.objects.filter(user_profile=self.profile_a).order_by('-start_time').explain().count('TEMP B-TREE'), 0)
+
+    def test_benchmark_views_command_writes_report_and_compares_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path = os.path.join(tmp, 'report.json')
+            call_command('benchmark_views', '--sizes', '3', '--repeat', '2', '--output', report_path, stdout=StringIO())
+            with open(report_path) as report_file:
+                report = json.load(report_file)
+            results = report['sizes']['3']
+            self.assertEqual(results['vehicle-list']['status'], 200)
+            self.assertIn('vehicle-route-history', results)
+            self.assertEqual(report['skipped']['vehicle-add'], "somente POST")
+            self.assertLessEqual(results['dashboard']['p50_ms'], results['dashboard']['p95_ms'])
+            self.assertFalse(Vehicle.objects.filter(model='Bench').exists())
+
+            results['vehicle-list']['queries'] = 0
+            with open(report_path, 'w') as report_file:
+                json.dump(report, report_file)
+            out = StringIO()
+            with self.assertRaisesMessage(CommandError, 'linha de base'):
+                call_command(
+                    'benchmark_views', '--sizes', '3', '--repeat', '1', '--baseline', report_path,
+                    '--fail-on-regression', stdout=out,
+                )
+            self.assertIn('[3] vehicle-list: 0 ->', out.getvalue())
+
     def test_str_methods(self):
         self.assertEqual(str(self.driver_a), "Motorista A")
         self.assertEqual(str(self.vehicle_a), "Modelo A - AAA-1111")
@@ -125,6 +225,21 @@ class ModelTests(DashboardBaseTestCase):
         self.vehicle_a.refresh_from_db()
         self.assertEqual(self.vehicle_a.dynamic_status_slug, 'maintenance')
 
+    def test_vehicle_with_dynamic_status_annotation(self):
+        v_route = Vehicle.objects.create(user_profile=self.profile_a, plate='ROT-0002', model='R', year=2022, initial_mileage=0, acquisition_date=date.today())
+        Route.objects.create(user_profile=self.profile_a, vehicle=v_route, driver=self.driver_a, start_location="A", end_location="B", start_time=self.now - timedelta(hours=1), end_time=self.now + timedelta(hours=1), status='in_progress')
+        v_maint = Vehicle.objects.create(user_profile=self.profile_a, plate='MNT-0002', model='M', year=2022, initial_mileage=0, acquisition_date=date.today())
+        Maintenance.objects.create(user_profile=self.profile_a, vehicle=v_maint, service_type="S", start_date=self.now - timedelta(days=3), end_date=self.now - timedelta(days=2), mechanic_shop_name="O", current_mileage=0, status='scheduled')
+        Vehicle.objects.create(user_profile=self.profile_a, plate='DIS-0002', model='D', year=2022, initial_mileage=0, acquisition_date=date.today(), status='disabled')
+
+        expected = {v.plate: v.dynamic_status_slug for v in Vehicle.objects.filter(user_profile=self.profile_a)}
+        with self.assertNumQueries(1):
+            annotated = list(Vehicle.objects.filter(user_profile=self.profile_a).with_dynamic_status())
+            self.assertEqual({v.plate: v.dynamic_status_slug for v in annotated}, expected)
+            self.assertEqual({v.plate: v.dynamic_status for v in annotated}['MNT-0002'], "Em Manutenção")
+        counts = Vehicle.objects.filter(user_profile=self.profile_a).with_dynamic_status().status_counts()
+        self.assertEqual(counts, {'total': 4, 'available': 1, 'on_route': 1, 'maintenance': 1, 'disabled': 1})
+
     def test_route_properties(self):
         route = Route.objects.create(
             user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
@@ -263,6 +378,66 @@ class FormTests(DashboardBaseTestCase):
         self.assertFalse(form.is_valid())
         self.assertIn('__all__', form.errors)
 
+    def test_route_form_reports_every_conflict_in_one_query(self):
+        window_start = self.now + timedelta(days=3)
+        other_driver = Driver.objects.create(
+            user_profile=self.profile_a, full_name='Motorista C', email='driver_c@teste.com',
+            license_number='33333333333', admission_date=date(2024, 1, 1)
+        )
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=other_driver,
+            start_location="A, SC", end_location="B, SC",
+            start_time=window_start, end_time=window_start + timedelta(hours=4), status='scheduled'
+        )
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_b, driver=self.driver_a,
+            start_location="A, SC", end_location="B, SC",
+            start_time=window_start, end_time=window_start + timedelta(hours=4), status='scheduled'
+        )
+        Maintenance.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, service_type="C",
+            start_date=window_start, end_date=window_start + timedelta(hours=4),
+            mechanic_shop_name="O", current_mileage=10000, status='scheduled'
+        )
+        with self.assertNumQueries(1):
+            conflicts = find_schedule_conflicts(
+                window_start + timedelta(hours=1), window_start + timedelta(hours=2),
+                vehicle=self.vehicle_a, driver=self.driver_a
+            )
+        self.assertEqual(conflicts, ['vehicle_route', 'vehicle_maintenance', 'driver_route'])
+
+        form_data = {
+            'start_location': 'C, SC', 'end_location': 'D, SC',
+            'vehicle': self.vehicle_a.pk, 'driver': self.driver_a.pk,
+            'start_time': (window_start + timedelta(hours=1)).strftime('%d/%m/%Y %H:%M'),
+            'end_time': (window_start + timedelta(hours=2)).strftime('%d/%m/%Y %H:%M'),
+        }
+        form = RouteForm(data=form_data, user_profile=self.profile_a)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(len(form.errors['__all__']), 3)
+
+    def test_maintenance_form_detects_route_conflict(self):
+        window_start = self.now + timedelta(days=3)
+        route = Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+            start_location="A, SC", end_location="B, SC",
+            start_time=window_start, end_time=window_start + timedelta(hours=4), status='scheduled'
+        )
+        maintenance = Maintenance.objects.create(
+            pk=route.pk, user_profile=self.profile_a, vehicle=self.vehicle_a, service_type="Troca de Óleo e Filtros",
+            start_date=window_start + timedelta(days=2), end_date=window_start + timedelta(days=3),
+            mechanic_shop_name="O", current_mileage=10000, status='scheduled'
+        )
+        form_data = {
+            'vehicle': self.vehicle_a.pk, 'service_choice': 'Troca de Óleo e Filtros',
+            'start_date': (window_start + timedelta(hours=1)).strftime('%d/%m/%Y %H:%M'),
+            'end_date': (window_start + timedelta(hours=2)).strftime('%d/%m/%Y %H:%M'),
+            'mechanic_shop_name': 'X', 'current_mileage': self.vehicle_a.mileage
+        }
+        form = MaintenanceForm(data=form_data, instance=maintenance, user_profile=self.profile_a)
+        self.assertFalse(form.is_valid())
+        self.assertIn('__all__', form.errors)
+
 class CoreViewTests(DashboardBaseTestCase):
     def setUp(self):
         super().setUp()
@@ -283,6 +458,53 @@ class CoreViewTests(DashboardBaseTestCase):
         self.assertEqual(ctx['in_use'], 1) 
         self.assertEqual(ctx['maintenance'], 1)
 
+    def test_dashboard_query_count_is_constant(self):
+        AlertConfiguration.objects.create(user_profile=self.profile_a, service_type='Revisão Geral', days_threshold=1, is_active=True)
+        for i in range(10):
+            v = Vehicle.objects.create(user_profile=self.profile_a, plate=f'QRY-{i}', model='M', year=2022, initial_mileage=0, acquisition_date=date(2020, 1, 1), status='disabled' if i % 3 == 0 else 'available')
+            Driver.objects.create(user_profile=self.profile_a, full_name=f'Motorista {i}', email=f'm{i}@t.com', license_number=f'{i:011d}', admission_date=date.today(), is_active=i % 2 == 0)
+            Maintenance.objects.create(user_profile=self.profile_a, vehicle=v, service_type="S", start_date=self.now + timedelta(days=i + 1), end_date=self.now + timedelta(days=i + 2), mechanic_shop_name="O", current_mileage=0, status='scheduled')
+        self.client.get(reverse('dashboard'))
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['vehicle_overview']['total'], 11)
+        self.assertEqual(response.context['vehicle_overview']['unavailable'], 4)
+        self.assertEqual(response.context['driver_overview'], {'total': 11, 'active': 6, 'inactive': 5})
+
+    def test_profile_is_cached_per_user_and_invalidated_on_save(self):
+        self.client.get(reverse('dashboard'))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cached_profile(self.user_a), self.profile_a)
+        self.profile_a.company_name = 'Empresa Renomeada'
+        self.profile_a.save()
+        response = self.client.get(self.profile_url)
+        self.assertEqual(response.context['profile'].company_name, 'Empresa Renomeada')
+
+    def test_missing_profile_returns_404(self):
+        self.profile_a.delete()
+        self.assertEqual(self.client.get(reverse('vehicle-list')).status_code, 404)
+
+    def test_list_stats_are_cached_until_the_tenant_writes(self):
+        url = reverse('driver-list')
+        self.assertEqual(self.client.get(url).context['stats']['total'], 1)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.context['stats']['total'], 1)
+
+        Driver.objects.create(user_profile=self.profile_b, full_name='Outra Empresa', email='outra@t.com', license_number='55555555555', admission_date=date.today())
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+        Driver.objects.create(user_profile=self.profile_a, full_name='Novo', email='novo@t.com', license_number='44444444444', admission_date=date.today())
+        self.assertEqual(self.client.get(url).context['stats']['total'], 2)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'django_cache'}})
+    def test_tenant_stats_skip_a_database_backed_cache(self):
+        # The test database has no cache table, so any version or stats read would raise.
+        Driver.objects.create(user_profile=self.profile_a, full_name='Novo', email='novo@t.com', license_number='44444444444', admission_date=date.today())
+        with self.assertNumQueries(0):
+            self.assertEqual(cached_tenant_stats(self.profile_a, 'drivers', lambda: 'calculado'), 'calculado')
+
     def test_user_profile_view_get(self):
         response = self.client.get(self.profile_url)
         self.assertEqual(response.status_code, 200)
@@ -632,6 +854,113 @@ class LogicTests(DashboardBaseTestCase):
         alerts = get_vehicle_alerts(self.profile_a, limit=2)
         self.assertEqual(len(alerts), 2)
 
+    def test_get_vehicle_alerts_breaks_ties_by_plate_and_service(self):
+        for service_type in ('Troca de Pneus', 'Revisão Geral'):
+            AlertConfiguration.objects.create(user_profile=self.profile_a, service_type=service_type, km_threshold=1, is_active=True)
+        for plate in ('ZZZ-001', 'AAA-001'):
+            v = Vehicle.objects.create(user_profile=self.profile_a, plate=plate, model='M', year=2020, initial_mileage=100, acquisition_date=date.today())
+            for service_type in ('Troca de Pneus', 'Revisão Geral'):
+                Maintenance.objects.create(user_profile=self.profile_a, vehicle=v, service_type=service_type, start_date=self.now, end_date=self.now, mechanic_shop_name="O", current_mileage=10, status='completed', actual_end_date=self.now)
+        alerts = [a for a in get_vehicle_alerts(self.profile_a) if a.vehicle.plate in ('ZZZ-001', 'AAA-001')]
+        self.assertEqual(
+            [(a.vehicle.plate, a.service_type) for a in alerts],
+            [('AAA-001', 'Revisão Geral'), ('AAA-001', 'Troca de Pneus'), ('ZZZ-001', 'Revisão Geral'), ('ZZZ-001', 'Troca de Pneus')],
+        )
+
+    def test_get_vehicle_alerts_uses_latest_completed_maintenance(self):
+        AlertConfiguration.objects.create(user_profile=self.profile_a, service_type='Revisão Geral', km_threshold=100, is_active=True)
+        Route.objects.create(user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location="A", end_location="B", start_time=self.now - timedelta(days=2), end_time=self.now - timedelta(days=1), status='completed', actual_distance=500)
+        Maintenance.objects.create(user_profile=self.profile_a, vehicle=self.vehicle_a, service_type='Revisão Geral', start_date=self.now, end_date=self.now, mechanic_shop_name="O", current_mileage=10000, status='completed', actual_end_date=self.now - timedelta(days=30))
+        Maintenance.objects.create(user_profile=self.profile_a, vehicle=self.vehicle_a, service_type='Revisão Geral', start_date=self.now, end_date=self.now, mechanic_shop_name="O", current_mileage=10300, status='completed', actual_end_date=self.now - timedelta(days=1))
+        Maintenance.objects.create(user_profile=self.profile_a, vehicle=self.vehicle_a, service_type='Revisão Geral', start_date=self.now, end_date=self.now, mechanic_shop_name="O", current_mileage=10450, status='scheduled')
+        alerts = get_vehicle_alerts(self.profile_a)
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0].message, "Vencida por 100 km")
+
+    def test_get_vehicle_alerts_query_count_is_constant(self):
+        for service_type in ('Revisão Geral', 'Troca de Pneus', 'Revisão dos Freios'):
+            AlertConfiguration.objects.create(user_profile=self.profile_a, service_type=service_type, km_threshold=1, days_threshold=1, is_active=True)
+        for i in range(5):
+            v = Vehicle.objects.create(user_profile=self.profile_a, plate=f'QC-{i}', model='M', year=2020, initial_mileage=100, acquisition_date=date(2020, 1, 1))
+            Maintenance.objects.create(user_profile=self.profile_a, vehicle=v, service_type='Troca de Pneus', start_date=self.now, end_date=self.now, mechanic_shop_name="O", current_mileage=10, status='completed', actual_end_date=self.now)
+        with self.assertNumQueries(3):
+            computed = compute_vehicle_alerts(self.profile_a)
+        with self.assertNumQueries(1):
+            alerts = get_vehicle_alerts(self.profile_a)
+        self.assertEqual(len(alerts), 18)
+        self.assertEqual(alerts, sorted(alerts, reverse=True))
+        self.assertEqual(
+            [(a.vehicle.pk, a.priority, a.overdue_unit, a.overdue_value) for a in alerts],
+            [(a.vehicle.pk, a.priority, a.overdue_unit, a.overdue_value) for a in computed],
+        )
+
+    def test_alert_states_follow_domain_events(self):
+        AlertConfiguration.objects.create(user_profile=self.profile_a, service_type='Revisão Geral', km_threshold=100, is_active=True)
+        self.assertEqual(get_vehicle_alerts(self.profile_a), [])
+
+        route = Route.objects.create(user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location="A", end_location="B", start_time=self.now - timedelta(days=2), end_time=self.now - timedelta(days=1), status='completed', actual_distance=150)
+        self.assertEqual([a.message for a in get_vehicle_alerts(self.profile_a)], ["Vencida por 50 km"])
+
+        Maintenance.objects.create(user_profile=self.profile_a, vehicle=self.vehicle_a, service_type='Revisão Geral', start_date=self.now, end_date=self.now, mechanic_shop_name="O", current_mileage=10150, status='completed', actual_end_date=self.now)
+        self.assertEqual(get_vehicle_alerts(self.profile_a), [])
+
+        route.delete()
+        Maintenance.objects.all().delete()
+        self.assertEqual(get_vehicle_alerts(self.profile_a), [])
+
+    def test_refresh_vehicle_alerts_command_advances_day_thresholds(self):
+        Vehicle.objects.filter(pk=self.vehicle_a.pk).update(acquisition_date=date.today() - timedelta(days=10))
+        AlertConfiguration.objects.create(user_profile=self.profile_a, service_type='Revisão Geral', days_threshold=30, is_active=True)
+        Vehicle.objects.filter(pk=self.vehicle_a.pk).update(acquisition_date=date.today() - timedelta(days=45))
+        self.assertEqual(get_vehicle_alerts(self.profile_a), [])
+        call_command('refresh_vehicle_alerts', stdout=StringIO())
+        self.assertEqual([a.message for a in get_vehicle_alerts(self.profile_a)], ["Vencida por 15 dias"])
+
+    def test_cron_endpoint_refreshes_alerts_only_for_app_engine_cron(self):
+        Vehicle.objects.filter(pk=self.vehicle_a.pk).update(acquisition_date=date.today() - timedelta(days=10))
+        AlertConfiguration.objects.create(user_profile=self.profile_a, service_type='Revisão Geral', days_threshold=30, is_active=True)
+        Vehicle.objects.filter(pk=self.vehicle_a.pk).update(acquisition_date=date.today() - timedelta(days=45))
+        anonymous = Client()
+        self.assertEqual(anonymous.get(reverse('cron-refresh-alerts')).status_code, 403)
+        self.assertEqual(get_vehicle_alerts(self.profile_a), [])
+        response = anonymous.get(reverse('cron-refresh-alerts'), headers={'X-Appengine-Cron': 'true'})
+        self.assertEqual(response.json(), {'alerts': 1, 'tenants': 1})
+        self.assertEqual([a.message for a in get_vehicle_alerts(self.profile_a)], ["Vencida por 15 dias"])
+
+    def test_deploy_backfill_only_runs_while_alert_states_are_empty(self):
+        Vehicle.objects.filter(pk=self.vehicle_a.pk).update(acquisition_date=date.today() - timedelta(days=10))
+        AlertConfiguration.objects.create(user_profile=self.profile_a, service_type='Revisão Geral', days_threshold=30, is_active=True)
+        Vehicle.objects.filter(pk=self.vehicle_a.pk).update(acquisition_date=date.today() - timedelta(days=45))
+        VehicleAlertState.objects.all().delete()
+        call_command('refresh_vehicle_alerts', '--if-empty', stdout=StringIO())
+        self.assertEqual([a.message for a in get_vehicle_alerts(self.profile_a)], ["Vencida por 15 dias"])
+
+        VehicleAlertState.objects.update(message='já calculado')
+        call_command('refresh_vehicle_alerts', '--if-empty', stdout=StringIO())
+        self.assertEqual([a.message for a in get_vehicle_alerts(self.profile_a)], ["já calculado"])
+
+    def test_rule_change_only_recomputes_its_service_type(self):
+        AlertConfiguration.objects.create(user_profile=self.profile_a, service_type='Revisão Geral', km_threshold=100, is_active=True)
+        tires = AlertConfiguration.objects.create(user_profile=self.profile_a, service_type='Troca de Pneus', km_threshold=100, is_active=True)
+        Route.objects.create(user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location="A", end_location="B", start_time=self.now - timedelta(days=2), end_time=self.now - timedelta(days=1), status='completed', actual_distance=150)
+        VehicleAlertState.objects.filter(service_type='Revisão Geral').update(message='intocado')
+
+        with self.assertNumQueries(2):
+            tires.save()
+        tires.km_threshold = 120
+        tires.save()
+        self.assertEqual(
+            dict(VehicleAlertState.objects.values_list('service_type', 'message')),
+            {'Revisão Geral': 'intocado', 'Troca de Pneus': 'Vencida por 30 km'},
+        )
+
+        tires.service_type = 'Revisão dos Freios'
+        tires.save()
+        self.assertEqual(
+            dict(VehicleAlertState.objects.values_list('service_type', 'message')),
+            {'Revisão Geral': 'intocado', 'Revisão dos Freios': 'Vencida por 30 km'},
+        )
+
     def test_vehicle_alert_comparison(self):
         v = self.vehicle_a
         a1 = VehicleAlert(v, 'S1', 'M1', 'high', 10, 'days')
@@ -642,7 +971,7 @@ class LogicTests(DashboardBaseTestCase):
         self.assertTrue(a2 < a3) 
         self.assertFalse(a4 < a2) 
 
-    @patch('dashboard.services.requests.post')
+    @patch('dashboard.services.ServiceClient.post')
     def test_calculate_route_details_api_error_403(self, mock_post):
         from ..services import calculate_route_details
         mock_response = mock_post.return_value
@@ -653,14 +982,87 @@ class LogicTests(DashboardBaseTestCase):
         self.assertIsInstance(result, str)
         self.assertIn("Erro na API do Google (403)", result)
 
-    @patch('dashboard.services.requests.post')
+    @patch('dashboard.services.ServiceClient.post')
     def test_calculate_route_details_generic_exception(self, mock_post):
         from ..services import calculate_route_details
         mock_post.side_effect = Exception("Generic Error")
         result = calculate_route_details("A", "B")
         self.assertIn("Erro inesperado", result)
 
-    @patch('dashboard.services.requests.get')
+    @patch('dashboard.services.ServiceClient.post')
+    def test_calculate_route_details_uses_cache(self, mock_post):
+        mock_post.return_value.json.return_value = {'routes': [{'distanceMeters': 130500}]}
+        first = calculate_route_details("Joinville, SC", "Curitiba, PR")
+        second = calculate_route_details("  joinville,SC ", "Curitiba ,  PR")
+        self.assertEqual(first, {'distance': 130.5, 'toll_cost': 0.0})
+        self.assertEqual(second, first)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(normalize_address("São José,  SC"), "sao jose,sc")
+
+    @patch('dashboard.services.ServiceClient.post')
+    def test_calculate_route_details_does_not_cache_errors(self, mock_post):
+        mock_post.side_effect = requests.exceptions.RequestException("Conn Error")
+        self.assertIn("Erro de conexão", calculate_route_details("A, SC", "B, SC"))
+        self.assertIn("Erro de conexão", calculate_route_details("A, SC", "B, SC"))
+        self.assertEqual(mock_post.call_count, 2)
+
+    @patch('dashboard.services.ServiceClient.get')
+    def test_get_diesel_price_reads_local_snapshot(self, mock_get):
+        mock_get.return_value.json.return_value = {'precos': {'diesel': {'sc': '6,15', 'pr': '6,02'}}}
+        call_command('refresh_fuel_prices', stdout=StringIO())
+        self.assertEqual(FuelPriceSnapshot.objects.count(), 2)
+        self.assertEqual(get_diesel_price("sc"), 6.15)
+        self.assertEqual(get_diesel_price("PR"), 6.02)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertIn("não encontrado para a UF: RS", get_diesel_price("RS"))
+
+    @patch('dashboard.services.ServiceClient.get')
+    def test_get_diesel_price_serves_last_known_when_upstream_down(self, mock_get):
+        FuelPriceSnapshot.objects.create(uf='SC', price=Decimal('5.90'), fetched_at=self.now - timedelta(days=3))
+        mock_get.side_effect = requests.exceptions.RequestException("Conn Error")
+        self.assertEqual(get_diesel_price("SC"), 5.9)
+        with self.assertRaises(CommandError):
+            call_command('refresh_fuel_prices', stdout=StringIO())
+
+    @patch('dashboard.services.ServiceClient.get')
+    def test_refresh_diesel_prices_upsert_without_conflict_target_on_mysql(self, mock_get):
+        mock_get.return_value.json.return_value = {'precos': {'diesel': {'sc': '6,15'}}}
+        with patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                patch('dashboard.services.FuelPriceSnapshot.objects.bulk_create') as mock_bulk:
+            call_command('refresh_fuel_prices', stdout=StringIO())
+        options = mock_bulk.call_args.kwargs
+        self.assertTrue(options['update_conflicts'])
+        self.assertNotIn('unique_fields', options)
+        self.assertEqual(options['update_fields'], ['price', 'fetched_at'])
+
+    @patch('dashboard.services.ServiceClient.get')
+    def test_get_diesel_price_missing_uf_does_not_refetch_fresh_table(self, mock_get):
+        mock_get.return_value.json.return_value = {'precos': {'diesel': {'sc': '6,15'}}}
+        self.assertIn("não encontrado para a UF: RS", get_diesel_price("RS"))
+        self.assertIn("não encontrado para a UF: RS", get_diesel_price("RS"))
+        self.assertEqual(mock_get.call_count, 1)
+
+        FuelPriceSnapshot.objects.update(fetched_at=self.now - timedelta(days=3))
+        self.assertIn("não encontrado para a UF: RS", get_diesel_price("RS"))
+        self.assertEqual(mock_get.call_count, 2)
+
+    def test_single_flight_coalesces_concurrent_calls(self):
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        def slow_fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'ok'
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do('key', slow_fetch))) for _ in range(5)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['ok'] * 5)
+
+    @patch('dashboard.services.ServiceClient.get')
     def test_get_diesel_price_errors(self, mock_get):
         from ..services import get_diesel_price
         mock_get.side_effect = requests.exceptions.RequestException("Conn Error")
@@ -706,6 +1108,114 @@ class ApiViewTests(DashboardBaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.json()['history']), 1)
 
+    def test_route_history_fuel_cost_is_computed_in_sql(self):
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location="A", end_location="B",
+            start_time=self.now - timedelta(days=2), end_time=self.now - timedelta(days=1), status='completed',
+            estimated_distance=Decimal('100.00'), actual_distance=Decimal('100.00'),
+            fuel_price_per_liter=Decimal('5.00'), estimated_toll_cost=Decimal('12.50')
+        )
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location="C", end_location="D",
+            start_time=self.now - timedelta(days=4), end_time=self.now - timedelta(days=3), status='completed',
+            actual_distance=Decimal('30.00')
+        )
+        routes = Route.objects.filter(driver=self.driver_a, status='completed').order_by('-end_time')
+        with self.assertNumQueries(2):
+            rows = list(routes.history_rows())
+            totals = routes.history_totals()
+        self.assertEqual(rows[0]['fuel_cost'], Decimal('50.00'))
+        self.assertEqual(rows[0]['vehicle_plate'], self.vehicle_a.plate)
+        self.assertIsNone(rows[1]['fuel_cost'])
+        self.assertEqual(totals['total_fuel'], Decimal('50.00'))
+        self.assertEqual(totals['total_distance'], Decimal('130.00'))
+
+        response = self.client.get(reverse('driver-route-history', kwargs={'pk': self.driver_a.pk}))
+        data = response.json()
+        self.assertEqual(data['history'][0]['fuel_cost'], 50.0)
+        self.assertEqual(data['stats']['total_fuel_cost'], 50.0)
+        self.assertEqual(data['stats']['total_toll_cost'], 12.5)
+        self.assertEqual(data['stats']['total_routes'], 2)
+
+    def test_route_history_pages_with_cursor(self):
+        for day in range(1, 6):
+            Route.objects.create(
+                user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location=f"S{day}", end_location="E",
+                start_time=self.now - timedelta(days=day, hours=2), end_time=self.now - timedelta(days=day),
+                status='completed', actual_distance=10
+            )
+        url = reverse('vehicle-route-history', kwargs={'pk': self.vehicle_a.pk})
+        first = self.client.get(url, {'limit': 2}).json()
+        self.assertEqual([r['start_location'] for r in first['history']], ['S1', 'S2'])
+        self.assertEqual(first['stats']['total_routes'], 5)
+        self.assertIsNotNone(first['next_cursor'])
+
+        second = self.client.get(url, {'limit': 2, 'after': first['next_cursor']}).json()
+        self.assertEqual([r['start_location'] for r in second['history']], ['S3', 'S4'])
+        self.assertNotIn('stats', second)
+
+        last = self.client.get(url, {'limit': 2, 'after': second['next_cursor']}).json()
+        self.assertEqual([r['start_location'] for r in last['history']], ['S5'])
+        self.assertIsNone(last['next_cursor'])
+
+    def test_route_history_cursor_keeps_microsecond_boundaries(self):
+        boundary = self.now.replace(microsecond=123000)
+        for offset in (500, 300, 900):
+            Route.objects.create(
+                user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location=f"S{offset}", end_location="E",
+                start_time=boundary - timedelta(hours=2), end_time=boundary + timedelta(microseconds=offset),
+                status='completed', actual_distance=10
+            )
+        url = reverse('vehicle-route-history', kwargs={'pk': self.vehicle_a.pk})
+        seen, cursor = [], None
+        for _ in range(4):
+            page = self.client.get(url, {'limit': 1, **({'after': cursor} if cursor else {})}).json()
+            seen += [r['start_location'] for r in page['history']]
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, ['S900', 'S500', 'S300'])
+
+    def test_history_endpoints_ignore_cursor_with_wrong_types(self):
+        self.async_client.force_login(self.user_a)
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location="A", end_location="B",
+            start_time=self.now - timedelta(days=2), end_time=self.now - timedelta(days=1), status='completed', actual_distance=10
+        )
+        cursor = encode_cursor(["garbage", "x"])
+        for name, pk in (('vehicle-route-history', self.vehicle_a.pk), ('vehicle-maintenance-history', self.vehicle_a.pk),
+                         ('driver-route-history', self.driver_a.pk)):
+            for suffix, params in (('', {}), ('', {'format': 'ndjson'}), ('-async', {})):
+                with self.subTest(view=name + suffix, **params):
+                    url = reverse(name + suffix, kwargs={'pk': pk})
+                    if suffix:
+                        response = async_to_sync(self.async_client.get)(url, {'after': cursor, **params})
+                    else:
+                        response = self.client.get(url, {'after': cursor, **params})
+                    self.assertEqual(response.status_code, 200)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+
+    def test_history_streams_ndjson(self):
+        for day in range(1, 4):
+            Maintenance.objects.create(
+                user_profile=self.profile_a, vehicle=self.vehicle_a, service_type=f"S{day}",
+                start_date=self.now - timedelta(days=day, hours=2), end_date=self.now - timedelta(days=day),
+                mechanic_shop_name="O", current_mileage=100, status='completed', actual_cost=10,
+                actual_end_date=self.now - timedelta(days=day) if day != 2 else None
+            )
+        url = reverse('vehicle-maintenance-history', kwargs={'pk': self.vehicle_a.pk})
+        response = self.client.get(url, {'format': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([m['service_type'] for m in lines], ['S1', 'S2', 'S3'])
+        self.assertEqual(lines[1]['end_date'], 'N/A')
+
+        first = self.client.get(url, {'limit': 1}).json()
+        self.assertEqual(first['total_cost'], 30.0)
+        rest = self.client.get(url, {'limit': 5, 'after': first['next_cursor']}).json()
+        self.assertEqual([m['service_type'] for m in rest['history']], ['S2', 'S3'])
+
 class RouteViewMockTests(DashboardBaseTestCase):
     @patch('dashboard.route_views.get_diesel_price')
     @patch('dashboard.route_views.calculate_route_details')
@@ -806,14 +1316,98 @@ class RouteViewMockTests(DashboardBaseTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(response.json()['success'])
 
+    def test_route_list_stats_and_keyset_pagination(self):
+        for i in range(5):
+            Route.objects.create(
+                user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+                start_location=f"Cidade {i}, SC", end_location="Curitiba, PR",
+                start_time=self.now + timedelta(days=i + 1), end_time=self.now + timedelta(days=i + 2),
+                status='scheduled'
+            )
+        Route.objects.create(
+            user_profile=self.profile_a, start_location="Antiga, SC", end_location="B, SC",
+            start_time=self.now - timedelta(days=3), end_time=self.now - timedelta(days=2), status='canceled'
+        )
+        list_url = reverse('route-list')
+        response = self.client.get(list_url, {'limit': 2})
+        self.assertEqual(response.context['stats'], {'total': 6, 'active': 0, 'planned': 5, 'completed': 0, 'cancelled': 1})
+        seen = [r.start_location for r in response.context['routes']]
+        self.assertEqual(seen, ["Cidade 4, SC", "Cidade 3, SC"])
+        while response.context['next_cursor']:
+            response = self.client.get(list_url, {'limit': 2, 'after': response.context['next_cursor']})
+            seen.extend(r.start_location for r in response.context['routes'])
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(seen[-1], "Antiga, SC")
+
+        response = self.client.get(list_url, {'status': 'canceled', 'search': 'antiga'})
+        self.assertEqual([r.start_location for r in response.context['routes']], ["Antiga, SC"])
+        self.assertEqual(response.context['routes'][0].dynamic_status, "Cancelada")
+
+    def test_route_list_ignores_cursor_with_wrong_types(self):
+        Route.objects.create(
+            user_profile=self.profile_a, start_location="A, SC", end_location="B, SC",
+            start_time=self.now + timedelta(days=1), end_time=self.now + timedelta(days=2)
+        )
+        for values in (["garbage", "x"], [{"a": 1}, [2]], [None, "1"]):
+            with self.subTest(values=values):
+                response = self.client.get(reverse('route-list'), {'after': encode_cursor(values)})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([r.start_location for r in response.context['routes']], ["A, SC"])
+
+    @patch('dashboard.route_views.calculate_route_details')
+    @patch('dashboard.route_views.get_diesel_price')
+    def test_route_update_same_locations_skips_route_api(self, mock_price, mock_calc):
+        mock_price.return_value = Decimal('5.0')
+        route = Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+            start_location="Joinville, SC", end_location="Curitiba, PR", estimated_distance=130, estimated_toll_cost=12,
+            start_time=self.now + timedelta(days=1), end_time=self.now + timedelta(days=1, hours=1), status='scheduled'
+        )
+        response = self.client.post(reverse('route-update', kwargs={'pk': route.pk}), {
+            'start_location': 'Joinville, SC', 'end_location': 'Curitiba, PR',
+            'vehicle': self.vehicle_a.pk, 'driver': self.driver_a.pk,
+            'start_time': (self.now + timedelta(days=2)).strftime('%d/%m/%Y %H:%M'),
+            'end_time': (self.now + timedelta(days=2, hours=2)).strftime('%d/%m/%Y %H:%M'),
+        })
+        self.assertEqual(response.status_code, 200)
+        mock_calc.assert_not_called()
+        route.refresh_from_db()
+        self.assertEqual(route.estimated_distance, Decimal('130.00'))
+
+    @patch('dashboard.route_views.get_diesel_price')
+    @patch('dashboard.route_views.calculate_route_details')
+    def test_route_create_runs_lookups_concurrently(self, mock_calc, mock_price):
+        both_started = threading.Barrier(2, timeout=5)
+
+        def route_details(*args):
+            both_started.wait()
+            return {'distance': 80.0, 'toll_cost': 5.0}
+
+        def diesel_price(uf):
+            both_started.wait()
+            return 6.0
+
+        mock_calc.side_effect = route_details
+        mock_price.side_effect = diesel_price
+        response = self.client.post(reverse('route-add'), {
+            'start_location': 'Joinville, SC', 'end_location': 'Curitiba, PR',
+            'vehicle': self.vehicle_a.pk, 'driver': self.driver_a.pk,
+            'start_time': (self.now + timedelta(days=1)).strftime('%d/%m/%Y %H:%M'),
+            'end_time': (self.now + timedelta(days=1, hours=2)).strftime('%d/%m/%Y %H:%M'),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+        mock_price.assert_called_once_with('SC')
+
     def test_route_update_invalid(self):
         route = Route.objects.create(user_profile=self.profile_a, start_location="A", end_location="B", start_time=self.now, end_time=self.now)
         response = self.client.post(reverse('route-update', kwargs={'pk': route.pk}), {})
         self.assertEqual(response.status_code, 400)
 
     def test_route_create_api_error(self):
-        with patch('dashboard.route_views.calculate_route_details') as mock_calc:
+        with patch('dashboard.route_views.calculate_route_details') as mock_calc, patch('dashboard.route_views.get_diesel_price') as mock_price:
             mock_calc.return_value = "Erro API"
+            mock_price.return_value = 5.0
             response = self.client.post(reverse('route-add'), {
                 'start_location': 'A, SC', 'end_location': 'B, SC',
                 'vehicle': self.vehicle_a.pk, 'driver': self.driver_a.pk,
@@ -850,6 +1444,19 @@ class VehicleViewTests(DashboardBaseTestCase):
         self.assertContains(response, self.vehicle_a.plate)
         self.assertNotContains(response, self.vehicle_b.plate)
 
+    def test_vehicle_list_prefetches_current_route_driver(self):
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+            start_location="A, SC", end_location="B, SC", start_time=self.now - timedelta(hours=1),
+            end_time=self.now + timedelta(hours=1), status='in_progress',
+        )
+        response = self.client.get(self.list_url)
+        self.assertContains(response, self.driver_a.full_name)
+        vehicle = list(response.context['vehicles'])[0]
+        with self.assertNumQueries(0):
+            self.assertEqual(vehicle.current_route_driver, self.driver_a)
+        self.assertEqual(Vehicle.objects.get(pk=self.vehicle_a.pk).current_route_driver, self.driver_a)
+
     def test_vehicle_create_view_post_success(self):
         response = self.client.post(self.add_url, {
             'plate': 'NEW-0001', 'model': 'Novo', 'year': 2025,
@@ -1034,7 +1641,7 @@ class CoverageImprovementsTestCase(DashboardBaseTestCase):
         self.assertFalse(a3 < a4) 
 
     def test_get_diesel_price_fallback(self):
-        with patch('dashboard.services.requests.get') as mock_get:
+        with patch('dashboard.services.ServiceClient.get') as mock_get:
             mock_get.return_value.json.side_effect = ValueError("Invalid JSON")
             res = get_diesel_price("SC")
             self.assertIn("Erro ao processar", res)
@@ -1044,3 +1651,536 @@ class CoverageImprovementsTestCase(DashboardBaseTestCase):
             mock_get.return_value.json.return_value = {}
             res = get_diesel_price("SC")
             self.assertTrue("Erro ao processar" in res or "Estrutura de resposta inesperada" in res)
+
+
+class FleetImportTests(DashboardBaseTestCase):
+    def test_vehicle_import_reports_bad_rows_and_keeps_the_rest(self):
+        csv_data = (
+            "Plate,Model,Year,Acquisition_Date,Initial_Mileage,Average_Fuel_Consumption\n"
+            "IMP-0001,Modelo 1,2023,2023-01-01,1000,9.5\n"
+            "IMP-0002,Modelo 2,ano,2023-01-01,1000,9.5\n"
+            "imp-0001,Modelo 3,2023,2023-01-01,1000,9.5\n"
+            ",,,,,\n"
+            f"{self.vehicle_b.plate},Modelo 4,2023,2023-01-01,1000,9.5\n"
+            "IMP-0005,Modelo 5,2024,2024-02-01,0,\n"
+        ).encode()
+        report = VehicleImporter(self.profile_a, chunk_size=2).run(read_rows(BytesIO(csv_data), 'frota.csv'))
+
+        self.assertEqual(report.created, 2)
+        self.assertEqual([error['line'] for error in report.errors], [3, 4, 6])
+        self.assertIn('year', report.errors[0]['errors'])
+        self.assertIn('plate', report.errors[1]['errors'])
+        self.assertEqual(
+            set(Vehicle.objects.filter(user_profile=self.profile_a, plate__startswith='IMP').values_list('plate', flat=True)),
+            {'IMP-0001', 'IMP-0005'}
+        )
+
+    def test_historical_route_import_updates_odometer_without_route_api(self):
+        csv_data = (
+            "vehicle,driver,start_location,end_location,start_time,end_time,actual_distance,fuel_price_per_liter\n"
+            f"{self.vehicle_a.plate.lower()},111.111.111-11,\"Joinville, SC\",\"Curitiba, PR\",01/02/2024 08:00,01/02/2024 11:00,130.5,6.00\n"
+            f"{self.vehicle_a.plate},11111111111,\"Curitiba, PR\",\"Joinville, SC\",02/02/2024 08:00,02/02/2024 11:00,129.5,\n"
+            f"XXX-9999,11111111111,\"Curitiba, PR\",\"Joinville, SC\",03/02/2024 08:00,03/02/2024 11:00,10,\n"
+        ).encode()
+        with patch('dashboard.services.ServiceClient.post') as mock_post, \
+                patch('dashboard.services.ServiceClient.get') as mock_get:
+            report = RouteImporter(self.profile_a).run(read_rows(BytesIO(csv_data), 'rotas.csv'))
+        mock_post.assert_not_called()
+        mock_get.assert_not_called()
+
+        self.assertEqual(report.created, 2)
+        self.assertEqual(report.errors[0]['line'], 4)
+        self.assertIn('vehicle', report.errors[0]['errors'])
+        routes = Route.objects.filter(user_profile=self.profile_a, vehicle=self.vehicle_a)
+        self.assertEqual(set(routes.values_list('status', flat=True)), {'completed'})
+        self.assertEqual(routes.get(actual_distance=Decimal('130.5')).estimated_distance, Decimal('130.5'))
+        self.vehicle_a.refresh_from_db()
+        self.assertEqual(self.vehicle_a.completed_routes_mileage, Decimal('260.00'))
+
+    def test_route_import_checks_conflicts_once_per_chunk(self):
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location="Joinville, SC", end_location="Curitiba, PR",
+            start_time=timezone.make_aware(datetime(2024, 2, 2, 9, 0)), end_time=timezone.make_aware(datetime(2024, 2, 2, 10, 0)),
+        )
+        rows = [
+            f"{self.vehicle_a.plate},11111111111,\"Joinville, SC\",\"Curitiba, PR\",0{day}/02/2024 08:00,0{day}/02/2024 11:00,100,\n"
+            for day in range(1, 6)
+        ]
+        csv_data = ("vehicle,driver,start_location,end_location,start_time,end_time,actual_distance,fuel_price_per_liter\n" + "".join(rows)).encode()
+        importer = RouteImporter(self.profile_a, chunk_size=5)
+        with patch('dashboard.forms.find_schedule_conflicts') as mock_find:
+            report = importer.run(read_rows(BytesIO(csv_data), 'rotas.csv'))
+        mock_find.assert_not_called()
+        self.assertEqual(report.created, 4)
+        self.assertEqual(report.errors, [{'line': 3, 'errors': {'__all__': [
+            f"Conflito: O veículo {self.vehicle_a.plate} já está agendado para outra rota neste período.",
+            f"Conflito: O motorista {self.driver_a.full_name} já está alocado a outra rota neste período.",
+        ]}}])
+
+    def test_route_import_rejects_rows_overlapping_accepted_rows_and_zero_distance(self):
+        other = Vehicle.objects.create(user_profile=self.profile_a, plate='IMP-0002', model='M', year=2020, initial_mileage=0, acquisition_date=date(2020, 1, 1))
+        csv_data = (
+            "vehicle,driver,start_location,end_location,start_time,end_time,actual_distance,fuel_price_per_liter\n"
+            f"{self.vehicle_a.plate},11111111111,\"Joinville, SC\",\"Curitiba, PR\",01/03/2024 08:00,01/03/2024 11:00,100,\n"
+            f"{self.vehicle_a.plate},11111111111,\"Joinville, SC\",\"Curitiba, PR\",01/03/2024 10:00,01/03/2024 12:00,100,\n"
+            f"{other.plate},11111111111,\"Joinville, SC\",\"Curitiba, PR\",01/03/2024 09:00,01/03/2024 10:00,100,\n"
+            f"{other.plate},11111111111,\"Joinville, SC\",\"Curitiba, PR\",01/03/2024 11:00,01/03/2024 12:00,0,\n"
+            f"{other.plate},11111111111,\"Joinville, SC\",\"Curitiba, PR\",01/03/2024 11:00,01/03/2024 12:00,50,\n"
+        ).encode()
+        report = RouteImporter(self.profile_a, chunk_size=2).run(read_rows(BytesIO(csv_data), 'rotas.csv'))
+
+        self.assertEqual(report.created, 2)
+        self.assertEqual([error['line'] for error in report.errors], [3, 4, 5])
+        self.assertEqual(report.errors[0]['errors']['__all__'], [
+            f"Conflito: O veículo {self.vehicle_a.plate} já está agendado para outra rota neste período.",
+            f"Conflito: O motorista {self.driver_a.full_name} já está alocado a outra rota neste período.",
+        ])
+        self.assertEqual(report.errors[1]['errors']['__all__'], [
+            f"Conflito: O motorista {self.driver_a.full_name} já está alocado a outra rota neste período.",
+        ])
+        self.assertIn('actual_distance', report.errors[2]['errors'])
+        self.assertEqual(set(Route.objects.filter(user_profile=self.profile_a).values_list('status', flat=True)), {'completed'})
+
+    def test_route_import_form_keeps_text_lookup_fields(self):
+        form = RouteImportForm(data={}, instance=Route(user_profile=self.profile_a))
+        self.assertIsInstance(form.fields['vehicle'], forms.CharField)
+        self.assertFalse(hasattr(form.fields['vehicle'], 'queryset'))
+
+    def test_import_endpoint_and_command(self):
+        upload = SimpleUploadedFile('motoristas.csv', (
+            "full_name,email,license_number,admission_date\n"
+            "Novo Motorista,novo@teste.com,22233344455,2024-03-01\n"
+            f"Repetido,{self.driver_a.email},99988877766,2024-03-01\n"
+        ).encode(), content_type='text/csv')
+        response = self.client.post(reverse('fleet-import', kwargs={'kind': 'drivers'}), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual((payload['created'], payload['failed']), (1, 1))
+        self.assertIn('email', payload['errors'][0]['errors'])
+
+        self.assertEqual(self.client.post(reverse('fleet-import', kwargs={'kind': 'drivers'})).status_code, 400)
+        self.assertEqual(self.client.post(reverse('fleet-import', kwargs={'kind': 'pets'})).status_code, 404)
+
+        with self.assertRaises(CommandError):
+            call_command('import_fleet_data', 'drivers', 'motoristas.csv', '--profile', '0', stdout=StringIO())
+
+
+class CsvExportTests(DashboardBaseTestCase):
+    def read_csv(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(StringIO(content)))
+
+    def export(self, name, params=None):
+        # Session, user and profile lookups aside, each export reads at most STREAM_CHUNK_SIZE rows per query.
+        with CaptureQueriesContext(connection) as ctx:
+            rows = self.read_csv(self.client.get(reverse(name), params or {}))
+        self.assertEqual(len([q for q in ctx.captured_queries if 'FROM "dashboard_' in q['sql']]), 1)
+        return rows
+
+    def test_route_export_streams_filtered_rows_with_sql_fuel_cost(self):
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+            start_location="Joinville, SC", end_location="Curitiba, PR",
+            start_time=self.now - timedelta(days=3), end_time=self.now - timedelta(days=3, hours=-2),
+            status='completed', actual_distance=Decimal('100'), estimated_distance=Decimal('100'),
+            fuel_price_per_liter=Decimal('6.00'), estimated_toll_cost=Decimal('12.50'),
+        )
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+            start_location="Blumenau, SC", end_location="Itajaí, SC",
+            start_time=self.now + timedelta(days=3), end_time=self.now + timedelta(days=3, hours=2),
+        )
+
+        rows = self.export('route-export', {'status': 'completed'})
+        self.assertEqual(rows[0][0], 'ID')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][1:4], ["Joinville, SC", "Curitiba, PR", self.vehicle_a.plate])
+        self.assertEqual(rows[1][-2:], ['60.00', '12.50'])
+
+        rows = self.read_csv(self.client.get(reverse('route-export'), {'search': 'Blumenau'}))
+        self.assertEqual([row[1] for row in rows[1:]], ["Blumenau, SC"])
+        self.assertEqual(self.client.get(reverse('route-export'), {'start': '31/12/2024'}).status_code, 400)
+
+    def test_export_reads_rows_in_keyset_batches(self):
+        start = self.now.replace(microsecond=0) - timedelta(days=1)
+        for index in range(5):
+            Route.objects.create(
+                user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+                start_location=f"Origem {index}, SC", end_location="Destino, SC",
+                start_time=start - timedelta(hours=index // 2), end_time=start + timedelta(hours=1),
+            )
+        expected = list(Route.objects.order_by('-start_time', '-id').values_list('id', flat=True))
+        with patch('dashboard.export_views.STREAM_CHUNK_SIZE', 2), CaptureQueriesContext(connection) as ctx:
+            rows = self.read_csv(self.client.get(reverse('route-export')))
+        self.assertEqual([int(row[0]) for row in rows[1:]], expected)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'FROM "dashboard_route"' in q['sql']]), 3)
+
+    def test_csv_export_base_view_requires_rows_and_serialize(self):
+        view = CsvExportView()
+        with self.assertRaises(NotImplementedError):
+            view.get_rows(self.profile_a, None, None)
+        with self.assertRaises(NotImplementedError):
+            view.serialize({})
+
+    def test_export_escapes_cells_that_spreadsheets_run_as_formulas(self):
+        self.driver_a.full_name = '=HYPERLINK("http://evil.example","x")'
+        self.driver_a.save()
+        Route.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+            start_location="@SUM(A1)", end_location="-2+3",
+            start_time=self.now - timedelta(days=3), end_time=self.now - timedelta(days=3, hours=-2),
+            status='completed', actual_distance=Decimal('100'), estimated_distance=Decimal('100'),
+            estimated_toll_cost=Decimal('-1.50'),
+        )
+
+        row = self.export('route-export')[1]
+        self.assertEqual(row[1:3], ["'@SUM(A1)", "'-2+3"])
+        self.assertEqual(row[4], '\'=HYPERLINK("http://evil.example","x")')
+        self.assertEqual(row[-1], '-1.50')
+
+    def test_maintenance_and_vehicle_cost_exports(self):
+        Maintenance.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, service_type="Troca de Pneus",
+            start_date=self.now - timedelta(days=5), end_date=self.now - timedelta(days=4),
+            mechanic_shop_name="Oficina", current_mileage=0, status='completed',
+            actual_cost=Decimal('800.00'), actual_end_date=self.now - timedelta(days=4),
+        )
+        Maintenance.objects.create(
+            user_profile=self.profile_b, vehicle=self.vehicle_b, service_type="Revisão Geral",
+            start_date=self.now - timedelta(days=5), end_date=self.now - timedelta(days=4),
+            mechanic_shop_name="Oficina", current_mileage=0, status='completed', actual_cost=Decimal('50.00'),
+        )
+        for distance in ('100', '50'):
+            Route.objects.create(
+                user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+                start_location="A, SC", end_location="B, SC",
+                start_time=self.now - timedelta(days=2), end_time=self.now - timedelta(days=2, hours=-1),
+                status='completed', actual_distance=Decimal(distance), estimated_distance=Decimal(distance),
+                fuel_price_per_liter=Decimal('5.00'), estimated_toll_cost=Decimal('10.00'),
+            )
+
+        rows = self.read_csv(self.client.get(reverse('maintenance-export'), {'status': 'completed'}))
+        self.assertEqual([(row[1], row[-1]) for row in rows[1:]], [(self.vehicle_a.plate, '800.00')])
+
+        rows = self.export('vehicle-cost-export')
+        self.assertEqual(rows[1], [self.vehicle_a.plate, 'Modelo A', '2', '150.00', '75.00', '20.00', '800.00', '895.00'])
+        self.assertEqual(len(rows), 2)
+
+        future = (self.now + timedelta(days=30)).date().isoformat()
+        rows = self.read_csv(self.client.get(reverse('vehicle-cost-export'), {'start': future}))
+        self.assertEqual(rows[1][2:], ['0', '0.00', '0.00', '0.00', '0.00', '0.00'])
+
+
+class FleetCostRollupTests(DashboardBaseTestCase):
+    def create_route(self, end_time, distance, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Route.objects.create(
+                user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a,
+                start_location="A, SC", end_location="B, SC", start_time=end_time - timedelta(hours=2), end_time=end_time,
+                status='completed', actual_distance=Decimal(distance), estimated_distance=Decimal(distance),
+                fuel_price_per_liter=Decimal('5.00'), estimated_toll_cost=Decimal('10.00'), **kwargs
+            )
+
+    def test_rollups_follow_route_and_maintenance_changes(self):
+        january = timezone.make_aware(datetime(2025, 1, 15, 10, 0))
+        february = timezone.make_aware(datetime(2025, 2, 10, 10, 0))
+        route = self.create_route(january, '100')
+        self.create_route(january + timedelta(days=1), '50')
+        maintenance = Maintenance.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, service_type="Troca de Pneus",
+            start_date=january, end_date=january + timedelta(days=1), mechanic_shop_name="Oficina",
+            current_mileage=0, status='scheduled', estimated_cost=Decimal('900.00'),
+        )
+        self.assertFalse(FleetCostRollup.objects.filter(maintenance_count__gt=0).exists())
+
+        maintenance.status = 'completed'
+        maintenance.actual_cost = Decimal('800.00')
+        maintenance.actual_end_date = february
+        with self.captureOnCommitCallbacks() as callbacks:
+            maintenance.save()
+        self.assertFalse(FleetCostRollup.objects.filter(maintenance_count__gt=0).exists())
+        for callback in callbacks:
+            callback()
+
+        rollups = {r.month: r for r in FleetCostRollup.objects.filter(vehicle=self.vehicle_a)}
+        self.assertEqual(set(rollups), {date(2025, 1, 1), date(2025, 2, 1)})
+        self.assertEqual((rollups[date(2025, 1, 1)].route_count, rollups[date(2025, 1, 1)].distance), (2, Decimal('150.00')))
+        self.assertEqual(rollups[date(2025, 1, 1)].fuel_cost, Decimal('75.00'))
+        self.assertEqual(rollups[date(2025, 2, 1)].maintenance_cost, Decimal('800.00'))
+
+        route.end_time = february
+        with self.captureOnCommitCallbacks(execute=True):
+            route.save()
+        rollups = {r.month: r for r in FleetCostRollup.objects.filter(vehicle=self.vehicle_a)}
+        self.assertEqual((rollups[date(2025, 1, 1)].route_count, rollups[date(2025, 2, 1)].route_count), (1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            route.delete()
+            maintenance.delete()
+        self.assertEqual(list(FleetCostRollup.objects.values_list('month', flat=True)), [date(2025, 1, 1)])
+
+        FleetCostRollup.objects.all().delete()
+        call_command('rebuild_cost_rollups', stdout=StringIO())
+        self.assertEqual(FleetCostRollup.objects.get().distance, Decimal('50.00'))
+
+    def test_deploy_backfill_only_runs_while_rollups_are_empty(self):
+        self.create_route(timezone.make_aware(datetime(2025, 1, 15, 10, 0)), '100')
+        FleetCostRollup.objects.all().delete()
+        call_command('rebuild_cost_rollups', '--if-empty', stdout=StringIO())
+        self.assertEqual(FleetCostRollup.objects.get().distance, Decimal('100.00'))
+
+        FleetCostRollup.objects.update(distance=Decimal('1.00'))
+        call_command('rebuild_cost_rollups', '--if-empty', stdout=StringIO())
+        self.assertEqual(FleetCostRollup.objects.get().distance, Decimal('1.00'))
+
+    def test_export_and_analytics_agree_on_maintenance_completion_date(self):
+        january = timezone.make_aware(datetime(2025, 1, 15, 10, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            Maintenance.objects.create(
+                user_profile=self.profile_a, vehicle=self.vehicle_a, service_type="Troca de Pneus",
+                start_date=january, end_date=january + timedelta(days=1), mechanic_shop_name="Oficina",
+                current_mileage=0, status='completed', actual_cost=Decimal('300.00'),
+            )
+        analytics = self.client.get(reverse('fleet-cost-analytics'), {'start': '2025-01', 'end': '2025-01'}).json()
+        response = self.client.get(reverse('vehicle-cost-export'), {'start': '2025-01-01', 'end': '2025-01-31'})
+        rows = list(csv.reader(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()))
+        self.assertEqual(analytics['totals']['maintenance_cost'], 300.0)
+        self.assertEqual(rows[1][6], '300.00')
+
+    def test_cost_analytics_endpoint_sums_rollups(self):
+        self.create_route(timezone.make_aware(datetime(2025, 1, 15, 10, 0)), '100')
+        self.create_route(timezone.make_aware(datetime(2025, 3, 15, 10, 0)), '100')
+        FleetCostRollup.objects.create(
+            user_profile=self.profile_b, vehicle=self.vehicle_b, month=date(2025, 1, 1), maintenance_cost=Decimal('999')
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('fleet-cost-analytics'), {'start': '2025-01', 'end': '2025-03'})
+        self.assertEqual(len([q for q in ctx.captured_queries if 'dashboard_fleetcostrollup' in q['sql']]), 1)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['totals']['total_cost'], 120.0)
+        self.assertEqual(data['totals']['cost_per_km'], 0.6)
+        self.assertEqual([m['route_count'] for m in data['months']], [1, 0, 1])
+        self.assertEqual([v['plate'] for v in data['vehicles']], [self.vehicle_a.plate])
+        self.assertEqual(len(data['vehicles'][0]['months']), 3)
+
+        self.assertEqual(self.client.get(reverse('fleet-cost-analytics'), {'start': '2025-13'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('fleet-cost-analytics'), {'start': '2025-03', 'end': '2025-01'}).status_code, 400)
+        self.assertEqual(len(self.client.get(reverse('fleet-cost-analytics')).json()['months']), 24)
+
+
+class RequestProfilingMiddlewareTests(DashboardBaseTestCase):
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1, REQUEST_PROFILING_SLOW_MS=10 ** 6, REQUEST_PROFILING_MAX_QUERIES=2)
+    def test_sampled_request_gets_server_timing_and_logs_repeated_queries(self):
+        with self.assertLogs('dashboard.middleware', 'WARNING') as logs:
+            response = self.client.get(reverse('vehicle-list'))
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        self.assertIn('GET /vehicles/', logs.output[0])
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1, REQUEST_PROFILING_SLOW_MS=10 ** 6)
+    def test_fast_request_is_not_logged(self):
+        with self.assertNoLogs('dashboard.middleware', 'WARNING'):
+            response = self.client.get(reverse('vehicle-list'))
+        self.assertIn('Server-Timing', response)
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0)
+    def test_disabled_by_default(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('vehicle-list')))
+
+    def test_repeated_queries_are_grouped_by_fingerprint(self):
+        self.assertEqual(
+            query_fingerprint('SELECT *  FROM t\n WHERE id IN (%s, %s, %s)'), query_fingerprint('SELECT * FROM t WHERE id IN (%s)')
+        )
+        self.assertEqual(
+            query_fingerprint("SELECT * FROM t WHERE name = 'O''Brien' AND id = 12 LIMIT 21"),
+            'SELECT * FROM t WHERE name = %s AND id = %s LIMIT %s'
+        )
+        recorder = QueryRecorder()
+        recorder.statements.update({'SELECT a FROM t WHERE id IN (%s)': 2, 'SELECT a FROM t WHERE id IN (%s, %s)': 1, 'SELECT b FROM t': 1})
+        self.assertEqual(recorder.repeated(3), [('SELECT a FROM t WHERE id IN (...)', 3)])
+
+
+class VehiclePickerTests(DashboardBaseTestCase):
+    def test_maintenance_picker_reads_mileage_without_per_vehicle_queries(self):
+        Vehicle.objects.bulk_create(
+            Vehicle(
+                user_profile=self.profile_a, plate=f"PCK-{i:04d}", model="Picker", year=2022, initial_mileage=i,
+                acquisition_date=date(2022, 1, 1), completed_routes_mileage=Decimal('10.50'),
+            ) for i in range(5)
+        )
+        response = self.client.get(reverse('maintenance-list'))
+        self.assertContains(response, 'data-mileage="14"')
+        self.assertNotContains(response, 'vehicle-picker-search')
+        self.assertIs(response.context['add_form'].fields['vehicle'].queryset.model, Vehicle)
+
+        with patch('dashboard.maintenance_views.VEHICLE_PICKER_INLINE_LIMIT', 3):
+            response = self.client.get(reverse('maintenance-list'))
+        self.assertEqual(len(response.context['all_active_vehicles']), 3)
+        self.assertContains(response, 'vehicle-picker-search')
+
+    def test_vehicle_search_endpoint(self):
+        self.vehicle_b.plate = 'AAA-9999'
+        self.vehicle_b.save()
+        response = self.client.get(reverse('vehicle-search'), {'q': 'aaa'})
+        self.assertEqual(response.json()['results'], [
+            {'id': self.vehicle_a.pk, 'plate': self.vehicle_a.plate, 'model': self.vehicle_a.model, 'mileage': self.vehicle_a.mileage}
+        ])
+        self.vehicle_a.status = 'disabled'
+        self.vehicle_a.save()
+        self.assertEqual(self.client.get(reverse('vehicle-search'), {'q': 'aaa'}).json()['results'], [])
+
+
+class AsyncViewTests(DashboardBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client.force_login(self.user_a)
+
+    def route_form_data(self, **overrides):
+        data = {
+            'start_location': 'Joinville, SC', 'end_location': 'Curitiba, PR',
+            'vehicle': self.vehicle_a.pk, 'driver': self.driver_a.pk,
+            'start_time': (self.now + timedelta(days=1)).strftime('%d/%m/%Y %H:%M'),
+            'end_time': (self.now + timedelta(days=2)).strftime('%d/%m/%Y %H:%M'),
+        }
+        data.update(overrides)
+        return data
+
+    @patch('dashboard.async_views.aget_diesel_price', new_callable=AsyncMock, return_value=5.0)
+    @patch('dashboard.async_views.acalculate_route_details', new_callable=AsyncMock, return_value={'distance': 150.0, 'toll_cost': 25.5})
+    async def test_async_route_create_and_update(self, mock_calculate, mock_price):
+        response = await self.async_client.post(reverse('route-add-async'), self.route_form_data())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['summary']['fuel_cost'], '75.00')
+        route = await Route.objects.alatest('id')
+        self.assertEqual(route.user_profile_id, self.profile_a.pk)
+        self.assertEqual(route.estimated_distance, Decimal('150.00'))
+
+        mock_calculate.reset_mock()
+        url = reverse('route-update-async', kwargs={'pk': route.pk})
+        response = await self.async_client.post(url, self.route_form_data(
+            end_time=(self.now + timedelta(days=3)).strftime('%d/%m/%Y %H:%M')
+        ))
+        self.assertEqual(response.status_code, 200)
+        mock_calculate.assert_not_awaited()
+
+        mock_price.return_value = "Preço indisponível"
+        response = await self.async_client.post(url, self.route_form_data(end_location='Blumenau, SC'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors']['__all__'], ["Preço indisponível"])
+
+    async def test_async_route_create_invalid_form(self):
+        response = await self.async_client.post(reverse('route-add-async'), self.route_form_data(vehicle=self.vehicle_b.pk))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('vehicle', response.json()['errors'])
+
+    def test_async_history_matches_sync(self):
+        for day in range(1, 4):
+            Route.objects.create(
+                user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location=f"S{day}", end_location="E",
+                start_time=self.now - timedelta(days=day, hours=2), end_time=self.now - timedelta(days=day),
+                status='completed', actual_distance=10, fuel_price_per_liter=Decimal('5.00')
+            )
+        Maintenance.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, service_type="S", start_date=self.now, end_date=self.now,
+            mechanic_shop_name="O", current_mileage=100, status='completed', actual_cost=100, actual_end_date=self.now
+        )
+        for name, pk in (('vehicle-route-history', self.vehicle_a.pk), ('vehicle-maintenance-history', self.vehicle_a.pk),
+                         ('driver-route-history', self.driver_a.pk)):
+            with self.subTest(view=name):
+                expected = self.client.get(reverse(name, kwargs={'pk': pk}), {'limit': 2}).json()
+                response = async_to_sync(self.async_client.get)(reverse(f'{name}-async', kwargs={'pk': pk}), {'limit': 2})
+                self.assertEqual(response.json(), expected)
+
+    async def test_async_history_streams_ndjson_and_scopes_tenant(self):
+        await Route.objects.acreate(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, driver=self.driver_a, start_location="A", end_location="B",
+            start_time=self.now - timedelta(days=2), end_time=self.now - timedelta(days=1), status='completed', actual_distance=10
+        )
+        url = reverse('vehicle-route-history-async', kwargs={'pk': self.vehicle_a.pk})
+        response = await self.async_client.get(url, {'format': 'ndjson'})
+        lines = [json.loads(line) async for line in response.streaming_content]
+        self.assertEqual([line['start_location'] for line in lines], ['A'])
+
+        response = await self.async_client.get(reverse('vehicle-route-history-async', kwargs={'pk': self.vehicle_b.pk}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_async_alert_data(self):
+        AlertConfiguration.objects.create(user_profile=self.profile_a, service_type='Revisão Geral', priority='high', is_active=True, km_threshold=1)
+        Maintenance.objects.create(
+            user_profile=self.profile_a, vehicle=self.vehicle_a, service_type='Revisão Geral', start_date=self.now, end_date=self.now,
+            mechanic_shop_name="O", current_mileage=500, status='completed', actual_end_date=self.now
+        )
+        expected = [(alert.vehicle.plate, alert.service_type, alert.priority) for alert in get_vehicle_alerts(self.profile_a)]
+        self.assertTrue(expected)
+
+        data = async_to_sync(self.async_client.get)(reverse('alert-data-async')).json()
+        self.assertEqual([(a['plate'], a['service_type'], a['priority']) for a in data['alerts']], expected)
+        self.assertEqual(data['stats']['high'], len(expected))
+        data = async_to_sync(self.async_client.get)(reverse('alert-data-async'), {'priority': 'low'}).json()
+        self.assertEqual(data['alerts'], [])
+        self.assertEqual(data['stats']['total'], len(expected))
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1)
+    async def test_async_request_profiling_counts_queries(self):
+        response = await self.async_client.get(reverse('alert-data-async'))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    async def test_async_views_require_login(self):
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse('alert-data-async'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('login', response.url)
+
+    @patch('dashboard.services.AsyncServiceClient.post', new_callable=AsyncMock)
+    async def test_acalculate_route_details_uses_cache(self, mock_post):
+        mock_post.return_value = MagicMock(is_error=False)
+        mock_post.return_value.json.return_value = {'routes': [{'distanceMeters': 130500}]}
+        first = await acalculate_route_details("Joinville, SC", "Curitiba, PR")
+        second = await acalculate_route_details("  joinville,SC ", "Curitiba ,  PR")
+        self.assertEqual(first, {'distance': 130.5, 'toll_cost': 0.0})
+        self.assertEqual(second, first)
+        self.assertEqual(mock_post.await_count, 1)
+
+        mock_post.return_value = MagicMock(is_error=True, status_code=403, text='API Key Invalid')
+        self.assertIn("Erro na API do Google (403)", await acalculate_route_details("A, SC", "B, SC"))
+        mock_post.side_effect = requests.exceptions.ConnectionError("Conn Error")
+        self.assertIn("Erro de conexão", await acalculate_route_details("A, SC", "B, SC"))
+
+    async def test_async_single_flight_coalesces_concurrent_calls(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow_fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'ok'
+
+        results = await asyncio.gather(*(flight.do('key', slow_fetch) for _ in range(5)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['ok'] * 5)
+        self.assertEqual(await flight.do('key', slow_fetch), 'ok')
+        self.assertEqual(len(calls), 2)
+
+    @patch('dashboard.services.AsyncServiceClient._new_client')
+    def test_async_service_client_is_closed_with_the_request_scope(self, mock_new_client):
+        mock_new_client.side_effect = lambda: MagicMock(is_closed=False, aclose=AsyncMock())
+        service = AsyncServiceClient('teste')
+
+        async def handle_request():
+            async with async_service_client_scope():
+                client = service._client()
+                self.assertIs(service._client(), client)
+            return client
+
+        client = async_to_sync(handle_request)()
+        client.aclose.assert_awaited_once()
+        self.assertIsNot(async_to_sync(handle_request)(), client)
+
+        with override_settings(SERVER_MODE='asgi'):
+            client = async_to_sync(handle_request)()
+        client.aclose.assert_not_awaited()
@@ -0,0 +1,45 @@
+from django.core.cache import caches
+from django.core.cache.backends.db import BaseDatabaseCache
+from django.test import TestCase
+
+from .query_budget import LARGE_FLEET, SMALL_FLEET, QueryBudgetMixin
+
+# Cold-cache queries per GET view, session/user/profile lookups included. A new view must declare its budget.
+QUERY_BUDGETS = {
+    'dashboard': 7,
+    'user-profile': 3,
+    'vehicle-list': 6,
+    'vehicle-maintenance-history': 6,
+    'vehicle-route-history': 6,
+    'vehicle-search': 4,
+    'driver-list': 5,
+    'driver-route-history': 6,
+    'route-list': 7,
+    'maintenance-list': 9,
+    'alert-config': 11,
+    'route-export': 4,
+    'maintenance-export': 4,
+    'vehicle-cost-export': 4,
+    'fleet-cost-analytics': 4,
+    'vehicle-maintenance-history-async': 6,
+    'vehicle-route-history-async': 6,
+    'driver-route-history-async': 6,
+    'alert-data-async': 4,
+}
+
+
+class ViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def test_query_count_does_not_grow_with_tenant_size(self):
+        small = self.fleet_queries(**SMALL_FLEET)
+        large = self.fleet_queries(**LARGE_FLEET)
+        self.assertEqual(set(small), set(large))
+        self.assertEqual(set(small), set(QUERY_BUDGETS), "Declare o orçamento de consultas de cada view em QUERY_BUDGETS.")
+        for name in small:
+            with self.subTest(view=name):
+                self.assertLessEqual(len(small[name]), QUERY_BUDGETS[name], "\n".join(small[name]))
+                self.assertQueryCountStable(name, small[name], large[name])
+
+    def test_budgets_run_against_the_configured_cache_backend(self):
+        # Cache reads are not counted as queries, which only holds for a backend outside the database.
+        self.assertNotIsInstance(caches['default'], BaseDatabaseCache)
+
@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from ..services import ServiceClient, CircuitOpenError
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload=None):
+        body = json.dumps(payload or {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hits = server.hits[self.path]
+        if self.path == '/ok':
+            self._reply(200, {'ok': True})
+        elif self.path == '/flaky':
+            self._reply(503 if hits <= 2 else 200)
+        elif self.path == '/slow':
+            time.sleep(0.5)
+            self._reply(200)
+        else:
+            self._reply(500)
+
+    do_POST = do_GET
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class ServiceClientStubServerTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubServer(('127.0.0.1', 0), StubHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.hits = {}
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.hits.clear()
+
+    def test_retries_transient_errors_with_backoff(self):
+        client = ServiceClient('stub', max_retries=2, backoff_factor=0)
+        response = client.get(f"{self.base_url}/flaky")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hits['/flaky'], 3)
+
+    def test_read_timeout_is_enforced(self):
+        client = ServiceClient('stub', read_timeout=0.1, max_retries=0)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.get(f"{self.base_url}/slow")
+        self.assertEqual(client.metrics()['errors'], 1)
+
+    def test_circuit_opens_and_recovers(self):
+        client = ServiceClient('stub', max_retries=0, failure_threshold=2, reset_timeout=0.2)
+        for _ in range(2):
+            self.assertEqual(client.post(f"{self.base_url}/down").status_code, 500)
+        self.assertEqual(client.breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            client.get(f"{self.base_url}/ok")
+        self.assertNotIn('/ok', self.server.hits)
+
+        time.sleep(0.25)
+        self.assertEqual(client.get(f"{self.base_url}/ok").status_code, 200)
+        self.assertEqual(client.breaker.state, 'closed')
+
+        metrics = client.metrics()
+        self.assertEqual(metrics['requests'], 3)
+        self.assertEqual(metrics['errors'], 2)
+        self.assertEqual(metrics['short_circuited'], 1)
+        self.assertGreater(metrics['avg_latency_ms'], 0)
+
+    def test_read_timeout_is_not_retried(self):
+        client = ServiceClient('stub', read_timeout=0.1, max_retries=2)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.get(f"{self.base_url}/slow")
+        self.assertEqual(self.server.hits['/slow'], 1)
+
+    def test_unexpected_error_hands_back_half_open_trial(self):
+        client = ServiceClient('stub', max_retries=0, failure_threshold=1, reset_timeout=0.1)
+        client.get(f"{self.base_url}/down")
+        time.sleep(0.15)
+        with patch.object(client.session, 'request', side_effect=ValueError("argumento inválido")):
+            with self.assertRaises(ValueError):
+                client.get(f"{self.base_url}/ok")
+        self.assertEqual(client.breaker.state, 'half_open')
+        self.assertEqual(client.get(f"{self.base_url}/ok").status_code, 200)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_regular_call_does_not_release_another_callers_trial(self):
+        client = ServiceClient('stub', max_retries=0, failure_threshold=1, reset_timeout=0)
+
+        def trip_and_take_trial(*args, **kwargs):
+            # Meanwhile another call fails and the next one becomes the half-open trial.
+            client.breaker.record_failure()
+            self.assertIs(client.breaker.acquire(), True)
+            raise ValueError("argumento inválido")
+
+        with patch.object(client.session, 'request', side_effect=trip_and_take_trial):
+            with self.assertRaises(ValueError):
+                client.get(f"{self.base_url}/ok")
+        self.assertIsNone(client.breaker.acquire())
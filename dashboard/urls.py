@@ -3,7 +3,7 @@ from .core_views import DashboardView, UserProfileView
 from .vehicle_views import (
     VehicleListView, VehicleCreateView, VehicleUpdateView,
     VehicleDeactivateView, VehicleReactivateView,
-    VehicleMaintenanceHistoryView, VehicleRouteHistoryView
+    VehicleMaintenanceHistoryView, VehicleRouteHistoryView, VehicleSearchView
 )
 from .driver_views import (
     DriverListView, DriverCreateView, DriverUpdateView,
@@ -17,7 +17,14 @@ from .route_views import (
     RouteCreateView, RouteListView, RouteUpdateView,
     RouteCancelView, RouteReactivateView, RouteCompleteView
 )
-from .alert_views import AlertConfigView
+from .alert_views import AlertConfigView, RefreshVehicleAlertsCronView
+from .import_views import FleetImportView
+from .export_views import MaintenanceExportView, RouteExportView, VehicleCostExportView
+from .analytics_views import FleetCostAnalyticsView
+from .async_views import (
+    AsyncAlertDataView, AsyncDriverRouteHistoryView, AsyncRouteCreateView, AsyncRouteUpdateView,
+    AsyncVehicleMaintenanceHistoryView, AsyncVehicleRouteHistoryView
+)
 
 
 urlpatterns = [
@@ -30,6 +37,7 @@ urlpatterns = [
     
     path('vehicles/', VehicleListView.as_view(), name='vehicle-list'),
     path('vehicles/add/', VehicleCreateView.as_view(), name='vehicle-add'),
+    path('vehicles/search/', VehicleSearchView.as_view(), name='vehicle-search'),
     path('vehicles/<int:pk>/update/', VehicleUpdateView.as_view(), name='vehicle-update'),
     path('vehicles/<int:pk>/deactivate/', VehicleDeactivateView.as_view(), name='vehicle-deactivate'),
     path('vehicles/<int:pk>/reactivate/', VehicleReactivateView.as_view(), name='vehicle-reactivate'),
@@ -53,4 +61,17 @@ urlpatterns = [
     
     path('routes/<int:pk>/complete/', RouteCompleteView.as_view(), name='route-complete'),
     path('alerts/config/', AlertConfigView.as_view(), name='alert-config'),
+    path('cron/refresh-alerts/', RefreshVehicleAlertsCronView.as_view(), name='cron-refresh-alerts'),
+    path('imports/<str:kind>/', FleetImportView.as_view(), name='fleet-import'),
+    path('exports/routes.csv', RouteExportView.as_view(), name='route-export'),
+    path('exports/maintenances.csv', MaintenanceExportView.as_view(), name='maintenance-export'),
+    path('exports/vehicle-costs.csv', VehicleCostExportView.as_view(), name='vehicle-cost-export'),
+    path('analytics/costs/', FleetCostAnalyticsView.as_view(), name='fleet-cost-analytics'),
+
+    path('async/routes/add/', AsyncRouteCreateView.as_view(), name='route-add-async'),
+    path('async/routes/<int:pk>/update/', AsyncRouteUpdateView.as_view(), name='route-update-async'),
+    path('async/vehicles/<int:pk>/maintenance_history/', AsyncVehicleMaintenanceHistoryView.as_view(), name='vehicle-maintenance-history-async'),
+    path('async/vehicles/<int:pk>/route_history/', AsyncVehicleRouteHistoryView.as_view(), name='vehicle-route-history-async'),
+    path('async/drivers/<int:pk>/route_history/', AsyncDriverRouteHistoryView.as_view(), name='driver-route-history-async'),
+    path('async/alerts/', AsyncAlertDataView.as_view(), name='alert-data-async'),
 ]
\ No newline at end of file
@@ -2,45 +2,37 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
-from django.db.models import Q, Sum, Count
-from django.db.models.functions import Coalesce
 from django.http import JsonResponse
+from django.utils import timezone
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
 from .models import Vehicle, Maintenance, Route
-from accounts.models import UserProfile
+from .middleware import get_profile_or_404
+from .tenant_cache import cached_tenant_stats
 from .forms import VehicleForm
+from .history import history_response, maintenance_history_entry, route_history_entry, route_history_stats
+from .pagination import parse_limit
+
+VEHICLE_SEARCH_LIMIT = 20
 
 
 class VehicleListView(LoginRequiredMixin, View):
     def get(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
-        
-        all_vehicles = list(Vehicle.objects.filter(user_profile=profile).select_related('driver').order_by('plate'))
-        stats = { 'total': len(all_vehicles), 'available': 0, 'on_route': 0, 'maintenance': 0, 'disabled': 0 }
-        filtered_vehicles = []
+        profile = get_profile_or_404(request)
         
+        now = timezone.now()
+        vehicles = Vehicle.objects.filter(user_profile=profile).with_dynamic_status(now)
+        stats = cached_tenant_stats(profile, 'vehicles', vehicles.status_counts)
+
         search_query = request.GET.get('search', '')
         status_filter = request.GET.get('status', '')
-        
-        for vehicle in all_vehicles:
-            dynamic_slug = vehicle.dynamic_status_slug
-            if dynamic_slug == 'available': stats['available'] += 1
-            elif dynamic_slug == 'on_route': stats['on_route'] += 1
-            elif dynamic_slug == 'maintenance': stats['maintenance'] += 1
-            elif dynamic_slug == 'disabled': stats['disabled'] += 1
-            
-            passes_status_filter = not status_filter or dynamic_slug == status_filter
-            passes_search_filter = True
-            
-            if search_query:
-                search_query_lower = search_query.lower()
-                in_plate = search_query_lower in vehicle.plate.lower()
-                in_model = search_query_lower in vehicle.model.lower()
-                in_driver = (vehicle.driver and search_query_lower in vehicle.driver.full_name.lower())
-                passes_search_filter = in_plate or in_model or in_driver
-            
-            if passes_status_filter and passes_search_filter:
-                filtered_vehicles.append(vehicle)
-        
+
+        filtered_vehicles = vehicles.select_related('driver').with_current_route(now).order_by('plate')
+        if status_filter:
+            filtered_vehicles = filtered_vehicles.filter(current_status_slug=status_filter)
+        if search_query:
+            filtered_vehicles = filtered_vehicles.filter(Q(plate__icontains=search_query) | Q(model__icontains=search_query) | Q(driver__full_name__icontains=search_query))
+
         context = {
             'vehicles': filtered_vehicles, 'add_form': VehicleForm(),
             'status_choices': Vehicle.STATUS_CHOICES, 'search_query': search_query,
@@ -50,7 +42,7 @@ class VehicleListView(LoginRequiredMixin, View):
 
 class VehicleCreateView(LoginRequiredMixin, View):
     def post(self, request):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         form = VehicleForm(request.POST)
         if form.is_valid():
             new_vehicle = form.save(commit=False)
@@ -67,7 +59,7 @@ class VehicleCreateView(LoginRequiredMixin, View):
 
 class VehicleUpdateView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         vehicle = get_object_or_404(Vehicle, pk=pk, user_profile=profile)
         form = VehicleForm(request.POST, instance=vehicle)
         if form.is_valid():
@@ -83,7 +75,7 @@ class VehicleUpdateView(LoginRequiredMixin, View):
 
 class VehicleDeactivateView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         vehicle = get_object_or_404(Vehicle, pk=pk, user_profile=profile)
         vehicle.status = 'disabled'
         vehicle.save()
@@ -92,7 +84,7 @@ class VehicleDeactivateView(LoginRequiredMixin, View):
 
 class VehicleReactivateView(LoginRequiredMixin, View):
     def post(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         vehicle = get_object_or_404(Vehicle, pk=pk, user_profile=profile)
         vehicle.status = 'available'
         vehicle.save()
@@ -101,50 +93,38 @@ class VehicleReactivateView(LoginRequiredMixin, View):
 
 class VehicleMaintenanceHistoryView(LoginRequiredMixin, View):
     def get(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         vehicle = get_object_or_404(Vehicle, pk=pk, user_profile=profile)
         
-        maintenances = Maintenance.objects.filter(vehicle=vehicle, status='completed').order_by('-actual_end_date')
-        total_cost_agg = maintenances.aggregate(total=Sum('actual_cost'))
-        total_cost = float(total_cost_agg['total'] or 0.0)
-        history_list = []
-        for m in maintenances:
-            history_list.append({
-                'service_type': m.service_type, 'shop_name': m.mechanic_shop_name,
-                'end_date': m.actual_end_date.strftime('%d/%m/%Y') if m.actual_end_date else 'N/A',
-                'cost': float(m.actual_cost or 0.0),
-            })
-        return JsonResponse({ 'history': history_list, 'total_cost': total_cost })
+        maintenances = Maintenance.objects.filter(vehicle=vehicle, status='completed')
+        rows = maintenances.annotate(sort_date=Coalesce('actual_end_date', 'end_date')).values(
+            'id', 'service_type', 'mechanic_shop_name', 'actual_end_date', 'actual_cost', 'sort_date'
+        )
+        return history_response(
+            request, rows, ('-sort_date', '-id'), maintenance_history_entry,
+            lambda: {'total_cost': float(maintenances.aggregate(total=Sum('actual_cost'))['total'] or 0.0)}
+        )
 
 class VehicleRouteHistoryView(LoginRequiredMixin, View):
     def get(self, request, pk):
-        profile = get_object_or_404(UserProfile, user=request.user)
+        profile = get_profile_or_404(request)
         vehicle = get_object_or_404(Vehicle, pk=pk, user_profile=profile)
         
-        routes = Route.objects.filter(vehicle=vehicle, status='completed').select_related('vehicle').order_by('-end_time')
-        stats = routes.aggregate(
-            total_distance=Sum(Coalesce('actual_distance', 'estimated_distance')),
-            total_routes=Count('id'), total_toll=Sum('estimated_toll_cost')
+        routes = Route.objects.filter(vehicle=vehicle, status='completed')
+        return history_response(
+            request, routes.history_rows(), ('-end_time', '-id'), route_history_entry,
+            lambda: {'stats': route_history_stats(routes)}
         )
-        total_distance = float(stats['total_distance'] or 0.0)
-        total_routes = stats['total_routes'] or 0
-        total_toll_cost = float(stats['total_toll'] or 0.0)
-        total_fuel_cost = 0.0
-        history_list = []
-        for r in routes:
-            route_fuel_cost = float(r.estimated_fuel_cost or 0.0)
-            total_fuel_cost += route_fuel_cost
-            route_toll_cost = float(r.estimated_toll_cost or 0.0)
-            history_list.append({
-                'start_location': r.start_location, 'end_location': r.end_location,
-                'end_time': r.end_time.strftime('%d/%m/%Y %H:%M'),
-                'distance': float(r.actual_distance or r.estimated_distance or 0.0),
-                'fuel_cost': route_fuel_cost, 'toll_cost': route_toll_cost,
-            })
-        return JsonResponse({
-            'history': history_list,
-            'stats': {
-                'total_distance': total_distance, 'total_routes': total_routes,
-                'total_fuel_cost': total_fuel_cost, 'total_toll_cost': total_toll_cost,
-            }
-        })
\ No newline at end of file
+
+class VehicleSearchView(LoginRequiredMixin, View):
+    def get(self, request):
+        profile = get_profile_or_404(request)
+        query = request.GET.get('q', '').strip()
+        vehicles = Vehicle.objects.filter(user_profile=profile).picker_options()
+        if query:
+            vehicles = vehicles.filter(Q(plate__icontains=query) | Q(model__icontains=query))
+        limit = parse_limit(request.GET.get('limit'), default=VEHICLE_SEARCH_LIMIT)
+        return JsonResponse({'results': [
+            {'id': vehicle.pk, 'plate': vehicle.plate, 'model': vehicle.model, 'mileage': vehicle.mileage}
+            for vehicle in vehicles[:min(limit, VEHICLE_SEARCH_LIMIT)]
+        ]})
@@ -15,6 +15,25 @@ if TESTING:
 
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
+ROUTE_DETAILS_CACHE_TTL = int(os.getenv('ROUTE_DETAILS_CACHE_TTL', 60 * 60 * 24 * 30))
+FUEL_PRICE_MAX_AGE = int(os.getenv('FUEL_PRICE_MAX_AGE', 60 * 60 * 24))
+# Status counts depend on the clock (routes start/finish), so cached stats also expire on their own.
+TENANT_STATS_CACHE_TTL = int(os.getenv('TENANT_STATS_CACHE_TTL', 60))
+# Fraction of requests profiled by RequestProfilingMiddleware (0 disables it).
+REQUEST_PROFILING_SAMPLE_RATE = float(os.getenv('REQUEST_PROFILING_SAMPLE_RATE', 0))
+REQUEST_PROFILING_SLOW_MS = int(os.getenv('REQUEST_PROFILING_SLOW_MS', 500))
+REQUEST_PROFILING_MAX_QUERIES = int(os.getenv('REQUEST_PROFILING_MAX_QUERIES', 50))
+
+# Same switch as gunicorn.conf.py; under "wsgi" each async view runs on its own short-lived event loop.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+EXTERNAL_LOOKUP_WORKERS = int(os.getenv('EXTERNAL_LOOKUP_WORKERS', 8))
+# Route saves wait on both lookups (in parallel). Read timeouts end the call; only connection errors and
+# 502/503/504 are retried, so one call takes at most (max_retries + 1) * (connect_timeout + read_timeout) plus
+# backoff: about 27 s for google_routes and 23 s for fuel_prices, under App Engine's 60 s request deadline.
+EXTERNAL_SERVICES = {
+    'google_routes': {'connect_timeout': 3.05, 'read_timeout': 10, 'max_retries': 1, 'failure_threshold': 5, 'reset_timeout': 30},
+    'fuel_prices': {'connect_timeout': 3.05, 'read_timeout': 8, 'max_retries': 1, 'failure_threshold': 3, 'reset_timeout': 60},
+}
 
 ALLOWED_HOSTS = [
     'fleettrack-app-475400.rj.r.appspot.com',
@@ -41,11 +60,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'dashboard.middleware.RequestProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'dashboard.middleware.NeverCacheAuthenticatedMiddleware',
+    'dashboard.middleware.UserProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -94,6 +115,16 @@ if TESTING:
         'NAME': BASE_DIR / 'db_test.sqlite3',
     }
 
+# The profile cache, tenant stats versions and route details are invalidated by signals. With REDIS_URL
+# (Memorystore) every gunicorn worker and App Engine instance shares them; otherwise each process keeps its
+# own LocMemCache and profiles expire quickly so another worker's stale copy does not live long.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+PROFILE_CACHE_TIMEOUT = int(os.getenv('PROFILE_CACHE_TIMEOUT', 300 if REDIS_URL else 30))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
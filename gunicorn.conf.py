@@ -0,0 +1,13 @@
+import os
+
+# SERVER_MODE=asgi serves fleettrack.asgi through uvicorn workers: each worker runs an event loop, so the
+# async endpoints (dashboard/async_views.py) can wait on slow upstream APIs without holding a worker per request.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+bind = f":{os.getenv('PORT', '8000')}"
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'fleettrack.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'fleettrack.wsgi:application'
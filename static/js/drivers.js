@@ -40,7 +40,18 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     }
 
-    function buildRouteHistory(panel, data) {
+    function routeRow(r) {
+        return `
+            <tr>
+                <td>${r.start_location} → ${r.end_location}</td>
+                <td>${r.vehicle_plate}</td>
+                <td>${r.end_time}</td>
+                <td>${r.distance.toFixed(2).replace('.', ',')} km</td>
+            </tr>
+        `;
+    }
+
+    function buildRouteHistory(panel, data, url) {
         let html = `<h4>Histórico de Rotas</h4>`;
         const totalDistance = data.stats.total_distance.toFixed(2).replace('.', ',');
         const totalRoutes = data.stats.total_routes;
@@ -68,34 +79,61 @@ document.addEventListener('DOMContentLoaded', function () {
                             </tr>
                         </thead>
                         <tbody>
-                            ${data.history.map(r => `
-                                <tr>
-                                    <td>${r.start_location} → ${r.end_location}</td>
-                                    <td>${r.vehicle_plate}</td>
-                                    <td>${r.end_time}</td>
-                                    <td>${r.distance.toFixed(2).replace('.', ',')} km</td>
-                                </tr>
-                            `).join('')}
+                            ${data.history.map(routeRow).join('')}
                         </tbody>
                     </table>
                 </div>
             `;
         }
         panel.innerHTML = html;
+        appendLoadMore(panel, url, data.next_cursor, routeRow);
+    }
+
+    function fetchHistoryPage(url, after = null) {
+        const pageUrl = after ? `${url}?after=${encodeURIComponent(after)}` : url;
+        return fetch(pageUrl).then(response => {
+            if (!response.ok) throw new Error('Falha ao buscar dados.');
+            return response.json();
+        });
+    }
+
+    // Later pages are fetched only when asked for, so a long history is never loaded in full.
+    function appendLoadMore(panel, url, nextCursor, renderRow) {
+        if (!nextCursor) return;
+        let cursor = nextCursor;
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'btn btn-secondary history-load-more';
+        button.textContent = 'Carregar mais';
+        button.addEventListener('click', () => {
+            button.disabled = true;
+            fetchHistoryPage(url, cursor)
+                .then(page => {
+                    panel.querySelector('.history-table tbody').insertAdjacentHTML('beforeend', page.history.map(renderRow).join(''));
+                    cursor = page.next_cursor;
+                    if (cursor) {
+                        button.disabled = false;
+                    } else {
+                        button.remove();
+                    }
+                })
+                .catch(error => {
+                    console.error('Erro ao buscar histórico:', error);
+                    button.disabled = false;
+                });
+        });
+        panel.appendChild(button);
     }
 
     function fetchHistory(driverPk, historyType, panelId) {
         const panel = document.getElementById(panelId);
         if (!panel.querySelector('.history-loading')) return;
 
-        fetch(`/drivers/${driverPk}/${historyType}/`)
-            .then(response => {
-                if (!response.ok) throw new Error('Falha ao buscar dados.');
-                return response.json();
-            })
+        const url = `/drivers/${driverPk}/${historyType}/`;
+        fetchHistoryPage(url)
             .then(data => {
                 if (historyType === 'route_history') {
-                    buildRouteHistory(panel, data);
+                    buildRouteHistory(panel, data, url);
                 }
             })
             .catch(error => {
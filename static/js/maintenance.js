@@ -57,6 +57,43 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    function vehicleOption(id, label, mileage) {
+        const option = document.createElement('option');
+        option.value = id;
+        option.textContent = label;
+        if (mileage !== undefined) option.dataset.mileage = mileage;
+        return option;
+    }
+
+    function ensureVehicleOption(id, label) {
+        if (!vehicleSelect.querySelector(`option[value="${id}"]`)) {
+            vehicleSelect.appendChild(vehicleOption(id, label));
+        }
+    }
+
+    const vehicleSearchInput = document.getElementById('vehicle-picker-search');
+    if (vehicleSearchInput && vehicleSelect) {
+        let searchTimer = null;
+        vehicleSearchInput.addEventListener('input', function() {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => {
+                const url = `${vehicleSearchInput.dataset.url}?q=${encodeURIComponent(vehicleSearchInput.value)}`;
+                fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+                    .then(response => response.json())
+                    .then(data => {
+                        const selected = vehicleSelect.options[vehicleSelect.selectedIndex];
+                        vehicleSelect.innerHTML = '<option value="">---------</option>';
+                        if (selected && selected.value) vehicleSelect.appendChild(selected);
+                        data.results.forEach(vehicle => {
+                            if (selected && String(vehicle.id) === selected.value) return;
+                            vehicleSelect.appendChild(vehicleOption(vehicle.id, `${vehicle.plate} - ${vehicle.model}`, vehicle.mileage));
+                        });
+                    })
+                    .catch(error => console.error('Erro ao buscar veículos:', error));
+            }, 250);
+        });
+    }
+
     if (openAddBtn) {
         openAddBtn.addEventListener('click', () => {
             maintenanceForm.reset();
@@ -105,6 +142,7 @@ document.addEventListener('DOMContentLoaded', function() {
             document.querySelector('#maintenance-modal #id_estimated_cost').value = row.dataset.estimated_cost;
             
             const currentMileage = row.dataset.current_mileage;
+            ensureVehicleOption(row.dataset.vehicle_id, row.dataset.vehicle_label);
             vehicleSelect.value = row.dataset.vehicle_id; 
             mileageDisplay.textContent = `${currentMileage} km`; 
             mileageInput.value = currentMileage; 
@@ -8,7 +8,30 @@ document.addEventListener('DOMContentLoaded', function () {
     const vehicleForm = document.getElementById('vehicle-form');
     const deactivateForm = document.getElementById('deactivate-form');
 
-    function buildMaintenanceHistory(panel, data) {
+    function maintenanceRow(m) {
+        return `
+            <tr>
+                <td>${m.service_type}</td>
+                <td>${m.shop_name}</td>
+                <td>${m.end_date}</td>
+                <td>${m.cost.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' })}</td>
+            </tr>
+        `;
+    }
+
+    function routeRow(r) {
+        return `
+            <tr>
+                <td>${r.start_location} → ${r.end_location}</td>
+                <td>${r.end_time}</td>
+                <td>${r.distance.toFixed(2).replace('.', ',')} km</td>
+                <td>${r.fuel_cost.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' })}</td>
+                <td>${r.toll_cost.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' })}</td>
+            </tr>
+        `;
+    }
+
+    function buildMaintenanceHistory(panel, data, url) {
         let html = `<h4>Histórico de Manutenção</h4>`;
         const totalCostBRL = data.total_cost.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' });
         html += `<p class="history-summary">Custo Total: ${totalCostBRL}</p>`;
@@ -27,22 +50,16 @@ document.addEventListener('DOMContentLoaded', function () {
                         </tr>
                     </thead>
                     <tbody>
-                        ${data.history.map(m => `
-                            <tr>
-                                <td>${m.service_type}</td>
-                                <td>${m.shop_name}</td>
-                                <td>${m.end_date}</td>
-                                <td>${m.cost.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' })}</td>
-                            </tr>
-                        `).join('')}
+                        ${data.history.map(maintenanceRow).join('')}
                     </tbody>
                 </table>
             `;
         }
         panel.innerHTML = html;
+        appendLoadMore(panel, url, data.next_cursor, maintenanceRow);
     }
 
-    function buildRouteHistory(panel, data) {
+    function buildRouteHistory(panel, data, url) {
         let html = `<h4>Histórico de Rotas</h4>`;
         const totalDistance = data.stats.total_distance.toFixed(2).replace('.', ',');
         const totalRoutes = data.stats.total_routes;
@@ -71,37 +88,63 @@ document.addEventListener('DOMContentLoaded', function () {
                             </tr>
                         </thead>
                         <tbody>
-                            ${data.history.map(r => `
-                                <tr>
-                                    <td>${r.start_location} → ${r.end_location}</td>
-                                    <td>${r.end_time}</td>
-                                    <td>${r.distance.toFixed(2).replace('.', ',')} km</td>
-                                    <td>${r.fuel_cost.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' })}</td>
-                                    <td>${r.toll_cost.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' })}</td>
-                                </tr>
-                            `).join('')}
+                            ${data.history.map(routeRow).join('')}
                         </tbody>
                     </table>
                 </div>
             `;
         }
         panel.innerHTML = html;
+        appendLoadMore(panel, url, data.next_cursor, routeRow);
+    }
+
+    function fetchHistoryPage(url, after = null) {
+        const pageUrl = after ? `${url}?after=${encodeURIComponent(after)}` : url;
+        return fetch(pageUrl).then(response => {
+            if (!response.ok) throw new Error('Falha ao buscar dados.');
+            return response.json();
+        });
+    }
+
+    // Later pages are fetched only when asked for, so a long history is never loaded in full.
+    function appendLoadMore(panel, url, nextCursor, renderRow) {
+        if (!nextCursor) return;
+        let cursor = nextCursor;
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'btn btn-secondary history-load-more';
+        button.textContent = 'Carregar mais';
+        button.addEventListener('click', () => {
+            button.disabled = true;
+            fetchHistoryPage(url, cursor)
+                .then(page => {
+                    panel.querySelector('.history-table tbody').insertAdjacentHTML('beforeend', page.history.map(renderRow).join(''));
+                    cursor = page.next_cursor;
+                    if (cursor) {
+                        button.disabled = false;
+                    } else {
+                        button.remove();
+                    }
+                })
+                .catch(error => {
+                    console.error('Erro ao buscar histórico:', error);
+                    button.disabled = false;
+                });
+        });
+        panel.appendChild(button);
     }
 
     function fetchHistory(vehiclePk, historyType, panelId) {
         const panel = document.getElementById(panelId);
         if (!panel.querySelector('.history-loading')) return;
 
-        fetch(`/vehicles/${vehiclePk}/${historyType}/`)
-            .then(response => {
-                if (!response.ok) throw new Error('Falha ao buscar dados.');
-                return response.json();
-            })
+        const url = `/vehicles/${vehiclePk}/${historyType}/`;
+        fetchHistoryPage(url)
             .then(data => {
                 if (historyType === 'maintenance_history') {
-                    buildMaintenanceHistory(panel, data);
+                    buildMaintenanceHistory(panel, data, url);
                 } else if (historyType === 'route_history') {
-                    buildRouteHistory(panel, data);
+                    buildRouteHistory(panel, data, url);
                 }
             })
             .catch(error => {